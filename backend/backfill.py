@@ -0,0 +1,347 @@
+import argparse
+import asyncio
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+import ijson
+from starlette.concurrency import run_in_threadpool
+
+from database import run_db
+from ingest import INGEST_BATCH_SIZE, IngestResult, upsert_features
+import partitions
+
+logger = logging.getLogger(__name__)
+
+# USGS FDSN event API 설정
+FDSN_BASE_URL = os.getenv("USGS_FDSN_BASE_URL", "https://earthquake.usgs.gov/fdsnws/event/1")
+FDSN_MAX_EVENTS = 20000  # FDSN query 한 번에 허용되는 최대 이벤트 수
+FDSN_TIMEOUT = float(os.getenv("USGS_FDSN_TIMEOUT", "120"))
+MIN_WINDOW = timedelta(minutes=1)
+
+
+@dataclass
+class BackfillJob:
+    """진행 중/완료된 백필 작업 상태"""
+    job_id: str
+    job_name: str
+    windows_total: int = 0
+    windows_done: int = 0
+    windows_skipped: int = 0
+    windows_failed: int = 0
+    status: str = "pending"
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: IngestResult = field(default_factory=IngestResult)
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "job_name": self.job_name,
+            "status": self.status,
+            "windows_total": self.windows_total,
+            "windows_done": self.windows_done,
+            "windows_skipped": self.windows_skipped,
+            "windows_failed": self.windows_failed,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "errors": self.errors[-10:],
+            **self.result.counts(),
+        }
+
+
+# 이 프로세스에서 시작된 백필 작업들 (관리자 엔드포인트 조회용)
+_jobs: Dict[str, BackfillJob] = {}
+_tasks = set()
+
+
+def get_job(job_id: str) -> Optional[BackfillJob]:
+    return _jobs.get(job_id)
+
+
+def split_windows(start: datetime, end: datetime, window: timedelta) -> List[Tuple[datetime, datetime]]:
+    """[start, end) 구간을 window 크기의 시간 창으로 분할"""
+    windows = []
+    cursor = start
+    while cursor < end:
+        window_end = min(cursor + window, end)
+        windows.append((cursor, window_end))
+        cursor = window_end
+    return windows
+
+
+def _fdsn_time(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _window_key(window: Tuple[datetime, datetime]) -> str:
+    return f"{_fdsn_time(window[0])}/{_fdsn_time(window[1])}"
+
+
+class _AsyncResponseReader:
+    """httpx 스트리밍 응답을 ijson이 읽을 수 있는 비동기 파일 객체로 감쌈"""
+
+    def __init__(self, response: httpx.Response):
+        self._chunks = response.aiter_bytes()
+
+    async def read(self, size: int = -1) -> bytes:
+        if size == 0:
+            return b""
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
+
+
+# ---------------------------------------------------------------------------
+# 체크포인트 (DB 저장)
+# ---------------------------------------------------------------------------
+
+def load_completed_windows(conn, job_name: str) -> set:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT window_key FROM backfill_checkpoints WHERE job_name = %s AND status = 'done'",
+            (job_name,),
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def save_checkpoint(conn, job_name: str, window_key: str, status: str,
+                    result: Optional[IngestResult] = None, error: Optional[str] = None) -> None:
+    result = result or IngestResult()
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            INSERT INTO backfill_checkpoints (job_name, window_key, status, events, inserted, updated, error, updated_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (job_name, window_key) DO UPDATE SET
+                status = EXCLUDED.status,
+                events = EXCLUDED.events,
+                inserted = EXCLUDED.inserted,
+                updated = EXCLUDED.updated,
+                error = EXCLUDED.error,
+                updated_at = EXCLUDED.updated_at
+        """, (job_name, window_key, status, result.processed, result.inserted, result.updated, error))
+    conn.commit()
+
+
+# ---------------------------------------------------------------------------
+# 소스: FDSN API / 로컬 GeoJSON 디렉터리
+# ---------------------------------------------------------------------------
+
+async def _count_events(client: httpx.AsyncClient, window: Tuple[datetime, datetime]) -> int:
+    response = await client.get(
+        f"{FDSN_BASE_URL}/count",
+        params={"format": "geojson", "starttime": _fdsn_time(window[0]), "endtime": _fdsn_time(window[1])},
+    )
+    response.raise_for_status()
+    return int(response.json()["count"])
+
+
+async def _plan_subwindows(client: httpx.AsyncClient,
+                           window: Tuple[datetime, datetime]) -> List[Tuple[datetime, datetime]]:
+    """이벤트 수가 FDSN 상한을 넘으면 상한 아래가 될 때까지 창을 반으로 나눔"""
+    count = await _count_events(client, window)
+    if count <= FDSN_MAX_EVENTS or window[1] - window[0] <= MIN_WINDOW:
+        return [window] if count else []
+    middle = window[0] + (window[1] - window[0]) / 2
+    return (
+        await _plan_subwindows(client, (window[0], middle))
+        + await _plan_subwindows(client, (middle, window[1]))
+    )
+
+
+async def _stream_fdsn_features(client: httpx.AsyncClient,
+                                window: Tuple[datetime, datetime]) -> AsyncIterator[Dict[str, Any]]:
+    """FDSN 응답 전체를 메모리에 올리지 않고 feature 단위로 스트리밍 파싱"""
+    params = {
+        "format": "geojson",
+        "starttime": _fdsn_time(window[0]),
+        "endtime": _fdsn_time(window[1]),
+        "orderby": "time-asc",
+    }
+    async with client.stream("GET", f"{FDSN_BASE_URL}/query", params=params) as response:
+        response.raise_for_status()
+        async for feature in ijson.items(_AsyncResponseReader(response), "features.item", use_float=True):
+            yield feature
+
+
+async def _ingest_stream(features: AsyncIterator[Dict[str, Any]]) -> IngestResult:
+    """스트리밍 feature를 배치로 묶어 대량 적재 경로에 전달"""
+    result = IngestResult(source="backfill")
+    batch: List[Dict[str, Any]] = []
+
+    async def flush():
+        nonlocal batch
+        rows, batch = batch, []
+        batch_result = await run_db(lambda db: upsert_features(db, rows, source="backfill"))
+        # 백필은 행 목록을 들고 있을 필요가 없으므로 집계만 유지
+        batch_result.changed = []
+        result.merge(batch_result)
+
+    async for feature in features:
+        batch.append(feature)
+        if len(batch) >= INGEST_BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+    return result
+
+
+async def _iter_local_file(path: Path) -> AsyncIterator[Dict[str, Any]]:
+    """로컬 GeoJSON 을 스레드풀에서 INGEST_BATCH_SIZE 개씩 파싱 (서버에서 실행해도 이벤트 루프를 막지 않음)"""
+    f = await run_in_threadpool(open, path, "rb")
+    try:
+        features = ijson.items(f, "features.item", use_float=True)
+        while True:
+            batch = await run_in_threadpool(lambda: list(islice(features, INGEST_BATCH_SIZE)))
+            if not batch:
+                break
+            for feature in batch:
+                yield feature
+    finally:
+        f.close()
+
+
+# ---------------------------------------------------------------------------
+# 작업 실행
+# ---------------------------------------------------------------------------
+
+async def _run_windows(job: BackfillJob, windows: List[Tuple[str, Any]], runner, concurrency: int) -> None:
+    completed = await run_db(lambda db: load_completed_windows(db, job.job_name))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def process(window_key: str, window: Any):
+        if window_key in completed:
+            job.windows_skipped += 1
+            return
+        async with semaphore:
+            try:
+                window_result = await runner(window)
+                job.result.merge(window_result)
+                job.windows_done += 1
+                await run_db(lambda db: save_checkpoint(db, job.job_name, window_key, "done", window_result))
+                logger.info("백필 창 완료", extra={"window": window_key, "processed": window_result.processed})
+            except Exception as e:
+                job.windows_failed += 1
+                job.errors.append(f"{window_key}: {e}")
+                logger.error("백필 창 실패: %s", e, extra={"window": window_key})
+                await run_db(lambda db: save_checkpoint(db, job.job_name, window_key, "failed", error=str(e)))
+
+    job.windows_total = len(windows)
+    await asyncio.gather(*(process(key, window) for key, window in windows))
+
+
+async def run_backfill(job: BackfillJob, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       window_days: float = 7, concurrency: int = 4,
+                       source_dir: Optional[str] = None) -> BackfillJob:
+    """시간 창 단위 백필 실행 (완료된 창은 체크포인트를 보고 건너뜀)"""
+    job.status = "running"
+    job.started_at = datetime.now(timezone.utc)
+    try:
+        if source_dir:
+            files = sorted(
+                p for p in Path(source_dir).iterdir()
+                if p.suffix in (".geojson", ".json") and p.is_file()
+            )
+            windows = [(p.name, p) for p in files]
+            await _run_windows(job, windows, lambda path: _ingest_stream(_iter_local_file(path)), concurrency)
+        else:
+            if start is None or end is None:
+                raise ValueError("FDSN 백필에는 start와 end가 필요합니다")
+            # 적재 중 파티션 생성 잠금이 걸리지 않도록 기간의 월 파티션을 미리 만듦
+            await run_db(lambda db: partitions.ensure_range(db, start, end))
+
+            async with httpx.AsyncClient(timeout=FDSN_TIMEOUT) as client:
+                async def fetch_window(window):
+                    result = IngestResult()
+                    for subwindow in await _plan_subwindows(client, window):
+                        result.merge(await _ingest_stream(_stream_fdsn_features(client, subwindow)))
+                    return result
+
+                windows = [
+                    (_window_key(window), window)
+                    for window in split_windows(start, end, timedelta(days=window_days))
+                ]
+                await _run_windows(job, windows, fetch_window, concurrency)
+
+        # 로컬 파일처럼 기간을 모르고 적재해 기본 파티션으로 들어간 달은 여기서 분리
+        await run_db(partitions.maintain_partitions)
+        job.status = "failed" if job.windows_failed else "completed"
+    except Exception as e:
+        job.status = "failed"
+        job.errors.append(str(e))
+        logger.exception("백필 오류: %s", e)
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+    return job
+
+
+def start_backfill(start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   window_days: float = 7, concurrency: int = 4,
+                   source_dir: Optional[str] = None, job_name: Optional[str] = None) -> BackfillJob:
+    """관리자 엔드포인트용: 백그라운드 태스크로 백필 시작"""
+    job = BackfillJob(
+        job_id=uuid.uuid4().hex,
+        job_name=job_name or (f"dir:{Path(source_dir).resolve()}" if source_dir else "fdsn"),
+    )
+    _jobs[job.job_id] = job
+    task = asyncio.create_task(run_backfill(job, start, end, window_days, concurrency, source_dir))
+    # 태스크가 GC로 사라지지 않도록 완료될 때까지 참조 유지
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+def _parse_date(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="USGS FDSN API 과거 지진 데이터 백필")
+    parser.add_argument("--start", help="시작 시각 (ISO 8601, 예: 2020-01-01)")
+    parser.add_argument("--end", help="종료 시각 (ISO 8601, 미포함)")
+    parser.add_argument("--window-days", type=float, default=7, help="시간 창 크기(일)")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시에 가져올 창 수")
+    parser.add_argument("--source-dir", help="네트워크 대신 사용할 로컬 GeoJSON 디렉터리")
+    parser.add_argument("--job", help="체크포인트 작업 이름 (같은 이름으로 재실행하면 이어서 진행)")
+    args = parser.parse_args()
+
+    from database import get_db
+    from logging_config import configure_logging
+    import migrations
+    configure_logging()
+
+    # 서버를 거치지 않고 빈 DB 에 바로 백필해도 스키마가 준비되도록 마이그레이션 먼저 적용
+    with get_db() as conn:
+        migrations.migrate(conn)
+
+    # 서버 밖에서 실행해도 사전 집계(클러스터/통계/밀도 롤업)가 함께 갱신되도록 적재 훅 등록
+    import clusters  # noqa: F401
+    import density  # noqa: F401
+    import stats  # noqa: F401
+
+    job = BackfillJob(
+        job_id=uuid.uuid4().hex,
+        job_name=args.job or (f"dir:{Path(args.source_dir).resolve()}" if args.source_dir else "fdsn"),
+    )
+    asyncio.run(run_backfill(
+        job,
+        _parse_date(args.start) if args.start else None,
+        _parse_date(args.end) if args.end else None,
+        args.window_days,
+        args.concurrency,
+        args.source_dir,
+    ))
+    print(job.to_dict())
+
+
+if __name__ == "__main__":
+    main()
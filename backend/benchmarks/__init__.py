@@ -0,0 +1 @@
+"""합성 지진 카탈로그 생성기와 엔드포인트 벤치마크 (사용법: cd backend && python -m benchmarks --help)"""
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.generator import CATALOG_SIZES, default_window, load_catalog, reset_catalog
+from benchmarks.runner import compare, run_benchmarks
+from benchmarks.workloads import SyntheticFeed, build_workloads
+from database import get_db
+from logging_config import configure_logging
+import migrations
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _parse_date(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _window(args) -> tuple:
+    start, end = default_window()
+    return (_parse_date(args.start) if args.start else start, _parse_date(args.end) if args.end else end)
+
+
+def cmd_generate(args) -> int:
+    # 서버 밖에서 적재해도 사전 집계(클러스터/통계/밀도 롤업)가 함께 갱신되도록 적재 훅 등록
+    import clusters  # noqa: F401
+    import density  # noqa: F401
+    import stats  # noqa: F401
+
+    rows = args.rows or CATALOG_SIZES[args.size]
+    start, end = _window(args)
+    with get_db() as conn:
+        migrations.migrate(conn)
+        if args.reset:
+            print(f"이전 합성 이벤트 {reset_catalog(conn):,}개 삭제")
+        result = load_catalog(conn, rows, args.seed, start, end)
+    print(json.dumps(result.counts()))
+    return 0
+
+
+def cmd_run(args) -> int:
+    start, end = _window(args)
+    workloads = build_workloads(args.seed, start, end)
+    names = args.workloads.split(",") if args.workloads else list(workloads)
+    unknown = [name for name in names if name not in workloads]
+    if unknown:
+        print(f"알 수 없는 워크로드: {', '.join(unknown)} (가능: {', '.join(workloads)})")
+        return 2
+
+    document = asyncio.run(run_benchmarks(
+        [workloads[name] for name in names],
+        args.requests, args.concurrency, args.warmup, args.seed,
+        base_url=args.base_url,
+        feed=SyntheticFeed(args.seed, start, end),
+    ))
+    document["config"].update({"catalog_start": start.isoformat(), "catalog_end": end.isoformat()})
+
+    output = Path(args.output) if args.output else RESULTS_DIR / (
+        f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}-{(document['environment']['git_commit'] or 'nogit')[:12]}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, indent=2, ensure_ascii=False))
+    print(f"결과 저장: {output}")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    base = json.loads(Path(args.base).read_text())
+    new = json.loads(Path(args.new).read_text())
+    rows, regressed = compare(base, new, args.threshold)
+    print(f"{base['environment']['git_commit']} -> {new['environment']['git_commit']}")
+    for row in rows:
+        changes = ", ".join(
+            f"{metric} {row[metric]:+.1%}" if row[metric] is not None else f"{metric} -"
+            for metric in ("p50", "p95", "p99", "throughput_rps")
+        )
+        print(f"[{'REGRESSION' if row['regressed'] else 'OK'}] {row['workload']}: {changes}")
+    return 1 if regressed else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="합성 카탈로그 생성 및 엔드포인트 벤치마크")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def window_args(command):
+        command.add_argument("--seed", type=int, default=42, help="카탈로그/요청 난수 시드")
+        command.add_argument("--start", help="카탈로그 시작 시각 (기본: 이번 달 초부터 5년 전)")
+        command.add_argument("--end", help="카탈로그 종료 시각 (미포함, 기본: 이번 달 초)")
+
+    generate = commands.add_parser("generate", help="합성 카탈로그를 적재 경로로 적재")
+    generate.add_argument("--size", choices=list(CATALOG_SIZES), default="small",
+                          help=", ".join(f"{name}={rows:,}" for name, rows in CATALOG_SIZES.items()))
+    generate.add_argument("--rows", type=int, help="행 수 직접 지정 (10,000 ~ 50,000,000)")
+    generate.add_argument("--reset", action="store_true", help="이전에 생성한 합성 이벤트를 먼저 삭제")
+    window_args(generate)
+    generate.set_defaults(func=cmd_generate)
+
+    run = commands.add_parser("run", help="워크로드 실행 후 결과 JSON 저장")
+    run.add_argument("--workloads", help="쉼표로 구분한 워크로드 (기본: 전체 - list,radius,region,boundary,stats,sync)")
+    run.add_argument("--requests", type=int, default=200, help="워크로드당 측정 요청 수")
+    run.add_argument("--concurrency", type=int, default=8, help="동시 요청 수")
+    run.add_argument("--warmup", type=int, default=10, help="측정 전에 보내는 요청 수")
+    run.add_argument("--base-url", help="실행 중인 서버 주소 (생략하면 앱을 프로세스 안에서 실행해 DB 시간까지 측정)")
+    run.add_argument("--output", help="결과 파일 경로 (기본: benchmarks/results/<시각>-<커밋>.json)")
+    window_args(run)
+    run.set_defaults(func=cmd_run)
+
+    comparison = commands.add_parser("compare", help="두 결과 파일 비교 (p95 회귀가 있으면 종료 코드 1)")
+    comparison.add_argument("base")
+    comparison.add_argument("new")
+    comparison.add_argument("--threshold", type=float, default=0.10, help="회귀로 볼 p95 증가율")
+    comparison.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    configure_logging()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,244 @@
+import logging
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ingest import IngestResult, upsert_features
+import clusters
+import density
+import partitions
+import stats
+
+logger = logging.getLogger(__name__)
+
+# 합성 이벤트 id 접두사 - 실제 USGS id 와 겹치지 않고, --reset 시 이 접두사만 지움
+BENCHMARK_ID_PREFIX = "bm"
+# 규모 프리셋 (행 수)
+CATALOG_SIZES = {
+    "small": 10_000,
+    "medium": 1_000_000,
+    "large": 10_000_000,
+    "xlarge": 50_000_000,
+}
+MIN_ROWS = CATALOG_SIZES["small"]
+MAX_ROWS = CATALOG_SIZES["xlarge"]
+# upsert_features 한 번에 넘기는 feature 수 (결과의 변경 행 목록이 이만큼만 메모리에 쌓임)
+LOAD_CHUNK_SIZE = 50_000
+
+# Gutenberg-Richter 분포 (b 값, 하한/상한 규모)
+GR_B_VALUE = 1.0
+MIN_MAGNITUDE = 1.0
+MAX_MAGNITUDE = 9.5
+# 이 규모 이상은 본진으로 기억해 두고 일부 이벤트를 그 여진으로 생성
+MAINSHOCK_MAGNITUDE = 5.0
+AFTERSHOCK_FRACTION = 0.3
+# 판 경계에서 떨어진 거리의 표준편차 (km)
+BOUNDARY_SPREAD_KM = 40.0
+AFTERSHOCK_SPREAD_KM = 15.0
+KM_PER_DEGREE = 111.32
+
+# 주요 판 경계 근사 (이름, 상대 발생률, 섭입대 여부, (경도, 위도) 꼭짓점)
+PLATE_BOUNDARIES: List[Tuple[str, float, bool, List[Tuple[float, float]]]] = [
+    ("Kuril-Japan-Izu Trench", 3.0, True, [
+        (162.0, 56.0), (155.0, 49.0), (147.0, 43.5), (142.5, 38.0), (141.5, 34.0), (142.0, 27.0),
+    ]),
+    ("Philippine-Indonesia Arc", 2.5, True, [
+        (125.0, 24.0), (126.5, 13.0), (126.0, 6.0), (123.0, -1.0), (118.0, -9.0), (106.0, -8.0),
+        (96.0, 3.0), (93.0, 12.0),
+    ]),
+    ("Tonga-Kermadec-New Zealand", 2.0, True, [
+        (-173.0, -15.0), (-175.0, -22.0), (-177.5, -30.0), (179.0, -37.0), (175.0, -41.0), (168.0, -46.0),
+    ]),
+    ("Aleutian-Alaska", 1.5, True, [
+        (170.0, 52.5), (-175.0, 51.5), (-165.0, 53.5), (-155.0, 57.0), (-147.0, 60.5),
+    ]),
+    ("Cascadia-California", 1.5, False, [
+        (-127.0, 50.0), (-125.0, 44.0), (-124.0, 40.5), (-122.0, 37.5), (-117.5, 34.0), (-115.5, 32.5),
+    ]),
+    ("Central America Trench", 1.2, True, [
+        (-106.0, 19.0), (-99.0, 16.0), (-92.0, 14.0), (-86.0, 11.0), (-82.0, 8.0),
+    ]),
+    ("Andes", 2.0, True, [
+        (-79.0, 2.0), (-81.0, -5.0), (-76.0, -14.0), (-71.0, -19.0), (-71.5, -30.0), (-74.0, -40.0),
+        (-75.5, -47.0),
+    ]),
+    ("Alpine-Himalayan Belt", 2.0, False, [
+        (-10.0, 36.0), (5.0, 37.0), (15.0, 38.0), (22.0, 38.5), (30.0, 39.5), (44.0, 38.0),
+        (52.0, 34.0), (62.0, 30.0), (72.0, 35.0), (80.0, 30.5), (88.0, 27.5), (95.0, 26.0),
+    ]),
+    ("Mid-Atlantic Ridge", 0.8, False, [
+        (-18.0, 66.0), (-30.0, 55.0), (-28.0, 39.0), (-45.0, 25.0), (-33.0, 5.0), (-14.0, -5.0),
+        (-13.0, -25.0), (-15.0, -45.0),
+    ]),
+]
+
+COMPASS = ("N", "NE", "E", "SE", "S", "SW", "W", "NW")
+
+
+def _unwrap(lon: float, reference: float) -> float:
+    """reference 에서 가까운 쪽으로 경도를 옮김 (날짜변경선을 넘는 변 보간용)"""
+    while lon - reference > 180:
+        lon -= 360
+    while lon - reference < -180:
+        lon += 360
+    return lon
+
+
+def _wrap(lon: float) -> float:
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+def _segments() -> List[Tuple[str, bool, Tuple[float, float], Tuple[float, float], float]]:
+    """(경계 이름, 섭입대 여부, 시작점, 끝점, 발생률 x 길이 가중치)"""
+    segments = []
+    for name, rate, subduction, vertices in PLATE_BOUNDARIES:
+        for (lon0, lat0), (lon1, lat1) in zip(vertices, vertices[1:]):
+            lon1 = _unwrap(lon1, lon0)
+            mid_lat = math.radians((lat0 + lat1) / 2)
+            length = math.hypot((lon1 - lon0) * math.cos(mid_lat), lat1 - lat0)
+            segments.append((name, subduction, (lon0, lat0), (lon1, lat1), rate * length))
+    return segments
+
+
+class CatalogGenerator:
+    """판 경계를 따라 군집하고 규모가 거듭제곱 분포를 따르는 합성 USGS GeoJSON feature 생성기
+
+    같은 seed, 기간, 행 수면 항상 같은 카탈로그(같은 id)를 만든다.
+    """
+
+    def __init__(self, seed: int, start: datetime, end: datetime):
+        self.seed = seed
+        self.start = start
+        self.end = end
+        self.rng = random.Random(seed)
+        self._segments = _segments()
+        self._weights = []
+        total = 0.0
+        for segment in self._segments:
+            total += segment[4]
+            self._weights.append(total)
+        self._mainshocks: List[Tuple[float, float, float, float, bool]] = []
+
+    def boundary_point(self, rng: Optional[random.Random] = None,
+                       spread_km: float = BOUNDARY_SPREAD_KM) -> Tuple[float, float, str, bool]:
+        """발생률 가중으로 고른 판 경계 근처 점 (경도, 위도, 경계 이름, 섭입대 여부)"""
+        rng = rng or self.rng
+        name, subduction, (lon0, lat0), (lon1, lat1), _ = self._segments[
+            _bisect(self._weights, rng.random() * self._weights[-1])
+        ]
+        t = rng.random()
+        lon, lat = _offset(lon0 + (lon1 - lon0) * t, lat0 + (lat1 - lat0) * t, rng, spread_km)
+        return lon, lat, name, subduction
+
+    def _magnitude(self, upper: float = MAX_MAGNITUDE) -> float:
+        """[MIN_MAGNITUDE, upper] 로 잘린 Gutenberg-Richter 분포 역변환 표본"""
+        span = 1 - 10 ** (-GR_B_VALUE * (upper - MIN_MAGNITUDE))
+        return MIN_MAGNITUDE - math.log10(1 - self.rng.random() * span) / GR_B_VALUE
+
+    def _depth(self, subduction: bool) -> float:
+        if subduction and self.rng.random() < 0.25:
+            # 섭입 슬랩을 따라 발생하는 중/심발 지진
+            return self.rng.uniform(70, 650)
+        return min(self.rng.expovariate(1 / 12), 70)
+
+    def _event(self) -> Tuple[float, float, str, bool, float, float, datetime]:
+        span_seconds = (self.end - self.start).total_seconds()
+        if self._mainshocks and self.rng.random() < AFTERSHOCK_FRACTION:
+            lon, lat, main_magnitude, main_offset, subduction = self.rng.choice(self._mainshocks)
+            lon, lat = _offset(lon, lat, self.rng, AFTERSHOCK_SPREAD_KM)
+            # 오모리 법칙 근사 - 본진 직후에 몰리고 길게 이어지는 지연 (최대 30일)
+            delay = min(60 * ((1 - self.rng.random()) ** (-1 / 0.1) - 1), 30 * 86400)
+            offset = min(main_offset + delay, span_seconds - 1)
+            name = "aftershock zone"
+            magnitude = self._magnitude(main_magnitude - 0.5)
+        else:
+            lon, lat, name, subduction = self.boundary_point()
+            offset = self.rng.random() * span_seconds
+            magnitude = self._magnitude()
+            if magnitude >= MAINSHOCK_MAGNITUDE:
+                if len(self._mainshocks) >= 1000:
+                    self._mainshocks.pop(self.rng.randrange(len(self._mainshocks)))
+                self._mainshocks.append((lon, lat, magnitude, offset, subduction))
+        return lon, lat, name, subduction, magnitude, self._depth(subduction), \
+            self.start + timedelta(seconds=offset)
+
+    def feature(self, index: int) -> Dict[str, Any]:
+        lon, lat, name, _, magnitude, depth, time = self._event()
+        event_id = f"{BENCHMARK_ID_PREFIX}{self.seed:x}x{index:09d}"
+        time_ms = int(time.timestamp() * 1000)
+        return {
+            "type": "Feature",
+            "id": event_id,
+            "properties": {
+                "mag": round(magnitude, 2),
+                "place": f"{self.rng.randint(1, 120)} km {self.rng.choice(COMPASS)} of {name} (synthetic)",
+                "time": time_ms,
+                "updated": time_ms + self.rng.randint(0, 86_400_000),
+                "url": f"https://example.invalid/benchmark/{event_id}",
+                "detail": None,
+                "ids": f",{event_id},",
+            },
+            "geometry": {"type": "Point", "coordinates": [round(lon, 5), round(lat, 5), round(depth, 2)]},
+        }
+
+    def features(self, rows: int, first_index: int = 0) -> Iterator[Dict[str, Any]]:
+        for index in range(first_index, first_index + rows):
+            yield self.feature(index)
+
+
+def _bisect(cumulative: List[float], value: float) -> int:
+    lo, hi = 0, len(cumulative) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if cumulative[mid] < value:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _offset(lon: float, lat: float, rng: random.Random, spread_km: float) -> Tuple[float, float]:
+    """정규분포 거리만큼 임의 방향으로 옮긴 점 (극 근처는 위도를 잘라 냄)"""
+    dy = rng.gauss(0, spread_km) / KM_PER_DEGREE
+    dx = rng.gauss(0, spread_km) / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.05))
+    return _wrap(lon + dx), max(-89.9, min(89.9, lat + dy))
+
+
+def reset_catalog(conn) -> int:
+    """이전에 생성한 합성 이벤트를 지우고 사전 집계를 다시 만듦"""
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM earthquakes WHERE id LIKE %s", (BENCHMARK_ID_PREFIX + "%",))
+        deleted = cursor.rowcount
+    conn.commit()
+    if deleted:
+        stats.rebuild_rollups(conn)
+        clusters.rebuild_clusters(conn)
+        density.rebuild_density(conn)
+    return deleted
+
+
+def load_catalog(conn, rows: int, seed: int, start: datetime, end: datetime,
+                 chunk_size: int = LOAD_CHUNK_SIZE) -> IngestResult:
+    """합성 카탈로그를 동기화/백필과 같은 적재 경로(COPY 스테이징 + 업서트 + 적재 훅)로 적재"""
+    if not MIN_ROWS <= rows <= MAX_ROWS:
+        raise ValueError(f"행 수는 {MIN_ROWS:,} ~ {MAX_ROWS:,} 사이여야 합니다")
+    partitions.ensure_range(conn, start, end)
+
+    generator = CatalogGenerator(seed, start, end)
+    total = IngestResult(source="benchmark")
+    for first in range(0, rows, chunk_size):
+        result = upsert_features(conn, generator.features(min(chunk_size, rows - first), first),
+                                 source="benchmark")
+        # 변경 행 목록은 훅/리스너에서 이미 쓰였으므로 건수만 누적
+        result.changed = []
+        total.merge(result)
+        logger.info("합성 카탈로그 적재", extra={"loaded": first + result.processed, "rows": rows,
+                                                "inserted": total.inserted, "updated": total.updated})
+    return total
+
+
+def default_window(years: float = 5.0) -> Tuple[datetime, datetime]:
+    """기본 생성 기간 - 이번 달 초까지 years 년"""
+    end = partitions.month_start(datetime.now(timezone.utc))
+    return end - timedelta(days=round(365.25 * years)), end
@@ -0,0 +1,212 @@
+import asyncio
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+import metrics
+from benchmarks.workloads import SyntheticFeed, Workload
+from database import close_pool, get_db, run_db
+
+# 결과 JSON 형식 버전 (필드 의미가 바뀌면 올림)
+RESULT_SCHEMA_VERSION = 1
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """선형 보간 백분위수 (q: 0~100)"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+async def run_workload(client: httpx.AsyncClient, workload: Workload, requests: int, concurrency: int,
+                       warmup: int, seed: int, measure_db: bool) -> Dict[str, Any]:
+    """워크로드 요청을 concurrency 개 작업자로 보내고 지연 시간 분포/처리량/DB 시간 요약"""
+    rng = random.Random(f"{seed}:{workload.name}")
+    specs = [workload.build(rng) for _ in range(warmup + requests)]
+    for spec in specs[:warmup]:
+        await client.request(**spec)
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    response_bytes = 0
+    queue = iter(specs[warmup:])
+
+    async def worker():
+        nonlocal response_bytes
+        for spec in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.request(**spec)
+                elapsed = time.perf_counter() - started
+                if response.status_code >= 400:
+                    key = str(response.status_code)
+                    errors[key] = errors.get(key, 0) + 1
+                    continue
+                latencies.append(elapsed)
+                response_bytes += len(response.content)
+            except httpx.HTTPError as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    db_before = metrics.db_time_totals()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    db_after = metrics.db_time_totals()
+
+    latencies.sort()
+    latencies_ms = [value * 1000 for value in latencies]
+    completed = len(latencies)
+    summary: Dict[str, Any] = {
+        "description": workload.description,
+        "requests": requests,
+        "completed": completed,
+        "errors": errors,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(completed / wall, 2) if wall > 0 else None,
+        "latency_ms": {
+            "mean": round(sum(latencies_ms) / completed, 3) if completed else None,
+            "p50": _round(percentile(latencies_ms, 50)),
+            "p95": _round(percentile(latencies_ms, 95)),
+            "p99": _round(percentile(latencies_ms, 99)),
+            "max": _round(latencies_ms[-1] if latencies_ms else None),
+        },
+        "response_bytes_mean": round(response_bytes / completed) if completed else None,
+        "db": None,
+    }
+    if measure_db:
+        db_seconds = db_after[0] - db_before[0]
+        attempts = completed + sum(errors.values())
+        summary["db"] = {
+            "total_ms": round(db_seconds * 1000, 3),
+            "per_request_ms": round(db_seconds * 1000 / attempts, 3) if attempts else None,
+            "statements": db_after[1] - db_before[1],
+        }
+    return summary
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """비교 시 같은 조건인지 확인할 수 있도록 커밋/DB/카탈로그 크기 기록"""
+    info: Dict[str, Any] = {
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+    with get_db() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT current_setting('server_version'), postgis_lib_version()")
+            info["postgres"], info["postgis"] = cursor.fetchone()
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = 'earthquakes'")
+            row = cursor.fetchone()
+            info["earthquakes_estimated_rows"] = row[0] if row else None
+    return info
+
+
+def _feed_transport(feed: SyntheticFeed) -> httpx.MockTransport:
+    """동기화 스케줄러의 USGS 요청에 합성 피드로 응답 (폴링마다 새 ETag)"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = feed.poll()
+        return httpx.Response(200, json=body, headers={"ETag": f'"benchmark-{feed.polls}"'})
+    return httpx.MockTransport(handler)
+
+
+async def run_benchmarks(workloads: List[Workload], requests: int, concurrency: int, warmup: int,
+                         seed: int, base_url: Optional[str] = None,
+                         feed: Optional[SyntheticFeed] = None) -> Dict[str, Any]:
+    """워크로드를 차례로 실행해 결과 문서(JSON 직렬화 가능) 생성
+
+    base_url 이 없으면 앱을 프로세스 안에서(ASGI) 실행해 DB 시간(계측 커서 합계)까지 기록하고,
+    있으면 실행 중인 서버에 HTTP 로 요청한다 (DB 시간은 기록하지 않음).
+    """
+    in_process = base_url is None
+    if in_process:
+        import main
+        from scheduler import sync_scheduler
+
+        if not main.init_database_tables():
+            raise RuntimeError("데이터베이스 초기화 실패")
+        if main.snapshot.SNAPSHOT_ENABLED:
+            # ASGI 전송은 lifespan 을 실행하지 않으므로 스냅샷을 직접 구축
+            await run_db(main.snapshot.hot_snapshot.rebuild)
+        if feed is not None:
+            sync_scheduler._client = httpx.AsyncClient(transport=_feed_transport(feed))
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://benchmark",
+                                   timeout=None)
+    else:
+        client = httpx.AsyncClient(base_url=base_url, timeout=None)
+
+    document: Dict[str, Any] = {
+        "schema_version": RESULT_SCHEMA_VERSION,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "mode": "in-process" if in_process else "http",
+        "base_url": base_url,
+        "config": {"requests": requests, "concurrency": concurrency, "warmup": warmup, "seed": seed},
+        "environment": environment(),
+        "workloads": {},
+    }
+    try:
+        for workload in workloads:
+            if workload.in_process_only and not in_process:
+                print(f"[{workload.name}] 외부 네트워크를 쓰므로 --base-url 실행에서는 건너뜀")
+                continue
+            summary = await run_workload(client, workload, requests, concurrency, warmup, seed, in_process)
+            document["workloads"][workload.name] = summary
+            latency = summary["latency_ms"]
+            print(f"[{workload.name}] p50 {latency['p50']}ms / p95 {latency['p95']}ms / p99 {latency['p99']}ms, "
+                  f"{summary['throughput_rps']} req/s, 오류 {sum(summary['errors'].values())}건")
+    finally:
+        await client.aclose()
+        if in_process:
+            await sync_scheduler.stop()
+            close_pool()
+    document["finished_at"] = datetime.now(timezone.utc).isoformat()
+    return document
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> Tuple[List[Dict[str, Any]], bool]:
+    """두 결과의 워크로드별 지연 시간/처리량 변화율 - p95 가 threshold 이상 느려지면 회귀"""
+    rows = []
+    regressed = False
+    for name, new_summary in new["workloads"].items():
+        base_summary = base["workloads"].get(name)
+        if base_summary is None:
+            continue
+        row: Dict[str, Any] = {"workload": name}
+        for metric in ("p50", "p95", "p99"):
+            before, after = base_summary["latency_ms"][metric], new_summary["latency_ms"][metric]
+            row[metric] = _change(before, after)
+        row["throughput_rps"] = _change(base_summary["throughput_rps"], new_summary["throughput_rps"])
+        row["regressed"] = row["p95"] is not None and row["p95"] > threshold
+        regressed = regressed or row["regressed"]
+        rows.append(row)
+    return rows, regressed
+
+
+def _change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if not before or after is None:
+        return None
+    return round((after - before) / before, 4)
@@ -0,0 +1,135 @@
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+from benchmarks.generator import CatalogGenerator
+
+RequestSpec = Dict[str, Any]  # httpx.AsyncClient.request 인자 (method, url, params, json)
+
+
+@dataclass
+class Workload:
+    """엔드포인트 하나에 대한 요청 스크립트 - 같은 seed 면 같은 요청 순서를 만든다"""
+    name: str
+    description: str
+    build: Callable[[random.Random], RequestSpec]
+    # 외부 네트워크(USGS 피드)를 쓰는 워크로드는 프로세스 내 실행에서만 가짜 피드로 돌림
+    in_process_only: bool = False
+
+
+def _iso(value: datetime) -> str:
+    return value.isoformat()
+
+
+def _window(rng: random.Random, start: datetime, end: datetime, max_days: int) -> Dict[str, str]:
+    """카탈로그 기간 안의 임의 구간 (1일 ~ max_days 일)"""
+    days = rng.randint(1, max_days)
+    span = max((end - start).total_seconds() - days * 86400, 0)
+    lo = start + timedelta(seconds=rng.random() * span)
+    return {"start_time": _iso(lo), "end_time": _iso(min(lo + timedelta(days=days), end))}
+
+
+def _filters(rng: random.Random, start: datetime, end: datetime) -> Dict[str, Any]:
+    """검색 필터 조합을 골고루 섞음 (필터 없음 / 기간 / 규모 / 기간+규모+깊이+개수)"""
+    choice = rng.randrange(4)
+    if choice == 1:
+        return _window(rng, start, end, 90)
+    if choice == 2:
+        return {"min_magnitude": rng.choice([2.5, 4.5, 5.0])}
+    if choice == 3:
+        return {**_window(rng, start, end, 365), "min_magnitude": 4.5, "max_depth": 70, "limit": 100}
+    return {}
+
+
+def _box_wkt(lon: float, lat: float, half_deg: float) -> str:
+    lat0, lat1 = max(lat - half_deg, -89.0), min(lat + half_deg, 89.0)
+    lon0, lon1 = lon - half_deg, lon + half_deg
+    return (f"POLYGON(({lon0:.3f} {lat0:.3f}, {lon1:.3f} {lat0:.3f}, {lon1:.3f} {lat1:.3f}, "
+            f"{lon0:.3f} {lat1:.3f}, {lon0:.3f} {lat0:.3f}))")
+
+
+def build_workloads(seed: int, start: datetime, end: datetime) -> Dict[str, Workload]:
+    """main.py 엔드포인트별 워크로드 (검색 지점은 합성 카탈로그와 같은 판 경계에서 뽑음)"""
+    catalog = CatalogGenerator(seed, start, end)
+    # 실제 지도 사용처럼 같은 다각형이 반복되도록 고정된 지역 집합에서 고름
+    polygon_rng = random.Random(seed)
+    regions = [
+        _box_wkt(*catalog.boundary_point(polygon_rng)[:2], polygon_rng.choice([1.0, 3.0, 8.0]))
+        for _ in range(16)
+    ]
+
+    def list_request(rng: random.Random) -> RequestSpec:
+        params: Dict[str, Any] = {"limit": rng.choice([100, 500, 1000])}
+        if rng.random() < 0.5:
+            params["min_magnitude"] = rng.choice([2.5, 4.5])
+        return {"method": "GET", "url": "/api/earthquakes", "params": params}
+
+    def radius_request(rng: random.Random) -> RequestSpec:
+        lon, lat, _, _ = catalog.boundary_point(rng)
+        body = {"latitude": lat, "longitude": lon, "radius_km": rng.choice([50, 200, 500]),
+                **_filters(rng, start, end)}
+        return {"method": "POST", "url": "/api/earthquakes/search/radius", "json": body}
+
+    def region_request(rng: random.Random) -> RequestSpec:
+        body = {"polygon_wkt": rng.choice(regions), **_filters(rng, start, end)}
+        return {"method": "POST", "url": "/api/earthquakes/search/region", "json": body}
+
+    def boundary_request(rng: random.Random) -> RequestSpec:
+        lon, lat, _, _ = catalog.boundary_point(rng)
+        body = {"latitude": lat, "longitude": lon, "radius_km": rng.choice([200, 500]),
+                "weighted_centroid": True, "concave_hull_ratio": 0.8, "density_cell_deg": 1.0,
+                **_filters(rng, start, end)}
+        return {"method": "POST", "url": "/api/earthquakes/boundary/search", "json": body}
+
+    def stats_request(rng: random.Random) -> RequestSpec:
+        params: Dict[str, Any] = {}
+        if rng.random() < 0.75:
+            params = _window(rng, start, end, 365)
+        return {"method": "GET", "url": "/api/earthquakes/stats", "params": params}
+
+    def sync_request(rng: random.Random) -> RequestSpec:
+        return {"method": "GET", "url": "/api/earthquakes/sync"}
+
+    workloads = [
+        Workload("list", "최신 목록 (limit/min_magnitude)", list_request),
+        Workload("radius", "판 경계 근처 반경 검색 + 필터 조합", radius_request),
+        Workload("region", "고정 지역 다각형 16개 내 검색 + 필터 조합", region_request),
+        Workload("boundary", "반경 조건 경계 통계 (가중 중심/오목 껍질/격자 밀도)", boundary_request),
+        Workload("stats", "기간 통계 (전체 또는 1~365일)", stats_request),
+        Workload("sync", "합성 all_day 피드 동기화 (갱신 + 신규)", sync_request, in_process_only=True),
+    ]
+    return {workload.name: workload for workload in workloads}
+
+
+class SyntheticFeed:
+    """USGS all_day.geojson 대신 응답하는 합성 피드 - 폴링마다 새 이벤트를 추가하고 일부 이벤트를 갱신"""
+
+    def __init__(self, seed: int, start: datetime, end: datetime, size: int = 1000, changes_per_poll: int = 50):
+        self.catalog = CatalogGenerator(seed + 1, start, end)
+        self.rng = random.Random(seed + 1)
+        self.size = size
+        self.changes_per_poll = changes_per_poll
+        self.features: List[Dict[str, Any]] = []
+        self.next_index = 0
+        self.polls = 0
+
+    def poll(self) -> Dict[str, Any]:
+        self.polls += 1
+        # 워터마크 이후 updated 만 적재되므로 바뀐 이벤트의 updated 는 현재 시각으로 둠
+        now_ms = int(time.time() * 1000)
+        count = self.size if not self.features else self.changes_per_poll
+        for _ in range(count):
+            feature = self.catalog.feature(self.next_index)
+            feature["properties"]["updated"] = now_ms
+            self.features.append(feature)
+            self.next_index += 1
+        del self.features[:-self.size]
+        # USGS 검토로 규모가 바뀐 것처럼 기존 이벤트 일부를 갱신
+        existing = self.features[:-count] or self.features
+        for feature in self.rng.sample(existing, min(self.changes_per_poll, len(existing))):
+            properties = feature["properties"]
+            properties["mag"] = round(max(properties["mag"] + self.rng.choice([-0.1, 0.1]), 0), 2)
+            properties["updated"] = now_ms
+        return {"type": "FeatureCollection", "features": self.features}
@@ -0,0 +1,202 @@
+import os
+from typing import List, Tuple
+
+import psycopg2.extras
+
+from ingest import IngestResult, lock_rollups, register_ingest_db_hook
+
+# 화면 해상도 기준 격자: 256px 타일 하나를 CELLS_PER_TILE x CELLS_PER_TILE 칸으로 나눔
+CLUSTER_CELLS_PER_TILE = int(os.getenv("CLUSTER_CELLS_PER_TILE", "8"))
+# 이 줌 레벨까지는 earthquake_clusters 테이블에 미리 집계
+CLUSTER_PRECOMPUTE_MAX_ZOOM = int(os.getenv("CLUSTER_PRECOMPUTE_MAX_ZOOM", "6"))
+CLUSTER_MAX_ZOOM = 20
+
+BBox = Tuple[float, float, float, float]
+
+
+def cell_size(zoom: int) -> float:
+    """줌 레벨별 격자 한 칸의 크기(도) - 줌이 1 오를 때마다 절반"""
+    return 360.0 / (2 ** zoom * CLUSTER_CELLS_PER_TILE)
+
+
+def split_bbox(min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> List[BBox]:
+    """날짜변경선을 넘거나 0~360 경도(태평양 중심 지도)로 들어온 bbox를 -180~180 범위 조각으로 분할"""
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    if max_lon - min_lon >= 360:
+        return [(-180.0, min_lat, 180.0, max_lat)]
+
+    def wrap(lon: float) -> float:
+        return ((lon + 180.0) % 360.0) - 180.0
+
+    west, east = wrap(min_lon), wrap(max_lon)
+    if east == -180.0 and max_lon > min_lon:
+        east = 180.0
+    if west <= east:
+        return [(west, min_lat, east, max_lat)]
+    return [(west, min_lat, 180.0, max_lat), (-180.0, min_lat, east, max_lat)]
+
+
+# SQL 쪽 셀 번호 계산 (Python과 부동소수 경계 판정이 어긋나지 않도록 항상 DB에서 계산)
+_CELL_X = "floor((ST_X({geom}) + 180) / {size})::int"
+_CELL_Y = "LEAST(floor((ST_Y({geom}) + 90) / {size})::int, {max_y})"
+
+
+def cell_exprs(geom: str, zoom: int) -> Tuple[str, str]:
+    size = cell_size(zoom)
+    max_y = int(180 / size) - 1
+    return (
+        _CELL_X.format(geom=geom, size=repr(size)),
+        _CELL_Y.format(geom=geom, size=repr(size), max_y=max_y),
+    )
+
+
+def _rollup_parents(cursor, zoom: int, parent_filter: str = "", params: tuple = ()) -> None:
+    """zoom+1 레벨 셀을 합쳐 zoom 레벨 셀을 다시 계산"""
+    cursor.execute(f"""
+        INSERT INTO earthquake_clusters
+            (zoom, cell_x, cell_y, event_count, max_magnitude, latest_time, sum_longitude, sum_latitude)
+        SELECT %s, cell_x / 2, cell_y / 2, SUM(event_count), MAX(max_magnitude), MAX(latest_time),
+               SUM(sum_longitude), SUM(sum_latitude)
+        FROM earthquake_clusters
+        WHERE zoom = %s {parent_filter}
+        GROUP BY cell_x / 2, cell_y / 2
+    """, (zoom, zoom + 1) + params)
+
+
+def rebuild_clusters(conn) -> None:
+    """사전 집계 전체 재생성 (최초 구축 또는 복구용)"""
+    finest = CLUSTER_PRECOMPUTE_MAX_ZOOM
+    cell_x, cell_y = cell_exprs("location::geometry", finest)
+    with conn.cursor() as cursor:
+        lock_rollups(cursor)
+        cursor.execute("TRUNCATE earthquake_clusters")
+        cursor.execute(f"""
+            INSERT INTO earthquake_clusters
+                (zoom, cell_x, cell_y, event_count, max_magnitude, latest_time, sum_longitude, sum_latitude)
+            SELECT %s, {cell_x}, {cell_y}, COUNT(*), MAX(magnitude), MAX(time),
+                   SUM(ST_X(location::geometry)), SUM(ST_Y(location::geometry))
+            FROM earthquakes
+            WHERE location IS NOT NULL
+            GROUP BY 2, 3
+        """, (finest,))
+        for zoom in range(finest - 1, -1, -1):
+            _rollup_parents(cursor, zoom)
+    conn.commit()
+
+
+def refresh_changed_cells(cursor, result: IngestResult) -> None:
+    """적재로 바뀐 이벤트가 속한(또는 속했던) 셀만 가장 세밀한 줌에서 다시 집계하고 상위 줌으로 올림"""
+    lons, lats = [], []
+    for event in result.changed:
+        lons.append(event.longitude)
+        lats.append(event.latitude)
+        if event.prev_longitude is not None and event.prev_latitude is not None:
+            lons.append(event.prev_longitude)
+            lats.append(event.prev_latitude)
+    if not lons:
+        return
+
+    finest = CLUSTER_PRECOMPUTE_MAX_ZOOM
+    size = cell_size(finest)
+    point_x, point_y = cell_exprs("ST_MakePoint(p.lon, p.lat)", finest)
+    event_x, event_y = cell_exprs("e.location::geometry", finest)
+
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS cluster_dirty_cells (
+            zoom SMALLINT, cell_x INTEGER, cell_y INTEGER
+        ) ON COMMIT DROP
+    """)
+    cursor.execute("TRUNCATE cluster_dirty_cells")
+    cursor.execute(f"""
+        INSERT INTO cluster_dirty_cells
+        SELECT DISTINCT %s::smallint, {point_x}, {point_y}
+        FROM unnest(%s::float8[], %s::float8[]) AS p(lon, lat)
+    """, (finest, lons, lats))
+
+    cursor.execute("""
+        DELETE FROM earthquake_clusters c
+        USING cluster_dirty_cells d
+        WHERE c.zoom = d.zoom AND c.cell_x = d.cell_x AND c.cell_y = d.cell_y
+    """)
+    cursor.execute(f"""
+        INSERT INTO earthquake_clusters
+            (zoom, cell_x, cell_y, event_count, max_magnitude, latest_time, sum_longitude, sum_latitude)
+        SELECT d.zoom, d.cell_x, d.cell_y, COUNT(*), MAX(e.magnitude), MAX(e.time),
+               SUM(ST_X(e.location::geometry)), SUM(ST_Y(e.location::geometry))
+        FROM cluster_dirty_cells d
+        JOIN earthquakes e
+          ON e.location::geometry && ST_MakeEnvelope(
+                 -180 + d.cell_x * {size!r}, -90 + d.cell_y * {size!r},
+                 -180 + (d.cell_x + 1) * {size!r}, -90 + (d.cell_y + 1) * {size!r}, 4326)
+         AND {event_x} = d.cell_x
+         AND {event_y} = d.cell_y
+        WHERE d.zoom = %s
+        GROUP BY d.zoom, d.cell_x, d.cell_y
+    """, (finest,))
+
+    # 상위 줌: 부모 셀만 지우고 자식 셀 합계로 다시 채움
+    for zoom in range(finest - 1, -1, -1):
+        cursor.execute("""
+            INSERT INTO cluster_dirty_cells
+            SELECT DISTINCT %s::smallint, cell_x / 2, cell_y / 2
+            FROM cluster_dirty_cells WHERE zoom = %s
+        """, (zoom, zoom + 1))
+        cursor.execute("""
+            DELETE FROM earthquake_clusters c
+            USING cluster_dirty_cells d
+            WHERE d.zoom = %s AND c.zoom = d.zoom AND c.cell_x = d.cell_x AND c.cell_y = d.cell_y
+        """, (zoom,))
+        _rollup_parents(
+            cursor, zoom,
+            "AND (cell_x / 2, cell_y / 2) IN (SELECT cell_x, cell_y FROM cluster_dirty_cells WHERE zoom = %s)",
+            (zoom,),
+        )
+
+
+def get_clusters(conn, bbox: BBox, zoom: int) -> List[dict]:
+    """bbox 안의 격자 클러스터 (중심점, 개수, 최대 규모, 최신 시각)"""
+    size = cell_size(zoom)
+    clusters: List[dict] = []
+
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+        for min_lon, min_lat, max_lon, max_lat in split_bbox(*bbox):
+            if zoom <= CLUSTER_PRECOMPUTE_MAX_ZOOM:
+                cursor.execute("""
+                    SELECT sum_longitude / event_count AS longitude,
+                           sum_latitude / event_count AS latitude,
+                           event_count AS count,
+                           max_magnitude,
+                           latest_time
+                    FROM earthquake_clusters
+                    WHERE zoom = %s
+                      AND cell_x BETWEEN floor((%s + 180) / %s) AND floor((%s + 180) / %s)
+                      AND cell_y BETWEEN floor((%s + 90) / %s) AND floor((%s + 90) / %s)
+                """, (zoom, min_lon, size, max_lon, size, min_lat, size, max_lat, size))
+            else:
+                # 사전 집계보다 세밀한 줌은 화면 bbox가 좁으므로 원본에서 바로 격자 집계
+                cell_x, cell_y = cell_exprs("location::geometry", zoom)
+                cursor.execute(f"""
+                    SELECT AVG(ST_X(location::geometry)) AS longitude,
+                           AVG(ST_Y(location::geometry)) AS latitude,
+                           COUNT(*) AS count,
+                           MAX(magnitude) AS max_magnitude,
+                           MAX(time) AS latest_time
+                    FROM earthquakes
+                    WHERE location::geometry && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+                    GROUP BY {cell_x}, {cell_y}
+                """, (min_lon, min_lat, max_lon, max_lat))
+            clusters.extend(cursor.fetchall())
+
+    return [
+        {
+            "latitude": float(row["latitude"]),
+            "longitude": float(row["longitude"]),
+            "count": row["count"],
+            "max_magnitude": float(row["max_magnitude"]) if row["max_magnitude"] is not None else None,
+            "latest_time": row["latest_time"],
+        }
+        for row in clusters
+    ]
+
+
+register_ingest_db_hook(refresh_changed_cells)
@@ -0,0 +1,326 @@
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from clusters import BBox, cell_exprs, cell_size, split_bbox
+from ingest import IngestResult, lock_rollups, register_ingest_db_hook
+
+# 밀도 롤업을 유지하는 가장 세밀한 줌 (격자는 클러스터와 같은 cell_size(zoom) 를 사용)
+DENSITY_MAX_ZOOM = int(os.getenv("DENSITY_MAX_ZOOM", "6"))
+
+# 방출 에너지(J): log10 E = 1.5 M + 4.8 (Gutenberg-Richter)
+_ENERGY = "power(10::float8, 1.5 * e.magnitude::float8 + 4.8)"
+
+SERIES_BUCKETS = ("day", "week", "month", "year")
+
+Segment = Tuple[str, Optional[datetime], Optional[datetime]]
+CellRange = Tuple[int, int, int, int]
+
+
+# ---------------------------------------------------------------------------
+# 롤업 유지 (적재 경로에서 호출)
+# ---------------------------------------------------------------------------
+
+def _insert_parent_days(cursor, zoom: int) -> None:
+    """zoom+1 레벨 일 버킷을 합쳐 zoom 레벨 일 버킷 계산 (density_dirty_days 의 날짜만)"""
+    cursor.execute("""
+        INSERT INTO earthquake_density_rollup
+        SELECT %s, 'day', r.bucket, r.cell_x / 2, r.cell_y / 2,
+               SUM(r.event_count), SUM(r.energy_sum), MAX(r.max_magnitude)
+        FROM density_dirty_days d
+        JOIN earthquake_density_rollup r ON r.zoom = %s AND r.bucket_size = 'day' AND r.bucket = d.bucket
+        GROUP BY r.bucket, r.cell_x / 2, r.cell_y / 2
+    """, (zoom, zoom + 1))
+
+
+def _refresh_days(cursor) -> None:
+    """density_dirty_days 의 일 버킷을 원본에서 다시 집계하고, 해당 월 버킷을 일 롤업에서 다시 집계"""
+    finest = DENSITY_MAX_ZOOM
+    cell_x, cell_y = cell_exprs("e.location::geometry", finest)
+
+    cursor.execute("""
+        DELETE FROM earthquake_density_rollup r
+        USING density_dirty_days d
+        WHERE r.bucket_size = 'day' AND r.bucket = d.bucket
+    """)
+    cursor.execute(f"""
+        INSERT INTO earthquake_density_rollup
+        SELECT %s, 'day', d.bucket, {cell_x}, {cell_y},
+               COUNT(*), COALESCE(SUM({_ENERGY}), 0), MAX(e.magnitude)
+        FROM density_dirty_days d
+        JOIN earthquakes e ON e.time >= d.bucket AND e.time < d.bucket + INTERVAL '1 day'
+        WHERE e.location IS NOT NULL
+        GROUP BY d.bucket, 4, 5
+    """, (finest,))
+    for zoom in range(finest - 1, -1, -1):
+        _insert_parent_days(cursor, zoom)
+
+    # 월 버킷은 해당 월의 일 롤업만 다시 합산
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS density_dirty_months (bucket TIMESTAMP WITH TIME ZONE) ON COMMIT DROP
+    """)
+    cursor.execute("TRUNCATE density_dirty_months")
+    cursor.execute("""
+        INSERT INTO density_dirty_months
+        SELECT DISTINCT date_trunc('month', bucket, 'UTC') FROM density_dirty_days
+    """)
+    cursor.execute("""
+        DELETE FROM earthquake_density_rollup r
+        USING density_dirty_months m
+        WHERE r.bucket_size = 'month' AND r.bucket = m.bucket
+    """)
+    cursor.execute("""
+        INSERT INTO earthquake_density_rollup
+        SELECT r.zoom, 'month', m.bucket, r.cell_x, r.cell_y,
+               SUM(r.event_count), SUM(r.energy_sum), MAX(r.max_magnitude)
+        FROM density_dirty_months m
+        JOIN earthquake_density_rollup r
+          ON r.bucket_size = 'day' AND r.bucket >= m.bucket AND r.bucket < m.bucket + INTERVAL '1 month'
+        GROUP BY r.zoom, m.bucket, r.cell_x, r.cell_y
+    """)
+
+
+def _prepare_dirty_days(cursor) -> None:
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS density_dirty_days (bucket TIMESTAMP WITH TIME ZONE) ON COMMIT DROP
+    """)
+    cursor.execute("TRUNCATE density_dirty_days")
+
+
+def refresh_changed_days(cursor, result: IngestResult) -> None:
+    """적재로 바뀐 이벤트의 (새/이전) 시각이 속한 일·월 버킷만 모든 줌에서 다시 집계
+
+    같은 달을 건드리는 적재는 모든 줌의 월 버킷 키가 겹치므로, upsert_features 가 훅 실행 전에 잡는
+    lock_rollups 아래에서만 실행된다.
+    """
+    times = [event.time for event in result.changed if event.time is not None]
+    times += [event.prev_time for event in result.changed if event.prev_time is not None]
+    if not times:
+        return
+
+    _prepare_dirty_days(cursor)
+    cursor.execute("""
+        INSERT INTO density_dirty_days
+        SELECT DISTINCT date_trunc('day', t, 'UTC') FROM unnest(%s::timestamptz[]) AS t
+    """, (times,))
+    _refresh_days(cursor)
+
+
+def rebuild_density(conn) -> None:
+    """밀도 롤업 전체 재생성 (최초 구축 또는 복구용)"""
+    with conn.cursor() as cursor:
+        lock_rollups(cursor)
+        cursor.execute("TRUNCATE earthquake_density_rollup")
+        _prepare_dirty_days(cursor)
+        cursor.execute("""
+            INSERT INTO density_dirty_days
+            SELECT DISTINCT date_trunc('day', time, 'UTC') FROM earthquakes WHERE time IS NOT NULL
+        """)
+        _refresh_days(cursor)
+    conn.commit()
+
+
+def delete_rollups(cursor, start: datetime, end: datetime) -> None:
+    """[start, end) 구간 버킷 삭제 (보관 정책으로 원본 파티션을 떼어낼 때 호출, 월 경계 기준)"""
+    cursor.execute("DELETE FROM earthquake_density_rollup WHERE bucket >= %s AND bucket < %s", (start, end))
+
+
+# ---------------------------------------------------------------------------
+# 조회: 기간은 일 단위로 넓혀 월 롤업 + 양 끝 일 롤업으로, 영역은 셀 번호 범위로 분해
+# ---------------------------------------------------------------------------
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _day_floor(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _day_ceil(value: datetime) -> datetime:
+    floored = _day_floor(value)
+    return floored if floored == value else floored + timedelta(days=1)
+
+
+def _month_floor(value: datetime) -> datetime:
+    return _day_floor(value).replace(day=1)
+
+
+def _month_ceil(value: datetime) -> datetime:
+    floored = _month_floor(value)
+    if floored == value:
+        return floored
+    return floored.replace(year=floored.year + floored.month // 12, month=floored.month % 12 + 1)
+
+
+def day_window(start: Optional[datetime], end: Optional[datetime]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """롤업이 실제로 답하는 구간 - [start, end) 를 감싸는 UTC 일 경계"""
+    start, end = _as_utc(start), _as_utc(end)
+    return (_day_floor(start) if start else None, _day_ceil(end) if end else None)
+
+
+def split_days(start: Optional[datetime], end: Optional[datetime]) -> List[Segment]:
+    """일 경계 구간 [start, end) 를 ('day'|'month', from, to) 조각으로 분해 (None 은 열린 끝)"""
+    month_start = _month_ceil(start) if start else None
+    month_end = _month_floor(end) if end else None
+    if month_start is not None and month_end is not None and month_start >= month_end:
+        return [("day", start, end)]
+
+    segments: List[Segment] = []
+    if start is not None and start < month_start:
+        segments.append(("day", start, month_start))
+    segments.append(("month", month_start, month_end))
+    if end is not None and month_end < end:
+        segments.append(("day", month_end, end))
+    return segments
+
+
+def cell_ranges(bbox: BBox, zoom: int) -> List[CellRange]:
+    """bbox 와 겹치는 셀 번호 범위 (x0, x1, y0, y1) - 날짜변경선을 넘으면 두 조각"""
+    size = cell_size(zoom)
+    max_x, max_y = int(360 / size) - 1, int(180 / size) - 1
+    ranges = []
+    for min_lon, min_lat, max_lon, max_lat in split_bbox(*bbox):
+        x0 = min(int(math.floor((min_lon + 180) / size)), max_x)
+        y0 = min(int(math.floor((min_lat + 90) / size)), max_y)
+        x1 = min(max(x0, int(math.ceil((max_lon + 180) / size)) - 1), max_x)
+        y1 = min(max(y0, int(math.ceil((max_lat + 90) / size)) - 1), max_y)
+        ranges.append((x0, x1, y0, y1))
+    return ranges
+
+
+def aligned_zoom(bbox: BBox) -> int:
+    """bbox 경계가 셀 경계와 맞아떨어지는 가장 거친 줌 (없으면 가장 세밀한 줌) - 시계열에서 읽는 행 수를 줄임"""
+    for zoom in range(DENSITY_MAX_ZOOM + 1):
+        size = cell_size(zoom)
+        edges = [lon + 180 for lon in bbox[0::2]] + [lat + 90 for lat in bbox[1::2]]
+        if all(abs(edge / size - round(edge / size)) < 1e-9 for edge in edges):
+            return zoom
+    return DENSITY_MAX_ZOOM
+
+
+def _where(zoom: int, segments: List[Segment], ranges: List[CellRange], params: list) -> str:
+    params.append(zoom)
+    times = []
+    for source, lower, upper in segments:
+        conditions = ["bucket_size = %s"]
+        params.append(source)
+        if lower is not None:
+            conditions.append("bucket >= %s")
+            params.append(lower)
+        if upper is not None:
+            conditions.append("bucket < %s")
+            params.append(upper)
+        times.append("(" + " AND ".join(conditions) + ")")
+    cells = []
+    for x0, x1, y0, y1 in ranges:
+        cells.append("(cell_x BETWEEN %s AND %s AND cell_y BETWEEN %s AND %s)")
+        params.extend((x0, x1, y0, y1))
+    return f"zoom = %s AND ({' OR '.join(times)}) AND ({' OR '.join(cells)})"
+
+
+def density_grid(conn, bbox: BBox, zoom: int, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> List[tuple]:
+    """bbox/기간의 셀별 (cell_x, cell_y, 개수, 에너지 합, 최대 규모) - 빈 셀은 없음"""
+    start, end = day_window(start, end)
+    params: list = []
+    where = _where(zoom, split_days(start, end), cell_ranges(bbox, zoom), params)
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT cell_x, cell_y, SUM(event_count), SUM(energy_sum), MAX(max_magnitude)
+            FROM earthquake_density_rollup
+            WHERE {where}
+            GROUP BY cell_x, cell_y
+            ORDER BY cell_y, cell_x
+        """, params)
+        return cursor.fetchall()
+
+
+def density_series(conn, bbox: BBox, bucket: str, zoom: int, start: Optional[datetime] = None,
+                   end: Optional[datetime] = None) -> List[tuple]:
+    """bbox 와 겹치는 셀들의 버킷별 (버킷 시작, 개수, 에너지 합, 최대 규모)"""
+    if bucket not in SERIES_BUCKETS:
+        raise ValueError(f"bucket 은 {', '.join(SERIES_BUCKETS)} 중 하나여야 합니다")
+    start, end = day_window(start, end)
+    # 일/주 버킷은 월 롤업으로 나눌 수 없으므로 일 롤업만 사용
+    segments = split_days(start, end) if bucket in ("month", "year") else [("day", start, end)]
+    params: list = [bucket]
+    where = _where(zoom, segments, cell_ranges(bbox, zoom), params)
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT date_trunc(%s, bucket, 'UTC') AS b, SUM(event_count), SUM(energy_sum), MAX(max_magnitude)
+            FROM earthquake_density_rollup
+            WHERE {where}
+            GROUP BY b
+            ORDER BY b
+        """, params)
+        return cursor.fetchall()
+
+
+# ---------------------------------------------------------------------------
+# 응답 직렬화: 리틀 엔디언 열 배열을 이어 붙인 바이너리 (브라우저에서 TypedArray 로 바로 읽음)
+# ---------------------------------------------------------------------------
+
+def _magnitudes(values) -> np.ndarray:
+    return np.array([float(value) if value is not None else np.nan for value in values], dtype="<f4")
+
+
+def grid_payload(rows: List[tuple]) -> bytes:
+    """Int32 cell_x[n] | Int32 cell_y[n] | Uint32 count[n] | Float32 energy[n] | Float32 max_magnitude[n] (없으면 NaN)"""
+    columns = list(zip(*rows)) or [(), (), (), (), ()]
+    return b"".join((
+        np.array(columns[0], dtype="<i4").tobytes(),
+        np.array(columns[1], dtype="<i4").tobytes(),
+        np.array(columns[2], dtype="<u4").tobytes(),
+        np.array(columns[3], dtype="<f4").tobytes(),
+        _magnitudes(columns[4]).tobytes(),
+    ))
+
+
+def series_payload(rows: List[tuple]) -> bytes:
+    """Float64 time_ms[n] | Float64 energy[n] | Uint32 count[n] | Float32 max_magnitude[n] (없으면 NaN)"""
+    columns = list(zip(*rows)) or [(), (), (), ()]
+    return b"".join((
+        np.array([bucket.timestamp() * 1000 for bucket in columns[0]], dtype="<f8").tobytes(),
+        np.array(columns[2], dtype="<f8").tobytes(),
+        np.array(columns[1], dtype="<u4").tobytes(),
+        _magnitudes(columns[3]).tobytes(),
+    ))
+
+
+def grid_json(rows: List[tuple], zoom: int) -> List[Dict[str, Any]]:
+    size = cell_size(zoom)
+    return [
+        {
+            "cell_x": x,
+            "cell_y": y,
+            "min_longitude": -180 + x * size,
+            "min_latitude": -90 + y * size,
+            "count": int(count),
+            "energy_joules": float(energy),
+            "max_magnitude": float(magnitude) if magnitude is not None else None,
+        }
+        for x, y, count, energy, magnitude in rows
+    ]
+
+
+def series_json(rows: List[tuple]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "bucket": bucket,
+            "count": int(count),
+            "energy_joules": float(energy),
+            "max_magnitude": float(magnitude) if magnitude is not None else None,
+        }
+        for bucket, count, energy, magnitude in rows
+    ]
+
+
+register_ingest_db_hook(refresh_changed_days)
@@ -0,0 +1,131 @@
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from database import get_db
+from models import NearestSearchRequest, SearchFilters
+from polygons import prepare_polygon
+from services import nearest_query, polygon_query, radius_query
+
+# 검색 필터 조합별 실행 계획 확인 - 각 조합이 기대한 인덱스 중 하나를 쓰는지 EXPLAIN 으로 검사
+# 사용법: python explain_search.py [--no-seqscan] [--verbose]
+# 같은 조합과 시간 조건의 파티션 제거는 tests/test_explain_search.py 가 pytest 로도 검사 (DATABASE_URL 필요)
+
+SEOUL = (37.5665, 126.9780)
+PACIFIC_WKT = "POLYGON((120 20, 150 20, 150 50, 120 50, 120 20))"
+
+LOCATION = "idx_earthquakes_location"
+LOCATION_TIME = "idx_earthquakes_location_time"
+TIME_BRIN = "idx_earthquakes_time_brin"
+TIME_BTREE = "idx_earthquakes_time"
+SIGNIFICANT_LOCATION = "idx_earthquakes_significant_location"
+LOCATION_GEOM = "idx_earthquakes_location_geom"
+
+
+class PlanUsage(NamedTuple):
+    """실행 계획에서 읽은 earthquakes 접근 방식"""
+    indexes: Set[str]     # 사용한 인덱스 (파티션 인덱스는 상위 인덱스 이름으로)
+    relations: Set[str]   # 스캔한 earthquakes 파티션 (파티션 제거 후 남은 것)
+    seq_scan: bool        # earthquakes 또는 그 파티션을 순차 스캔했는지
+
+
+def _cases(pacific_hash: str) -> List[Tuple[str, Tuple[str, str, tuple], Set[str]]]:
+    now = datetime.now(timezone.utc)
+    last_week = SearchFilters(start_time=now - timedelta(days=7), end_time=now)
+    significant = SearchFilters(min_magnitude=5.0)
+    combined = SearchFilters(
+        start_time=now - timedelta(days=30), min_magnitude=4.5, max_depth=70, limit=100
+    )
+    lat, lon = SEOUL
+    return [
+        ("radius", radius_query(lat, lon, 500, None), {LOCATION, LOCATION_TIME}),
+        ("radius + time", radius_query(lat, lon, 500, last_week), {LOCATION_TIME, TIME_BRIN, TIME_BTREE}),
+        ("radius + magnitude>=5", radius_query(lat, lon, 500, significant), {SIGNIFICANT_LOCATION, LOCATION_TIME}),
+        ("radius + time/magnitude/depth/limit", radius_query(lat, lon, 500, combined),
+         {SIGNIFICANT_LOCATION, LOCATION_TIME}),
+        ("region", polygon_query(pacific_hash, None), {LOCATION_GEOM}),
+        ("region + time", polygon_query(pacific_hash, last_week), {LOCATION_GEOM, TIME_BRIN, TIME_BTREE}),
+        ("region + magnitude>=5", polygon_query(pacific_hash, significant), {LOCATION_GEOM}),
+        ("nearest", nearest_query(NearestSearchRequest(latitude=lat, longitude=lon)), {LOCATION, LOCATION_TIME}),
+        ("nearest + magnitude>=5",
+         nearest_query(NearestSearchRequest(latitude=lat, longitude=lon, min_magnitude=5.0)),
+         {SIGNIFICANT_LOCATION, LOCATION_TIME, LOCATION}),
+    ]
+
+
+def _plan_nodes(node: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def explain(conn, query: str, params: tuple, no_seqscan: bool) -> Dict[str, Any]:
+    with conn.cursor() as cursor:
+        if no_seqscan:
+            # 개발용 소량 데이터에서는 순차 스캔이 더 싸므로, 인덱스 사용 가능 여부만 확인
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+        plan = cursor.fetchone()[0]
+    conn.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def _earthquake_relations(conn) -> Dict[str, str]:
+    """earthquakes 와 그 파티션, 그리고 파티션 인덱스 -> 상위 인덱스 이름"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT c.relname, p.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'earthquakes' OR p.relname LIKE 'idx_earthquakes%'
+        """)
+        parents = dict(cursor.fetchall())
+    conn.rollback()
+    return parents
+
+
+def plan_usage(conn, plan: Dict[str, Any]) -> PlanUsage:
+    """계획 트리의 인덱스/파티션/순차 스캔 사용 여부 (파티션된 테이블과 일반 테이블 모두 처리)"""
+    parents = _earthquake_relations(conn)
+    nodes = list(_plan_nodes(plan))
+    relations = {
+        node["Relation Name"] for node in nodes
+        if node.get("Relation Name") == "earthquakes" or parents.get(node.get("Relation Name")) == "earthquakes"
+    }
+    return PlanUsage(
+        indexes={parents.get(node["Index Name"], node["Index Name"]) for node in nodes if "Index Name" in node},
+        relations=relations,
+        seq_scan=any(node["Node Type"] == "Seq Scan" and node.get("Relation Name") in relations for node in nodes),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="검색 필터 조합별 인덱스 사용 여부 확인 (EXPLAIN)")
+    parser.add_argument("--no-seqscan", action="store_true", help="순차 스캔을 끄고 확인 (데이터가 적을 때)")
+    parser.add_argument("--verbose", action="store_true", help="전체 실행 계획 출력")
+    args = parser.parse_args()
+
+    failures = 0
+    with get_db() as conn:
+        pacific_hash = prepare_polygon(conn, PACIFIC_WKT)
+        for label, (_, query, params), expected in _cases(pacific_hash):
+            plan = explain(conn, query, params, args.no_seqscan)
+            usage = plan_usage(conn, plan)
+            ok = bool(usage.indexes & expected) and not usage.seq_scan
+            failures += not ok
+            print(f"[{'OK' if ok else 'FAIL'}] {label}: {', '.join(sorted(usage.indexes)) or '인덱스 없음'}"
+                  f"{' (Seq Scan)' if usage.seq_scan else ''} / 기대: {', '.join(sorted(expected))}")
+            if args.verbose:
+                print(json.dumps(plan, indent=2, ensure_ascii=False))
+
+    print(f"{failures}개 조합이 기대한 인덱스를 사용하지 않음" if failures else "모든 조합이 기대한 인덱스를 사용함")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import json
+import os
+import uuid
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import polygons
+from models import ExportRequest
+from services import EARTHQUAKE_COLUMNS, build_search_filters, polygon_query, radius_query
+
+# 서버 측 커서에서 한 번에 가져와 레코드 배치(Parquet 은 행 그룹) 하나로 만드는 행 수
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "50000"))
+# Parquet 압축 코덱 (zstd | snappy | gzip | none)
+EXPORT_PARQUET_COMPRESSION = os.getenv("EXPORT_PARQUET_COMPRESSION", "zstd")
+
+EXPORT_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# GeoArrow/GeoParquet 에서 WKB 점 geometry 로 인식되도록 붙이는 메타데이터 (좌표계 생략 = OGC:CRS84 경위도)
+_GEOMETRY_FIELD = pa.field("geometry", pa.binary(), metadata={
+    "ARROW:extension:name": "geoarrow.wkb",
+    "ARROW:extension:metadata": "{}",
+})
+_GEO_METADATA = json.dumps({
+    "version": "1.0.0",
+    "primary_column": "geometry",
+    "columns": {"geometry": {"encoding": "WKB", "geometry_types": ["Point"]}},
+})
+
+# EARTHQUAKE_COLUMNS + distance_km 순서
+EXPORT_SCHEMA = pa.schema([
+    pa.field("id", pa.string(), nullable=False),
+    pa.field("magnitude", pa.float64()),
+    pa.field("place", pa.string()),
+    pa.field("time", pa.timestamp("us", tz="UTC")),
+    pa.field("depth", pa.float64()),
+    pa.field("latitude", pa.float64()),
+    pa.field("longitude", pa.float64()),
+    pa.field("url", pa.string()),
+    pa.field("distance_km", pa.float64()),
+    _GEOMETRY_FIELD,
+], metadata={"geo": _GEO_METADATA})
+
+# WKB Point: 바이트 순서(1 = 리틀 엔디언) + 형식(1 = Point) + x + y = 21바이트
+_WKB_POINT = np.dtype([("order", "u1"), ("type", "<u4"), ("x", "<f8"), ("y", "<f8")])
+
+
+def export_query(conn, request: ExportRequest) -> Tuple[str, tuple]:
+    """내보낼 행 쿼리 - 반경/다각형 검색 쿼리를 그대로 쓰고, 둘 다 없으면 필터만 (조건이 없으면 전체 카탈로그)"""
+    radius = (request.latitude, request.longitude, request.radius_km)
+    if any(v is not None for v in radius) and any(v is None for v in radius):
+        raise ValueError("반경 조건에는 latitude, longitude, radius_km 가 모두 필요합니다")
+    if request.polygon_wkt is not None and request.radius_km is not None:
+        raise ValueError("반경과 다각형은 함께 지정할 수 없습니다")
+    if request.polygon_wkt is not None:
+        _, query, params = polygon_query(polygons.prepare_polygon(conn, request.polygon_wkt), request)
+        return query, params
+    if request.radius_km is not None:
+        _, query, params = radius_query(request.latitude, request.longitude, request.radius_km, request)
+        return query, params
+
+    conditions, params, _ = build_search_filters(request)
+    query = f"""
+        SELECT {EARTHQUAKE_COLUMNS}, NULL::float8 as distance_km
+        FROM earthquakes
+        WHERE true{conditions}
+    """
+    if request.limit is not None:
+        query += " ORDER BY time DESC LIMIT %s::bigint"
+        params.append(request.limit)
+    return query, tuple(params)
+
+
+def _point_wkb(longitudes: np.ndarray, latitudes: np.ndarray) -> pa.Array:
+    """경위도 배열 -> WKB 점 배열 (행마다 파이썬 객체를 만들지 않고 고정 폭 버퍼를 한 번에 채움)"""
+    count = len(longitudes)
+    points = np.empty(count, dtype=_WKB_POINT)
+    points["order"] = 1
+    points["type"] = 1
+    points["x"] = longitudes
+    points["y"] = latitudes
+    offsets = np.arange(0, (count + 1) * _WKB_POINT.itemsize, _WKB_POINT.itemsize, dtype=np.int32)
+    valid = ~(np.isnan(longitudes) | np.isnan(latitudes))
+    validity = None if valid.all() else pa.py_buffer(np.packbits(valid, bitorder="little"))
+    return pa.Array.from_buffers(
+        pa.binary(), count, [validity, pa.py_buffer(offsets), pa.py_buffer(points.tobytes())],
+        null_count=int(count - valid.sum()),
+    )
+
+
+def rows_to_batch(rows: List[tuple]) -> pa.RecordBatch:
+    """EARTHQUAKE_COLUMNS + distance_km 행 -> 레코드 배치 (열 단위 변환)"""
+    columns = list(zip(*rows))
+    latitudes = np.array(columns[5], dtype=np.float64)
+    longitudes = np.array(columns[6], dtype=np.float64)
+    arrays = [
+        pa.array(columns[index], type=field.type)
+        for index, field in enumerate(EXPORT_SCHEMA)
+        if field.name != "geometry"
+    ]
+    arrays.append(_point_wkb(longitudes, latitudes))
+    return pa.RecordBatch.from_arrays(arrays, schema=EXPORT_SCHEMA)
+
+
+class _ChunkSink:
+    """pyarrow 작성기가 쓴 바이트를 모아 두었다가 배치마다 꺼내는 쓰기 전용 파일 객체"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_export(conn, query: str, params: tuple, output_format: str,
+                batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """named cursor 에서 batch_size 행씩 읽어 Arrow IPC 스트림 또는 Parquet 조각을 생성 (메모리는 배치 하나 크기)"""
+    sink = _ChunkSink()
+    if output_format == "parquet":
+        writer = pq.ParquetWriter(
+            sink, EXPORT_SCHEMA,
+            compression=None if EXPORT_PARQUET_COMPRESSION == "none" else EXPORT_PARQUET_COMPRESSION,
+        )
+    else:
+        writer = pa.ipc.new_stream(sink, EXPORT_SCHEMA)
+
+    with conn.cursor(name=f"eq_export_{uuid.uuid4().hex}") as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            batch = rows_to_batch(rows)
+            if output_format == "parquet":
+                writer.write_table(pa.Table.from_batches([batch]), row_group_size=batch_size)
+            else:
+                writer.write_batch(batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+    writer.close()
+    yield sink.drain()
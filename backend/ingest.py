@@ -0,0 +1,305 @@
+import csv
+import io
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 한 번에 COPY + 업서트하는 행 수
+INGEST_BATCH_SIZE = 5000
+
+STAGING_COLUMNS = (
+    "id", "magnitude", "place", "time", "updated", "depth",
+    "longitude", "latitude", "url", "detail",
+)
+
+# 연결마다 한 번 생성되는 임시 스테이징 테이블 (커밋 시 비워짐)
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS earthquakes_staging (
+        id VARCHAR(50),
+        magnitude DECIMAL(5,2),
+        place VARCHAR(500),
+        time TIMESTAMP WITH TIME ZONE,
+        updated TIMESTAMP WITH TIME ZONE,
+        depth DECIMAL(6,2),
+        longitude DOUBLE PRECISION,
+        latitude DOUBLE PRECISION,
+        url TEXT,
+        detail TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+# 같은 id가 배치 안에 여러 번 오면 updated가 가장 최신인 것만 사용하고,
+# 기존 행은 USGS updated 가 더 새로울 때만 갱신한다.
+#
+# earthquakes 는 time 으로 파티션되어 기본 키가 (id, time) 이므로, 발생 시각이 수정된 이벤트는
+# ON CONFLICT 로 잡히지 않는다. 그런 행은 더 새로운 버전일 때 기존 행을 지우고(moved) 새 시각으로
+# 다시 넣으며(다른 파티션일 수 있음), 더 오래된 버전이면 넣지 않아 id 당 한 행을 유지한다.
+UPSERT_SQL = """
+    WITH src AS (
+        SELECT DISTINCT ON (id) *
+        FROM earthquakes_staging
+        ORDER BY id, updated DESC NULLS LAST
+    ),
+    prev AS (
+        SELECT e.id,
+               e.time AS prev_time,
+               e.updated AS prev_updated,
+               ST_Y(e.location::geometry) AS prev_latitude,
+               ST_X(e.location::geometry) AS prev_longitude,
+               (e.updated IS NULL OR src.updated > e.updated) AS is_newer,
+               (e.time <> src.time) AS time_moved
+        FROM earthquakes e
+        JOIN src ON src.id = e.id
+    ),
+    moved AS (
+        DELETE FROM earthquakes e
+        USING prev p
+        WHERE e.id = p.id AND e.time = p.prev_time AND p.time_moved AND p.is_newer
+        RETURNING e.id
+    ),
+    upserted AS (
+        INSERT INTO earthquakes AS e (id, magnitude, place, time, updated, depth, location, url, detail)
+        SELECT src.id, magnitude, place, time, updated, depth,
+               ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography,
+               url, detail
+        FROM src
+        LEFT JOIN prev p ON p.id = src.id
+        WHERE p.id IS NULL OR NOT p.time_moved OR p.is_newer
+        ON CONFLICT (id, time) DO UPDATE SET
+            magnitude = EXCLUDED.magnitude,
+            place = EXCLUDED.place,
+            updated = EXCLUDED.updated,
+            depth = EXCLUDED.depth,
+            location = EXCLUDED.location,
+            url = EXCLUDED.url,
+            detail = EXCLUDED.detail
+        WHERE e.updated IS NULL OR EXCLUDED.updated > e.updated
+        RETURNING e.id, (e.xmax = 0) AS inserted, e.magnitude, e.place, e.time, e.depth,
+                  ST_Y(e.location::geometry) AS latitude,
+                  ST_X(e.location::geometry) AS longitude,
+                  e.url
+    )
+    SELECT u.id, u.inserted AND m.id IS NULL, u.magnitude, u.place, u.time, u.depth,
+           u.latitude, u.longitude, u.url,
+           p.prev_time, p.prev_latitude, p.prev_longitude
+    FROM upserted u
+    LEFT JOIN prev p ON p.id = u.id
+    LEFT JOIN moved m ON m.id = u.id
+"""
+
+
+class ChangedEvent(NamedTuple):
+    """업서트로 실제 삽입/갱신된 행 (갱신이면 이전 시각/위치 포함)"""
+    id: str
+    inserted: bool
+    magnitude: Optional[Decimal]
+    place: Optional[str]
+    time: Optional[datetime]
+    depth: Optional[Decimal]
+    latitude: float
+    longitude: float
+    url: Optional[str]
+    prev_time: Optional[datetime]
+    prev_latitude: Optional[float]
+    prev_longitude: Optional[float]
+
+
+@dataclass
+class IngestResult:
+    """대량 적재 결과 집계 (source: 적재 경로 - sync | backfill | benchmark)"""
+    source: str = "sync"
+    processed: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    changed: List[ChangedEvent] = field(default_factory=list)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.inserted or self.updated)
+
+    @property
+    def is_sync(self) -> bool:
+        return self.source == "sync"
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "skipped": self.skipped,
+        }
+
+    def merge(self, other: "IngestResult") -> None:
+        self.processed += other.processed
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        self.skipped += other.skipped
+        self.changed.extend(other.changed)
+
+
+# 사전 집계 테이블을 고치는 트랜잭션(적재 훅, 전체 재생성)을 한 번에 하나씩 실행하도록 잡는 advisory lock 키
+ROLLUP_LOCK_KEY = 0x45515F524F4C  # 'EQ_ROL'
+
+# 업서트와 같은 트랜잭션 안에서 실행되는 DB 후처리 (사전 집계 갱신 등)
+_db_hooks: List[Callable[[Any, IngestResult], None]] = []
+# 커밋 이후 호출되는 리스너 (타일 캐시 무효화 등)
+_listeners: List[Callable[[IngestResult], None]] = []
+
+
+def register_ingest_listener(listener: Callable[[IngestResult], None]) -> None:
+    """대량 적재가 커밋된 뒤 변경 행이 있을 때마다 호출될 함수 등록"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def register_ingest_db_hook(hook: Callable[[Any, IngestResult], None]) -> None:
+    """업서트 직후 커밋 전에 (cursor, result)로 호출될 함수 등록 - 실패하면 적재 전체가 롤백됨"""
+    if hook not in _db_hooks:
+        _db_hooks.append(hook)
+
+
+def lock_rollups(cursor) -> None:
+    """트랜잭션 단위 advisory lock - 커밋/롤백 때 풀림
+
+    상위 줌 셀, 일/월 버킷처럼 여러 적재가 함께 건드리는 집계 행을 지우고 다시 넣으므로, 동시 적재
+    (스케줄러 + 병렬 백필 창)가 같은 키를 넣어 기본 키 충돌로 롤백되거나 서로의 행이 빠진 합계를
+    남기지 않도록 직렬화한다. READ COMMITTED 라 잠금을 얻은 뒤의 문장은 앞서 커밋된 적재를 본다.
+    """
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (ROLLUP_LOCK_KEY,))
+
+
+def notify_ingest_listeners(result: IngestResult) -> None:
+    """등록된 리스너에 커밋된 적재 결과 전달"""
+    for listener in _listeners:
+        try:
+            listener(result)
+        except Exception as e:
+            # 후처리 실패가 이미 커밋된 적재를 실패로 만들지 않도록 기록만 함
+            logger.exception("적재 리스너 오류: %s", e, extra={"listener": listener.__name__})
+
+
+def _epoch_ms_to_datetime(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+
+
+def parse_feature(feature: Dict[str, Any]) -> Optional[Tuple]:
+    """GeoJSON feature 하나를 스테이징 행으로 변환 (적재 불가능하면 None)"""
+    properties = feature.get('properties') or {}
+    geometry = feature.get('geometry') or {}
+
+    if geometry.get('type') != 'Point':
+        return None
+
+    coords = geometry.get('coordinates') or []
+    if len(coords) < 2 or coords[0] is None or coords[1] is None:
+        return None
+
+    # ID 파싱: ids가 ",nn00898840," 형태이므로 쉼표로 분리 후 빈 문자열 제외
+    if properties.get('ids'):
+        ids_list = [id_str.strip() for id_str in properties['ids'].split(',') if id_str.strip()]
+        earthquake_id = ids_list[0] if ids_list else None
+    else:
+        earthquake_id = feature.get('id')
+
+    if not earthquake_id:
+        return None
+
+    # 발생 시각은 파티션 키이므로 없으면 적재하지 않음
+    if properties.get('time') is None:
+        return None
+
+    return (
+        earthquake_id,
+        properties.get('mag'),
+        properties.get('place'),
+        _epoch_ms_to_datetime(properties.get('time')),
+        _epoch_ms_to_datetime(properties.get('updated')),
+        coords[2] if len(coords) > 2 else None,
+        coords[0],  # longitude
+        coords[1],  # latitude
+        properties.get('url'),
+        properties.get('detail'),
+    )
+
+
+def _copy_rows(cursor, rows: List[Tuple]) -> None:
+    """스테이징 테이블로 COPY (CSV, 빈 값은 NULL)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in row
+        )
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY earthquakes_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer,
+    )
+
+
+def _upsert_batch(cursor, rows: List[Tuple]) -> IngestResult:
+    result = IngestResult()
+    cursor.execute("TRUNCATE earthquakes_staging")
+    _copy_rows(cursor, rows)
+    cursor.execute(UPSERT_SQL)
+    for record in cursor.fetchall():
+        event = ChangedEvent(*record)
+        result.changed.append(event)
+        if event.inserted:
+            result.inserted += 1
+        else:
+            result.updated += 1
+    distinct_ids = len({row[0] for row in rows})
+    result.unchanged = distinct_ids - result.inserted - result.updated
+    return result
+
+
+def upsert_features(conn, features: Iterable[Dict[str, Any]],
+                    batch_size: int = INGEST_BATCH_SIZE, commit: bool = True,
+                    source: str = "sync") -> IngestResult:
+    """GeoJSON feature들을 배치 단위로 COPY 스테이징 후 한 번의 업서트로 반영
+
+    commit=False 이면 커밋과 리스너 호출은 호출자 책임이다.
+    source 는 결과에 실려 리스너가 적재 경로별로 다르게 처리할 수 있게 한다 (실시간 피드는 sync 만 방송).
+    """
+    result = IngestResult(source=source)
+    batch: List[Tuple] = []
+
+    with conn.cursor() as cursor:
+        cursor.execute(STAGING_DDL)
+
+        for feature in features:
+            result.processed += 1
+            row = parse_feature(feature)
+            if row is None:
+                result.skipped += 1
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                result.merge(_upsert_batch(cursor, batch))
+                batch = []
+
+        if batch:
+            result.merge(_upsert_batch(cursor, batch))
+
+        if result.has_changes and _db_hooks:
+            lock_rollups(cursor)
+            for hook in _db_hooks:
+                hook(cursor, result)
+
+    if commit:
+        conn.commit()
+        if result.has_changes:
+            notify_ingest_listeners(result)
+    return result
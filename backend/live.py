@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, List, NamedTuple, Optional, Set, Tuple
+
+import orjson
+
+import metrics
+from clusters import BBox, split_bbox
+from ingest import ChangedEvent, IngestResult, register_ingest_listener
+from services import EARTHQUAKE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# 재연결 시 이어 보내기 위해 보관하는 최근 이벤트 수 (이보다 오래 끊겼으면 목록을 다시 받도록 reset 전송)
+LIVE_FEED_BUFFER_SIZE = int(os.getenv("LIVE_FEED_BUFFER_SIZE", "10000"))
+# 구독자별 전송 대기열 길이 - 가득 차면(느린 클라이언트) 연결을 끊고 재연결 시 버퍼에서 이어 보냄
+LIVE_FEED_QUEUE_SIZE = int(os.getenv("LIVE_FEED_QUEUE_SIZE", "1000"))
+LIVE_FEED_MAX_SUBSCRIBERS = int(os.getenv("LIVE_FEED_MAX_SUBSCRIBERS", "10000"))
+# 프록시가 유휴 연결을 끊지 않도록 보내는 주석 줄 간격
+LIVE_FEED_HEARTBEAT_SECONDS = float(os.getenv("LIVE_FEED_HEARTBEAT_SECONDS", "15"))
+# 끊긴 EventSource 가 다시 연결하기까지 기다리는 시간 (ms)
+LIVE_FEED_RETRY_MS = 3000
+
+
+class LiveEvent(NamedTuple):
+    """방송된 이벤트 하나 - SSE 프레임은 한 번만 만들어 모든 구독자가 같은 bytes 를 공유"""
+    seq: int
+    longitude: float
+    latitude: float
+    magnitude: Optional[float]
+    frame: bytes
+
+
+@dataclass(frozen=True)
+class FeedFilter:
+    """구독 조건 (bbox 는 split_bbox 로 나눈 -180~180 조각, 비어 있으면 전체)"""
+    boxes: Tuple[BBox, ...] = ()
+    min_magnitude: Optional[float] = None
+
+    @classmethod
+    def create(cls, bbox: Optional[BBox] = None, min_magnitude: Optional[float] = None) -> "FeedFilter":
+        return cls(tuple(split_bbox(*bbox)) if bbox else (), min_magnitude)
+
+    def matches(self, event: LiveEvent) -> bool:
+        if self.min_magnitude is not None and (event.magnitude is None or event.magnitude < self.min_magnitude):
+            return False
+        if not self.boxes:
+            return True
+        return any(
+            min_lon <= event.longitude <= max_lon and min_lat <= event.latitude <= max_lat
+            for min_lon, min_lat, max_lon, max_lat in self.boxes
+        )
+
+
+class Subscriber:
+    def __init__(self, feed_filter: FeedFilter, queue_size: int):
+        self.filter = feed_filter
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def offer(self, frame: bytes) -> None:
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # 이미 들어간 프레임까지만 보내고 끊음 - 클라이언트는 Last-Event-ID 로 재연결해 버퍼에서 이어 받음
+            self.overflowed = True
+            metrics.LIVE_FEED_OVERFLOWS.inc()
+
+
+def _frame(event_id: str, event_type: str, data: bytes) -> bytes:
+    return b"id: " + event_id.encode() + b"\nevent: " + event_type.encode() + b"\ndata: " + data + b"\n\n"
+
+
+def _payload(event: ChangedEvent) -> bytes:
+    """목록 API 와 같은 필드 + change(inserted|updated)"""
+    row = (
+        event.id,
+        float(event.magnitude) if event.magnitude is not None else None,
+        event.place,
+        event.time,
+        float(event.depth) if event.depth is not None else None,
+        event.latitude,
+        event.longitude,
+        event.url,
+        None,
+    )
+    document = dict(zip(EARTHQUAKE_FIELDS, row))
+    document["change"] = "inserted" if event.inserted else "updated"
+    return orjson.dumps(document, option=orjson.OPT_UTC_Z)
+
+
+class LiveFeed:
+    """동기화 적재 커밋 후 바뀐 이벤트를 SSE 구독자에게 방송하는 프로세스 내 팬아웃
+
+    직렬화는 적재 스레드에서 이벤트당 한 번만 하고, 순번 부여/버퍼 추가/구독자 분배는 모두
+    이벤트 루프 스레드에서 실행하므로 구독 시작 시의 버퍼 재전송과 새 이벤트가 겹치거나 빠지지 않는다.
+    구독자마다 DB 조회는 없다.
+
+    커서는 '<epoch>-<seq>' 형식이며, epoch 은 프로세스마다 달라 재시작 전 커서로는 reset 을 받는다.
+    """
+
+    def __init__(self, buffer_size: int = LIVE_FEED_BUFFER_SIZE, queue_size: int = LIVE_FEED_QUEUE_SIZE,
+                 max_subscribers: int = LIVE_FEED_MAX_SUBSCRIBERS):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._seq = 0
+        self._buffer: Deque[LiveEvent] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # -- 발행 (적재 리스너, 임의 스레드) ---------------------------------------
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """방송을 실행할 이벤트 루프 지정 (서버 시작 시) - 지정 전에는 발행을 무시 (CLI 적재 등)"""
+        self._loop = loop
+
+    def detach(self) -> None:
+        self._loop = None
+
+    def publish(self, result: IngestResult) -> None:
+        loop = self._loop
+        # 백필/벤치마크 적재는 과거 이벤트를 대량으로 다시 쓰므로 방송하지 않음 (목록 API 로만 반영)
+        if loop is None or not result.is_sync or not result.changed:
+            return
+        items = [
+            (event.longitude, event.latitude,
+             float(event.magnitude) if event.magnitude is not None else None,
+             "inserted" if event.inserted else "updated",
+             _payload(event))
+            for event in result.changed
+            if event.longitude is not None and event.latitude is not None
+        ]
+        try:
+            loop.call_soon_threadsafe(self._broadcast, items)
+        except RuntimeError:
+            # 종료 중 닫힌 루프
+            pass
+
+    def _broadcast(self, items: List[tuple]) -> None:
+        events = []
+        for longitude, latitude, magnitude, change, payload in items:
+            self._seq += 1
+            event = LiveEvent(self._seq, longitude, latitude, magnitude,
+                              _frame(self.cursor, "earthquake", payload))
+            self._buffer.append(event)
+            events.append(event)
+            metrics.LIVE_FEED_EVENTS.inc(1, change)
+        for subscriber in self._subscribers:
+            for event in events:
+                if subscriber.filter.matches(event):
+                    subscriber.offer(event.frame)
+
+    # -- 구독 (이벤트 루프) ----------------------------------------------------
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.epoch}-{self._seq}"
+
+    def _resume_seq(self, cursor: Optional[str]) -> Optional[int]:
+        """커서 이후를 버퍼에서 이어 보낼 수 있으면 그 순번, 아니면 None"""
+        try:
+            epoch, seq = cursor.rsplit("-", 1)
+            seq = int(seq)
+        except (AttributeError, ValueError):
+            return None
+        if epoch != self.epoch or seq > self._seq:
+            return None
+        oldest = self._buffer[0].seq if self._buffer else self._seq + 1
+        return seq if seq >= oldest - 1 else None
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self, feed_filter: FeedFilter, cursor: Optional[str] = None) -> Subscriber:
+        """구독 등록 - 커서가 주어지면 그 이후 이벤트를, 이어 줄 수 없으면 reset 을 먼저 대기열에 넣음"""
+        subscriber = Subscriber(feed_filter, self.queue_size)
+        resume = self._resume_seq(cursor) if cursor else None
+        if cursor and resume is None:
+            # 버퍼보다 오래 끊겼거나 서버가 재시작됨 - 목록을 다시 받은 뒤 지금부터 이어 받도록 안내
+            subscriber.offer(_frame(self.cursor, "reset", orjson.dumps({"cursor": self.cursor})))
+        elif resume is not None:
+            for event in self._buffer:
+                if event.seq > resume and feed_filter.matches(event):
+                    subscriber.offer(event.frame)
+        else:
+            subscriber.offer(_frame(self.cursor, "ready", orjson.dumps({"cursor": self.cursor})))
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    async def stream(self, feed_filter: FeedFilter, cursor: Optional[str] = None,
+                     heartbeat: float = LIVE_FEED_HEARTBEAT_SECONDS) -> AsyncIterator[bytes]:
+        """SSE 본문 - 대기열을 흘려보내고, 유휴 시 heartbeat 주석, 연결이 끊기면 구독 해제
+
+        응답 전송이 시작될 때 구독하므로, 본문을 읽기 전에 끊긴 요청은 구독자로 남지 않는다.
+        """
+        subscriber = self.subscribe(feed_filter, cursor)
+        try:
+            yield f"retry: {LIVE_FEED_RETRY_MS}\n\n".encode()
+            while not (subscriber.overflowed and subscriber.queue.empty()):
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield frame
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "cursor": self.cursor,
+            "buffered": len(self._buffer),
+            "buffer_size": self._buffer.maxlen,
+            "attached": self._loop is not None,
+        }
+
+
+live_feed = LiveFeed()
+
+register_ingest_listener(live_feed.publish)
+metrics.LIVE_FEED_SUBSCRIBERS.set_function(lambda: {(): len(live_feed._subscribers)})
@@ -0,0 +1,92 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+# 로그 설정
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # text | json
+# 로그 출력을 별도 스레드로 넘겨 요청/적재 스레드가 stdout 쓰기에 묶이지 않게 함
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+
+# LogRecord 기본 속성 - 이 밖의 속성은 extra={...}로 넘긴 구조화 필드
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JSONFormatter(logging.Formatter):
+    """한 줄에 JSON 객체 하나 (시각, 레벨, 로거, 메시지, 구조화 필드)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """사람이 읽는 한 줄 형식 - 구조화 필드는 뒤에 key=value 로 붙임"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """레코드를 문자열로 만들지 않고 같은 프로세스의 QueueListener 로 넘기는 QueueHandler
+
+    기본 prepare() 는 레코드를 미리 포맷해 예외 추적을 message 에 합치고 exc_info 를 지우므로,
+    JSONFormatter 가 exception 필드를 따로 쓰지 못한다. 여기서는 메시지 인자만 호출 스레드에서
+    확정하고 exc_info/exc_text/stack_info 는 그대로 두어 포맷은 리스너 쪽 핸들러가 한다.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, use_queue: bool = LOG_ASYNC) -> None:
+    """루트 로거 설정 (여러 번 호출해도 한 번만 적용)"""
+    global _listener
+    root = logging.getLogger()
+    if getattr(root, "_earthquake_configured", False):
+        return
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+    if use_queue:
+        records: queue.Queue = queue.Queue(-1)
+        _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        handler = RecordQueueHandler(records)
+
+    root.handlers = [handler]
+    root.setLevel(level)
+    # 요청마다 INFO 로그를 남기는 HTTP 클라이언트 로그는 경고 이상만
+    logging.getLogger("httpx").setLevel(max(root.level, logging.WARNING))
+    root._earthquake_configured = True
@@ -1,16 +1,77 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
 from typing import List, Optional
-import httpx
+import os
 import asyncio
+import logging
 from datetime import datetime
 
-from database import get_db
-from models import EarthquakeResponse, RadiusSearchRequest, RegionSearchRequest, BoundaryStatsResponse
-from services import EarthquakeService
+from database import init_pool, close_pool, run_db, get_db, get_connection
+from models import (
+    EarthquakeResponse, EarthquakePage, RadiusSearchRequest, BatchRadiusSearchRequest, NearestSearchRequest, RegionSearchRequest, BoundarySearchRequest, BoundaryStatsResponse, BackfillRequest,
+    ClusterListResponse, StatsResponse, MagnitudeHistogramResponse, DensityGridResponse, DensitySeriesResponse,
+    ExportRequest
+)
+from services import EarthquakeService, rows_to_json, rows_to_models, search_filter_key
+import backfill
+from scheduler import sync_scheduler, SYNC_SCHEDULER_ENABLED
+import tiles
+import clusters
+import density
+import stats
+import query_cache
+import partitions
+import migrations
+import metrics
+import snapshot
+import live
+import export
+from logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """애플리케이션 시작 시 커넥션 풀 생성 및 데이터베이스 초기화, 종료 시 풀 정리"""
+    init_database_tables()
+    try:
+        init_pool()
+    except Exception as e:
+        # DB가 아직 준비되지 않았어도 서버는 띄우고, 첫 요청 시 풀을 다시 생성
+        logger.warning("커넥션 풀 생성 실패: %s", e)
+    # 적재 커밋 후 바뀐 이벤트를 이 루프에서 실시간 피드 구독자에게 방송
+    live.live_feed.attach(asyncio.get_running_loop())
+    if SYNC_SCHEDULER_ENABLED:
+        sync_scheduler.start()
+    # 최근 이벤트 메모리 스냅샷은 백그라운드에서 구축 (준비 전까지는 DB 로 조회)
+    snapshot_task = asyncio.create_task(snapshot.refresh_loop()) if snapshot.SNAPSHOT_ENABLED else None
+    yield
+    if snapshot_task:
+        snapshot_task.cancel()
+        try:
+            await snapshot_task
+        except asyncio.CancelledError:
+            pass
+    await sync_scheduler.stop()
+    live.live_feed.detach()
+    close_pool()
 
-app = FastAPI(title="PostGIS Earthquake API", version="1.0.0")
+class JSONBytesResponse(Response):
+    """이미 직렬화된 JSON 바이트를 그대로 보내는 응답"""
+    media_type = "application/json"
+
+def parse_bbox(bbox: str) -> clusters.BBox:
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox는 minLon,minLat,maxLon,maxLat 형식이어야 합니다")
+    return (min_lon, min_lat, max_lon, max_lat)
+
+app = FastAPI(title="PostGIS Earthquake API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,74 +79,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # 바이너리 밀도 응답의 메타데이터 헤더를 브라우저 스크립트에서 읽을 수 있도록 노출
+    expose_headers=["X-Density-Zoom", "X-Density-Cell-Size", "X-Density-Count", "X-Density-Start", "X-Density-End"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
 # 데이터베이스 초기화 함수
 def init_database_tables():
-    """데이터베이스 테이블 및 확장 초기화"""
+    """스키마 마이그레이션 적용 + 파티션 유지 + 비어 있는 사전 집계 생성 (시작 시 한 번)"""
     try:
-        print("데이터베이스 초기화 시작...")
-        import os
-        import psycopg2
-        
-        # 환경변수에서 DATABASE_URL 가져오기
-        database_url = os.getenv("DATABASE_URL")
-        if not database_url:
-            print("DATABASE_URL 환경변수가 설정되지 않음")
-            return False
-            
-        print(f"데이터베이스 연결 시도: {database_url[:50]}...")
-        
-        # 직접 데이터베이스 연결
-        conn = psycopg2.connect(database_url)
-        conn.autocommit = True
-        
-        with conn.cursor() as cursor:
-            # PostGIS 확장 활성화
-            print("PostGIS 확장 설치 중...")
-            cursor.execute("CREATE EXTENSION IF NOT EXISTS postgis;")
-            cursor.execute("CREATE EXTENSION IF NOT EXISTS postgis_topology;")
-            
-            # 지진 데이터 테이블 생성
-            print("earthquakes 테이블 생성 중...")
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS earthquakes (
-                    id VARCHAR(50) PRIMARY KEY,
-                    magnitude DECIMAL(5,2),
-                    place VARCHAR(500),
-                    time TIMESTAMP WITH TIME ZONE,
-                    updated TIMESTAMP WITH TIME ZONE,
-                    depth DECIMAL(6,2),
-                    location GEOGRAPHY(POINT, 4326),
-                    url TEXT,
-                    detail TEXT,
-                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                );
-            """)
-            
-            # 인덱스 생성
-            print("인덱스 생성 중...")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_earthquakes_location ON earthquakes USING GIST(location);")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_earthquakes_time ON earthquakes(time);")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_earthquakes_magnitude ON earthquakes(magnitude);")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_earthquakes_depth ON earthquakes(depth);")
-            
-        conn.close()
-        print("데이터베이스 초기화 완료!")
+        logger.info("데이터베이스 초기화 시작")
+        conn = get_connection()
+        try:
+            # 여러 워커가 동시에 떠도 한 프로세스만 스키마를 바꾸고 나머지는 끝날 때까지 대기
+            with migrations.advisory_lock(conn):
+                applied = migrations.apply_pending(conn)
+                if applied:
+                    logger.info("마이그레이션 적용: %s", applied)
+
+                partitions.maintain_partitions(conn)
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT EXISTS (SELECT 1 FROM earthquakes)")
+                    has_events = cursor.fetchone()[0]
+                    cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM earthquake_clusters)")
+                    needs_cluster_build = has_events and cursor.fetchone()[0]
+                    cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM earthquake_stats_rollup)")
+                    needs_stats_build = has_events and cursor.fetchone()[0]
+                    cursor.execute("SELECT NOT EXISTS (SELECT 1 FROM earthquake_density_rollup)")
+                    needs_density_build = has_events and cursor.fetchone()[0]
+                conn.commit()
+                if needs_cluster_build:
+                    logger.info("클러스터 사전 집계 생성 중")
+                    clusters.rebuild_clusters(conn)
+                if needs_stats_build:
+                    logger.info("통계 롤업 생성 중")
+                    stats.rebuild_rollups(conn)
+                if needs_density_build:
+                    logger.info("밀도 롤업 생성 중")
+                    density.rebuild_density(conn)
+        finally:
+            conn.close()
+        logger.info("데이터베이스 초기화 완료")
         return True
         
     except Exception as e:
-        print(f"데이터베이스 초기화 오류: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("데이터베이스 초기화 오류: %s", e)
         return False
 
-# 애플리케이션 시작 시 데이터베이스 초기화
-@app.on_event("startup")
-async def startup_event():
-    """애플리케이션 시작 시 데이터베이스 초기화"""
-    init_database_tables()
-
 @app.get("/")
 async def root():
     return {"message": "PostGIS Earthquake API"}
@@ -98,7 +138,7 @@ async def api_status():
 @app.post("/api/init-database")
 async def init_database():
     """데이터베이스 테이블 및 확장 초기화"""
-    success = init_database_tables()
+    success = await run_in_threadpool(init_database_tables)
     if success:
         return {"message": "데이터베이스 초기화 완료", "status": "success"}
     else:
@@ -107,78 +147,374 @@ async def init_database():
 @app.get("/api/earthquakes", response_model=List[EarthquakeResponse])
 async def get_earthquakes(
     limit: Optional[int] = 100,
+    min_magnitude: Optional[float] = None,
+    fast: bool = False
+):
+    """전체 지진 목록 조회 (fast=true 이면 모델 검증 없이 JSON 바이트를 바로 응답)"""
+    if fast:
+        return JSONBytesResponse(
+            await run_db(lambda db: EarthquakeService(db).get_earthquakes_json(limit, min_magnitude))
+        )
+    return await run_db(lambda db: EarthquakeService(db).get_earthquakes(limit, min_magnitude))
+
+@app.get("/api/earthquakes/page", response_model=EarthquakePage)
+async def get_earthquakes_page(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     min_magnitude: Optional[float] = None
 ):
-    """전체 지진 목록 조회"""
-    with get_db() as db:
-        service = EarthquakeService(db)
-        return service.get_earthquakes(limit, min_magnitude)
+    """키셋 커서 기반 페이지 조회 (응답의 next_cursor로 다음 페이지 요청)"""
+    try:
+        return await run_db(lambda db: EarthquakeService(db).get_earthquakes_page(limit, cursor, min_magnitude))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/earthquakes/stream")
+async def stream_earthquakes(
+    format: str = Query("ndjson", pattern="^(ndjson|geojson)$"),
+    min_magnitude: Optional[float] = None,
+    batch_size: int = Query(2000, ge=100, le=20000)
+):
+    """전체 카탈로그를 서버 측 커서에서 배치 단위로 스트리밍 (API 서버 메모리 일정)"""
+    def generate():
+        # 스트리밍이 끝날 때(또는 클라이언트가 끊을 때)까지 풀 연결 하나를 점유
+        with get_db() as db:
+            yield from EarthquakeService(db).iter_earthquakes(format, min_magnitude, batch_size)
+
+    media_type = "application/geo+json" if format == "geojson" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
+
+@app.get("/api/earthquakes/export")
+async def export_earthquakes(
+    request: ExportRequest = Depends(),
+    format: str = Query("parquet", pattern="^(arrow|parquet)$")
+):
+    """반경/다각형/기간/규모 조건의 지진을 Arrow IPC 스트림 또는 (Geo)Parquet 으로 내보내기
+
+    서버 측 커서에서 고정 크기 배치로 읽어 열 단위로 변환하므로 행 수와 무관하게 메모리가 일정하다.
+    geometry 열은 WKB 점 (GeoArrow geoarrow.wkb / GeoParquet 메타데이터 포함).
+    """
+    if request.polygon_wkt is not None:
+        request = request.model_copy(update={"polygon_wkt": query_cache.canonical_wkt(request.polygon_wkt)})
+    try:
+        query, params = await run_db(lambda db: export.export_query(db, request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def generate():
+        # 내보내기가 끝날 때(또는 클라이언트가 끊을 때)까지 풀 연결 하나를 점유
+        with get_db() as db:
+            yield from export.iter_export(db, query, params, format)
+
+    media_type, extension = export.EXPORT_FORMATS[format]
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="earthquakes.{extension}"'},
+    )
+
+@app.get("/api/earthquakes/live")
+async def live_earthquakes(
+    request: Request,
+    bbox: Optional[str] = None,
+    min_magnitude: Optional[float] = None,
+    cursor: Optional[str] = None
+):
+    """적재로 삽입/갱신된 이벤트를 Server-Sent Events 로 실시간 수신 (구독자별 DB 조회 없음)
+
+    재연결 시 Last-Event-ID 헤더(또는 cursor)의 다음 이벤트부터 이어 보내며, 버퍼보다 오래 끊겼으면
+    reset 이벤트를 먼저 보낸다 - 클라이언트는 목록을 다시 받고 그대로 이어 받으면 된다.
+    """
+    feed_filter = live.FeedFilter.create(parse_bbox(bbox) if bbox else None, min_magnitude)
+    if live.live_feed.full:
+        raise HTTPException(status_code=503, detail="실시간 피드 구독자 수가 한도에 도달했습니다")
+    return StreamingResponse(
+        live.live_feed.stream(feed_filter, request.headers.get("last-event-id") or cursor),
+        media_type="text/event-stream",
+        # 프록시(nginx 등)가 응답을 모아 두지 않고 바로 흘려보내도록
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/earthquakes/live/stats")
+async def get_live_stats():
+    """실시간 피드 구독자 수와 현재 커서"""
+    return live.live_feed.stats()
 
 @app.get("/api/earthquakes/recent", response_model=List[EarthquakeResponse])
 async def get_recent_earthquakes(
     limit: Optional[int] = 100,
-    min_magnitude: Optional[float] = None
+    min_magnitude: Optional[float] = None,
+    fast: bool = False
 ):
     """최근 지진 목록 조회 (get_earthquakes와 동일)"""
-    with get_db() as db:
-        service = EarthquakeService(db)
-        return service.get_earthquakes(limit, min_magnitude)
+    return await get_earthquakes(limit, min_magnitude, fast)
 
 @app.get("/api/earthquakes/sync")
 async def sync_earthquake_data():
-    """USGS API에서 지진 데이터 동기화"""
+    """USGS API에서 지진 데이터 동기화 (진행 중인 동기화가 있으면 그 결과를 공유)"""
     try:
-        # 최근 24시간 데이터 가져오기
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_day.geojson"
-            )
-            data = response.json()
-        
-        print(f"USGS API에서 {len(data.get('features', []))}개 지진 데이터 받음")
-        
-        with get_db() as db:
-            service = EarthquakeService(db)
-            count = service.sync_usgs_data(data)
-        
+        result = await sync_scheduler.run_once()
         return {
-            "message": f"동기화 완료: {count}개 지진 데이터 처리", 
-            "total_received": len(data.get('features', []))
+            "message": f"동기화 완료: {result['inserted']}개 삽입, {result['updated']}개 갱신",
+            **result
         }
     
     except Exception as e:
-        print(f"동기화 오류: {str(e)}")
+        logger.error("동기화 오류: %s", e)
         raise HTTPException(status_code=500, detail=f"동기화 실패: {str(e)}")
 
+@app.get("/api/earthquakes/sync/status")
+async def sync_status():
+    """예약 동기화 상태 (마지막 실행 시각, 소요 시간, 처리 건수)"""
+    return sync_scheduler.status()
+
+@app.post("/api/admin/backfill")
+async def start_backfill(request: BackfillRequest):
+    """USGS FDSN API(또는 로컬 GeoJSON 디렉터리)에서 과거 데이터 백필 시작"""
+    if not request.source_dir and (request.start is None or request.end is None):
+        raise HTTPException(status_code=400, detail="start와 end 또는 source_dir가 필요합니다")
+    if request.source_dir and not os.path.isdir(request.source_dir):
+        raise HTTPException(status_code=400, detail="source_dir 디렉터리가 없습니다")
+    job = backfill.start_backfill(
+        request.start, request.end, request.window_days, request.concurrency,
+        request.source_dir, request.job_name
+    )
+    return job.to_dict()
+
+@app.get("/api/admin/slow-queries")
+async def get_slow_queries(limit: int = Query(20, ge=1, le=1000)):
+    """임계값을 넘은 SQL 문장의 EXPLAIN (ANALYZE, BUFFERS) 계획 (최근 것부터)"""
+    return {
+        "threshold_ms": metrics.slow_query_log.threshold_ms,
+        "capture_interval_seconds": metrics.slow_query_log.interval,
+        "queries": metrics.slow_query_log.entries(limit),
+    }
+
+@app.delete("/api/admin/slow-queries")
+async def clear_slow_queries():
+    """수집된 느린 쿼리 계획 비우기"""
+    metrics.slow_query_log.clear()
+    return {"status": "cleared"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus 형식 메트릭 (경로별 요청 시간, 문장별 SQL 시간, 커넥션 풀)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/admin/backfill/{job_id}")
+async def get_backfill_status(job_id: str):
+    """백필 작업 진행 상황"""
+    job = backfill.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="백필 작업을 찾을 수 없습니다")
+    return job.to_dict()
+
 @app.post("/api/earthquakes/search/radius", response_model=List[EarthquakeResponse])
-async def search_radius(request: RadiusSearchRequest):
-    """반경 검색 (좌표 기반)"""
-    with get_db() as db:
-        service = EarthquakeService(db)
-        return service.search_within_radius(
-            request.latitude, request.longitude, request.radius_km
-        )
+async def search_radius(request: RadiusSearchRequest, fast: bool = False):
+    """반경 검색 (좌표 기반, 기간/규모/깊이/개수 필터 선택) - 데이터가 바뀌기 전까지 같은 검색은 캐시에서 응답"""
+    lat, lon, radius_km = query_cache.radius_params(request.latitude, request.longitude, request.radius_km)
+    rows = await query_cache.cached_rows(
+        ("radius", lat, lon, radius_km) + search_filter_key(request),
+        lambda: run_db(lambda db: EarthquakeService(db).fetch_radius_rows(lat, lon, radius_km, request)),
+    )
+    if fast:
+        return JSONBytesResponse(rows_to_json(rows))
+    return rows_to_models(rows)
 
 @app.post("/api/earthquakes/search/region", response_model=List[EarthquakeResponse])
-async def search_region(request: RegionSearchRequest):
-    """지역 내 검색 (내포 여부)"""
-    with get_db() as db:
-        service = EarthquakeService(db)
-        return service.search_within_polygon(request.polygon_wkt)
+async def search_region(request: RegionSearchRequest, fast: bool = False):
+    """지역 내 검색 (내포 여부, 기간/규모/깊이/개수 필터 선택) - 데이터가 바뀌기 전까지 같은 검색은 캐시에서 응답"""
+    polygon_wkt = query_cache.canonical_wkt(request.polygon_wkt)
+    try:
+        rows = await query_cache.cached_rows(
+            ("polygon", polygon_wkt) + search_filter_key(request),
+            lambda: run_db(lambda db: EarthquakeService(db).fetch_polygon_rows(polygon_wkt, request)),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if fast:
+        return JSONBytesResponse(rows_to_json(rows))
+    return rows_to_models(rows)
+
+@app.post("/api/earthquakes/search/radius/batch")
+async def search_radius_batch(
+    request: BatchRadiusSearchRequest,
+    format: str = Query("ndjson", pattern="^(ndjson|json)$")
+):
+    """여러 지점(id, 좌표, 반경, 필터) 반경 검색을 한 번의 왕복으로 처리해 지점별로 스트리밍"""
+    def generate():
+        with get_db() as db:
+            yield from EarthquakeService(db).iter_batch_radius(request.centers, format)
+
+    media_type = "application/json" if format == "json" else "application/x-ndjson"
+    return StreamingResponse(generate(), media_type=media_type)
+
+@app.post("/api/earthquakes/search/nearest", response_model=List[EarthquakeResponse])
+async def search_nearest(request: NearestSearchRequest, fast: bool = False):
+    """최근접 k개 검색 (가까운 순, 규모/기간/최대 거리 필터 선택)"""
+    rows = await run_db(lambda db: EarthquakeService(db).fetch_nearest_rows(request))
+    if fast:
+        return JSONBytesResponse(rows_to_json(rows))
+    return rows_to_models(rows)
+
+@app.get("/api/earthquakes/search/cache/stats")
+async def get_search_cache_stats():
+    """공간 검색 결과 캐시 적중률, 크기, 현재 데이터 세대"""
+    return query_cache.search_cache.stats()
+
+@app.get("/api/earthquakes/snapshot/stats")
+async def get_snapshot_stats():
+    """최근 이벤트 메모리 스냅샷 상태 (행 수, 창 시작, 구축/패치 횟수)"""
+    return snapshot.hot_snapshot.stats()
 
 @app.post("/api/earthquakes/boundary", response_model=BoundaryStatsResponse)
 async def calculate_boundary(earthquake_ids: List[str]):
     """경계 계산 (면적, 중심점)"""
-    with get_db() as db:
-        service = EarthquakeService(db)
-        return service.calculate_boundary_stats(earthquake_ids)
-
-@app.get("/api/earthquakes/stats")
-async def get_stats():
-    """통계 정보"""
-    with get_db() as db:
-        service = EarthquakeService(db)
-        return service.get_statistics()
+    return await run_db(lambda db: EarthquakeService(db).calculate_boundary_stats(earthquake_ids))
+
+@app.post("/api/earthquakes/boundary/search", response_model=BoundaryStatsResponse)
+async def calculate_boundary_for_search(request: BoundarySearchRequest):
+    """검색 조건(id 집합, 반경, 다각형, 기간/규모/깊이 필터)으로 정한 지진들의 경계 계산
+
+    규모 가중 중심(weighted_centroid), 오목 껍질(concave_hull_ratio), 격자 밀도(density_cell_deg)는 선택.
+    """
+    if request.polygon_wkt is not None:
+        request = request.model_copy(update={"polygon_wkt": query_cache.canonical_wkt(request.polygon_wkt)})
+    try:
+        return await run_db(lambda db: EarthquakeService(db).calculate_boundary_stats_for(request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/earthquakes/clusters", response_model=ClusterListResponse)
+async def get_clusters(bbox: str, zoom: int):
+    """지도 bbox/줌에 맞춘 격자 클러스터 (저줌은 사전 집계에서 응답)"""
+    box = parse_bbox(bbox)
+    if not 0 <= zoom <= clusters.CLUSTER_MAX_ZOOM:
+        raise HTTPException(status_code=400, detail="잘못된 줌 레벨입니다")
+
+    result = await run_db(lambda db: clusters.get_clusters(db, box, zoom))
+    return {"zoom": zoom, "cell_size_deg": clusters.cell_size(zoom), "clusters": result}
+
+def density_headers(zoom: int, count: int, start: Optional[datetime], end: Optional[datetime]) -> dict:
+    return {
+        "X-Density-Zoom": str(zoom),
+        "X-Density-Cell-Size": repr(clusters.cell_size(zoom)),
+        "X-Density-Count": str(count),
+        "X-Density-Start": start.isoformat() if start else "",
+        "X-Density-End": end.isoformat() if end else "",
+    }
+
+@app.get("/api/earthquakes/density", response_model=DensityGridResponse)
+async def get_density(
+    bbox: str = "-180,-90,180,90",
+    zoom: int = Query(3, ge=0),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    format: str = Query("binary", pattern="^(binary|json)$")
+):
+    """bbox/줌/기간의 셀별 개수와 에너지 합 (밀도 롤업에서 응답, 기간은 UTC 일 단위로 넓힘)
+
+    format=binary 는 density.grid_payload 형식의 열 배열, 셀 수와 실제 구간은 X-Density-* 헤더로 전달.
+    """
+    box = parse_bbox(bbox)
+    if zoom > density.DENSITY_MAX_ZOOM:
+        raise HTTPException(status_code=400, detail=f"줌 레벨은 {density.DENSITY_MAX_ZOOM} 이하여야 합니다")
+    start, end = density.day_window(start_time, end_time)
+
+    rows = await query_cache.cached_rows(
+        ("density", box, zoom, start, end),
+        lambda: run_db(lambda db: density.density_grid(db, box, zoom, start, end)),
+    )
+    if format == "json":
+        return {
+            "zoom": zoom, "cell_size_deg": clusters.cell_size(zoom), "start_time": start, "end_time": end,
+            "cells": density.grid_json(rows, zoom),
+        }
+    return Response(
+        content=density.grid_payload(rows),
+        media_type="application/octet-stream",
+        headers=density_headers(zoom, len(rows), start, end),
+    )
+
+@app.get("/api/earthquakes/density/series", response_model=DensitySeriesResponse)
+async def get_density_series(
+    bbox: str = "-180,-90,180,90",
+    bucket: str = Query("day", pattern="^(day|week|month|year)$"),
+    zoom: Optional[int] = Query(None, ge=0),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    format: str = Query("binary", pattern="^(binary|json)$")
+):
+    """bbox 와 겹치는 셀들의 시간 버킷별 개수와 에너지 합 (zoom 생략 시 bbox 경계에 맞는 가장 거친 줌)
+
+    format=binary 는 density.series_payload 형식의 열 배열.
+    """
+    box = parse_bbox(bbox)
+    if zoom is None:
+        zoom = density.aligned_zoom(box)
+    elif zoom > density.DENSITY_MAX_ZOOM:
+        raise HTTPException(status_code=400, detail=f"줌 레벨은 {density.DENSITY_MAX_ZOOM} 이하여야 합니다")
+    start, end = density.day_window(start_time, end_time)
+
+    rows = await query_cache.cached_rows(
+        ("density_series", box, bucket, zoom, start, end),
+        lambda: run_db(lambda db: density.density_series(db, box, bucket, zoom, start, end)),
+    )
+    if format == "json":
+        return {
+            "bucket": bucket, "zoom": zoom, "cell_size_deg": clusters.cell_size(zoom),
+            "start_time": start, "end_time": end, "buckets": density.series_json(rows),
+        }
+    return Response(
+        content=density.series_payload(rows),
+        media_type="application/octet-stream",
+        headers=density_headers(zoom, len(rows), start, end),
+    )
+
+@app.get("/api/tiles/{z}/{x}/{y}.pbf")
+async def get_tile(
+    z: int,
+    x: int,
+    y: int,
+    min_magnitude: Optional[float] = None,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+):
+    """Mapbox Vector Tile (ST_AsMVT) - 같은 타일/필터 조합은 메모리 캐시에서 응답"""
+    if not 0 <= z <= tiles.MAX_TILE_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="잘못된 타일 좌표입니다")
+
+    key = tiles.tile_key(z, x, y, min_magnitude, start_time, end_time)
+    tile = tiles.tile_cache.get(key)
+    if tile is None:
+        generation = tiles.tile_cache.generation
+        tile = await run_db(lambda db: tiles.render_tile(db, z, x, y, min_magnitude, start_time, end_time))
+        tiles.tile_cache.put(key, tile, generation)
+    return Response(content=tile, media_type="application/vnd.mapbox-vector-tile")
+
+@app.get("/api/tiles/cache/stats")
+async def get_tile_cache_stats():
+    """타일 캐시 적중률 및 크기"""
+    return tiles.tile_cache.stats()
+
+@app.get("/api/earthquakes/stats", response_model=StatsResponse)
+async def get_stats(start_time: Optional[datetime] = None, end_time: Optional[datetime] = None):
+    """통계 정보 (start_time/end_time 으로 임의 구간 지정 가능)"""
+    return await run_db(lambda db: EarthquakeService(db).get_statistics(start_time, end_time))
+
+@app.get("/api/earthquakes/stats/histogram", response_model=MagnitudeHistogramResponse)
+async def get_magnitude_histogram(
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    bin_width: float = Query(0.5, gt=0, le=10)
+):
+    """규모 히스토그램 (bin_width 는 0.1의 배수)"""
+    try:
+        return await run_db(
+            lambda db: EarthquakeService(db).get_magnitude_histogram(start_time, end_time, bin_width)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,415 @@
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import psycopg2.extensions
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# 이 시간(ms)보다 오래 걸린 조회는 EXPLAIN (ANALYZE, BUFFERS) 계획을 수집 (0 이하면 끔)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500"))
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "50"))
+# 같은 문장은 이 간격(초)에 한 번만 수집 (느린 쿼리가 몰려도 부하를 두 배로 만들지 않도록)
+SLOW_QUERY_CAPTURE_INTERVAL = float(os.getenv("SLOW_QUERY_CAPTURE_INTERVAL", "60"))
+
+# 요청/쿼리 지연 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """단조 증가 카운터"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def total(self) -> float:
+        with self._lock:
+            return sum(self._values.values())
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in items]
+
+
+class Gauge:
+    """수집 시점에 함수를 호출해 값을 읽는 게이지 ({라벨 값 튜플: 값} 반환)"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._function: Callable[[], Dict[Labels, float]] = dict
+
+    def set_function(self, function: Callable[[], Dict[Labels, float]]) -> None:
+        self._function = function
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in self._function().items()
+        ]
+
+
+class Histogram:
+    """누적 구간 히스토그램 (Prometheus histogram 형식)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # 라벨 -> [구간별 개수..., +Inf 개수, 합, 총 개수]
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def totals(self) -> Tuple[float, int]:
+        """모든 라벨의 (합, 개수)"""
+        with self._lock:
+            return (sum(series[-2] for series in self._series.values()),
+                    int(sum(series[-1] for series in self._series.values())))
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        lines = []
+        for labels, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP 요청 처리 시간 (응답 본문 전송 완료까지)", ("method", "route", "status"),
+)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds", "SQL 문장 실행 시간 (execute)", ("statement",),
+)
+DB_FETCH_SECONDS = Counter(
+    "db_fetch_seconds_total", "결과 행 가져오기에 쓴 시간 (서버 측 커서는 실제 조회 시간)", ("statement",),
+)
+DB_STATEMENT_ERRORS = Counter("db_statement_errors_total", "실패한 SQL 문장 수", ("statement",))
+DB_POOL_CONNECTIONS = Gauge("db_pool_connections", "커넥션 풀 연결 수", ("state",))
+DB_POOL_WAIT = Histogram("db_pool_wait_seconds", "풀에서 연결을 얻기까지 기다린 시간")
+DB_POOL_TIMEOUTS = Counter("db_pool_timeouts_total", "풀 대기 시간 초과 횟수")
+DB_CONNECTIONS_OPENED = Counter("db_connections_opened_total", "새로 연 DB 연결 수")
+SLOW_QUERIES = Counter("db_slow_queries_total", "임계값을 넘은 SQL 문장 수", ("statement",))
+SNAPSHOT_QUERIES = Counter(
+    "snapshot_queries_total", "메모리 스냅샷으로 응답한(served) / DB로 넘긴(fallback) 조회 수", ("query", "result"),
+)
+LIVE_FEED_SUBSCRIBERS = Gauge("live_feed_subscribers", "실시간 피드(SSE) 구독자 수")
+LIVE_FEED_EVENTS = Counter("live_feed_events_total", "실시간 피드로 방송한 이벤트 수", ("change",))
+LIVE_FEED_OVERFLOWS = Counter("live_feed_overflows_total", "전송 대기열이 가득 차 끊은 구독 수")
+
+REGISTRY = [
+    HTTP_REQUEST_DURATION,
+    DB_STATEMENT_DURATION,
+    DB_FETCH_SECONDS,
+    DB_STATEMENT_ERRORS,
+    DB_POOL_CONNECTIONS,
+    DB_POOL_WAIT,
+    DB_POOL_TIMEOUTS,
+    DB_CONNECTIONS_OPENED,
+    SLOW_QUERIES,
+    SNAPSHOT_QUERIES,
+    LIVE_FEED_SUBSCRIBERS,
+    LIVE_FEED_EVENTS,
+    LIVE_FEED_OVERFLOWS,
+]
+
+
+def render() -> str:
+    """Prometheus 텍스트 노출 형식 (0.0.4)"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def db_time_totals() -> Tuple[float, int]:
+    """지금까지 SQL 실행 + 행 가져오기에 쓴 총 시간(초)과 실행 문장 수"""
+    seconds, count = DB_STATEMENT_DURATION.totals()
+    return seconds + DB_FETCH_SECONDS.total(), count
+
+
+# --- SQL 문장 라벨 ---
+
+_EXECUTE = re.compile(r"^\s*EXECUTE\s+(\w+)", re.IGNORECASE)
+_VERB = re.compile(r"^\s*(\w+)")
+_RELATION = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE|JOIN)\s+(?:ONLY\s+)?([a-z_][\w.]*)", re.IGNORECASE)
+_labels = LRUCache(1024)
+
+
+def statement_label(query: Any) -> str:
+    """라벨 수가 코드의 문장 수로 제한되도록 준비문 이름 또는 '동사 첫_테이블' 로 요약"""
+    if not isinstance(query, str):
+        query = query.decode() if isinstance(query, bytes) else type(query).__name__
+    label = _labels.get(query)
+    if label is None:
+        match = _EXECUTE.match(query)
+        if match:
+            label = match.group(1)
+        else:
+            verb = _VERB.match(query)
+            relation = _RELATION.search(query)
+            label = " ".join(part for part in (
+                verb.group(1).lower() if verb else "sql",
+                relation.group(1).lower() if relation else "",
+            ) if part)
+        _labels.put(query, label)
+    return label
+
+
+# --- 느린 쿼리 계획 수집 ---
+
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH|EXECUTE|TABLE|VALUES)\b", re.IGNORECASE)
+_SIDE_EFFECTS = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|TRUNCATE|COPY|LOCK|CALL|REFRESH|NOTIFY|"
+    r"nextval|setval|set_config|pg_advisory\w*|pg_sleep)\b",
+    re.IGNORECASE,
+)
+
+
+class SlowQueryLog:
+    """느린 SQL 문장의 EXPLAIN (ANALYZE, BUFFERS) 계획을 최근 N개만 보관하는 링 버퍼"""
+
+    def __init__(self, max_entries: int, threshold_ms: float, interval: float):
+        self.threshold_ms = threshold_ms
+        self.interval = interval
+        self._entries: deque = deque(maxlen=max_entries)
+        self._last_capture: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _should_capture(self, label: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_capture.get(label)
+            if last is not None and now - last < self.interval:
+                return False
+            self._last_capture[label] = now
+            return True
+
+    def record(self, cursor, label: str, seconds: float) -> None:
+        """임계값을 넘은 문장이면 같은 연결에서 계획을 다시 실행해 수집 (읽기 전용 문장만)"""
+        SLOW_QUERIES.inc(1, label)
+        query = cursor.query.decode(errors="replace") if cursor.query else ""
+        logger.warning("느린 쿼리", extra={"statement": label, "duration_ms": round(seconds * 1000, 1)})
+        # 서버 측 커서는 execute 가 DECLARE 뿐이고, 쓰기 문장은 다시 실행하면 안 됨
+        if cursor.name is not None or not _READ_ONLY.match(query) or _SIDE_EFFECTS.search(query):
+            return
+        if not self._should_capture(label):
+            return
+
+        plan = _explain(cursor.connection, query)
+        entry = {
+            "captured_at": datetime.now(timezone.utc).isoformat(),
+            "statement": label,
+            "duration_ms": round(seconds * 1000, 3),
+            "query": query[:4000],
+            "plan": plan,
+        }
+        with self._lock:
+            self._entries.append(entry)
+
+    def entries(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._entries)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._last_capture.clear()
+
+
+def _explain(conn, query: str) -> Optional[Any]:
+    """EXPLAIN (ANALYZE, BUFFERS) - 실패해도 진행 중인 트랜잭션을 망가뜨리지 않도록 세이브포인트 안에서 실행"""
+    in_transaction = conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    cursor = psycopg2.extensions.cursor(conn)  # 계측하지 않는 기본 커서
+    try:
+        if in_transaction:
+            cursor.execute("SAVEPOINT slow_query_explain")
+        cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query)
+        plan = cursor.fetchone()[0]
+        if in_transaction:
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except psycopg2.Error as e:
+        if in_transaction:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+        logger.warning("느린 쿼리 계획 수집 실패", extra={"error": str(e).strip()})
+        return None
+    finally:
+        cursor.close()
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_BUFFER_SIZE, SLOW_QUERY_THRESHOLD_MS, SLOW_QUERY_CAPTURE_INTERVAL)
+
+
+# --- 계측 커서 ---
+
+class InstrumentedCursorMixin:
+    """execute 는 문장별 히스토그램에, fetch 는 문장별 누적 시간에 기록하고 느린 문장은 계획 수집"""
+    statement = "sql"
+
+    def execute(self, query, vars=None):
+        self.statement = statement_label(query)
+        started = time.perf_counter()
+        try:
+            result = super().execute(query, vars)
+        except Exception:
+            DB_STATEMENT_ERRORS.inc(1, self.statement)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_STATEMENT_DURATION.observe(elapsed, self.statement)
+        if 0 < slow_query_log.threshold_ms <= elapsed * 1000:
+            slow_query_log.record(self, self.statement, elapsed)
+        return result
+
+    def executemany(self, query, vars_list):
+        self.statement = statement_label(query)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            DB_STATEMENT_DURATION.observe(time.perf_counter() - started, self.statement)
+
+    def copy_expert(self, sql, file, size=8192):
+        self.statement = statement_label(sql)
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            DB_STATEMENT_DURATION.observe(time.perf_counter() - started, self.statement)
+
+    def _timed_fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            DB_FETCH_SECONDS.inc(time.perf_counter() - started, self.statement)
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, *(() if size is None else (size,)))
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+_cursor_classes: Dict[type, type] = {}
+_cursor_classes_lock = threading.Lock()
+
+
+def instrumented_cursor_factory(factory: type) -> type:
+    """커서 클래스(기본 커서, RealDictCursor 등)의 계측 하위 클래스"""
+    cls = _cursor_classes.get(factory)
+    if cls is None:
+        with _cursor_classes_lock:
+            cls = _cursor_classes.get(factory)
+            if cls is None:
+                cls = type("Instrumented" + factory.__name__, (InstrumentedCursorMixin, factory), {})
+                _cursor_classes[factory] = cls
+    return cls
+
+
+# --- 요청 지연 시간 ---
+
+_route_templates: Dict[Any, str] = {}
+
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    """라우팅된 엔드포인트의 경로 템플릿 (/api/tiles/{z}/{x}/{y}.pbf 처럼 경로 변수는 그대로)"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    template = _route_templates.get(endpoint)
+    if template is None:
+        for route in getattr(scope.get("app"), "routes", []):
+            if getattr(route, "endpoint", None) is endpoint:
+                template = route.path
+                break
+        _route_templates[endpoint] = template = template or "unmatched"
+    return template
+
+
+class MetricsMiddleware:
+    """경로별 요청 처리 시간 기록 (ASGI 미들웨어 - 스트리밍 응답은 마지막 본문 조각까지 측정)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, scope["method"], _route_template(scope), str(status)
+            )
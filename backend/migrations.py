@@ -0,0 +1,373 @@
+import argparse
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+import partitions
+
+logger = logging.getLogger(__name__)
+
+# 여러 프로세스(워커/CLI)가 동시에 시작해도 스키마 변경은 한 곳에서만 실행되도록 잡는 advisory lock 키
+MIGRATION_LOCK_KEY = 0x45515F4D4947  # 'EQ_MIG'
+
+MIGRATIONS_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    """버전 번호 순으로 한 번만 적용되는 스키마 변경 (적용 기록과 같은 트랜잭션에서 실행)"""
+    version: int
+    name: str
+    apply: Callable[[Any], None]  # cursor 를 받아 DDL 실행
+
+
+# ---------------------------------------------------------------------------
+# 마이그레이션 정의
+# 이미 배포된 버전은 고치지 말고, 스키마를 바꿀 때는 새 버전을 뒤에 추가
+# 각 버전의 SQL 은 다른 모듈의 상수를 참조하지 않고 이 파일에 글자 그대로 고정한다 (모듈 상수가 바뀌어도
+# 적용된 버전의 내용이 달라지지 않도록). tests/test_migrations.py 가 버전별 SQL 의 해시를 확인한다.
+# (기준 버전 1~6 은 IF NOT EXISTS 로 작성되어 기존 DB 에도 그대로 적용되고 기록만 남음)
+# ---------------------------------------------------------------------------
+
+V1_EXTENSIONS_DDL = """
+    CREATE EXTENSION IF NOT EXISTS postgis;
+    CREATE EXTENSION IF NOT EXISTS postgis_topology;
+    CREATE EXTENSION IF NOT EXISTS btree_gist;
+"""
+
+# 파티션 키(time)가 기본 키에 포함되어야 하므로 (id, time) 복합 키
+V1_EARTHQUAKES_DDL = """
+    CREATE TABLE IF NOT EXISTS earthquakes (
+        id VARCHAR(50) NOT NULL,
+        magnitude DECIMAL(5,2),
+        place VARCHAR(500),
+        time TIMESTAMP WITH TIME ZONE NOT NULL,
+        updated TIMESTAMP WITH TIME ZONE,
+        depth DECIMAL(6,2),
+        location GEOGRAPHY(POINT, 4326),
+        url TEXT,
+        detail TEXT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, time)
+    ) PARTITION BY RANGE (time);
+    CREATE TABLE IF NOT EXISTS earthquakes_default PARTITION OF earthquakes DEFAULT;
+"""
+
+V1_EARTHQUAKE_INDEX_DDL = """
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_location ON earthquakes USING GIST(location);
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_time ON earthquakes(time);
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_magnitude ON earthquakes(magnitude);
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_depth ON earthquakes(depth);
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_time_id ON earthquakes(time, id);
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_location_geom ON earthquakes USING GIST((location::geometry));
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_time_brin ON earthquakes USING BRIN(time);
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_location_time ON earthquakes USING GIST(location, time, magnitude);
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_significant_location ON earthquakes USING GIST(location)
+        WHERE magnitude >= 4.5;
+    CREATE INDEX IF NOT EXISTS idx_earthquakes_significant_time ON earthquakes(time DESC)
+        WHERE magnitude >= 4.5;
+"""
+
+# 파티션 이전 전의 단일 테이블도 (id, time) 업서트가 동작하도록 보강하는 유일 인덱스
+V1_LEGACY_UNIQUE_DDL = "CREATE UNIQUE INDEX IF NOT EXISTS idx_earthquakes_id_time ON earthquakes(id, time);"
+
+
+def _earthquakes(cursor) -> None:
+    cursor.execute(V1_EXTENSIONS_DDL)
+    table_kind = partitions.table_kind(cursor)
+    if table_kind is None:
+        cursor.execute(V1_EARTHQUAKES_DDL)
+    cursor.execute(V1_EARTHQUAKE_INDEX_DDL)
+    if table_kind == "regular":
+        logger.warning("단일 earthquakes 테이블 사용 중 - 'python partitions.py migrate' 로 파티션 테이블로 이전하세요")
+        cursor.execute(V1_LEGACY_UNIQUE_DDL)
+
+
+def _execute(ddl: str) -> Callable[[Any], None]:
+    def apply(cursor) -> None:
+        cursor.execute(ddl)
+    return apply
+
+
+# 반경/다각형 검색 및 경계 계산 SQL 함수 (psql 등에서 직접 조회할 때 사용)
+SEARCH_FUNCTIONS_DDL = """
+    CREATE OR REPLACE FUNCTION find_earthquakes_within_radius(
+        center_lat DECIMAL,
+        center_lon DECIMAL,
+        radius_km DECIMAL
+    )
+    RETURNS TABLE(
+        id VARCHAR,
+        magnitude DECIMAL,
+        place VARCHAR,
+        time TIMESTAMP WITH TIME ZONE,
+        depth DECIMAL,
+        distance_km DECIMAL
+    ) AS $$
+    BEGIN
+        RETURN QUERY
+        SELECT
+            e.id,
+            e.magnitude,
+            e.place,
+            e.time,
+            e.depth,
+            ROUND(ST_Distance(e.location, ST_Point(center_lon, center_lat)::geography) / 1000, 2) as distance_km
+        FROM earthquakes e
+        WHERE ST_DWithin(e.location, ST_Point(center_lon, center_lat)::geography, radius_km * 1000)
+        ORDER BY distance_km;
+    END;
+    $$ LANGUAGE plpgsql;
+
+    -- 날짜변경선을 넘는 다각형도 geography 로 포함 여부 판단
+    CREATE OR REPLACE FUNCTION find_earthquakes_within_polygon(polygon_wkt TEXT)
+    RETURNS TABLE(
+        id VARCHAR,
+        magnitude DECIMAL,
+        place VARCHAR,
+        time TIMESTAMP WITH TIME ZONE,
+        depth DECIMAL
+    ) AS $$
+    BEGIN
+        RETURN QUERY
+        SELECT
+            e.id,
+            e.magnitude,
+            e.place,
+            e.time,
+            e.depth
+        FROM earthquakes e
+        WHERE ST_Covers(ST_GeogFromText(polygon_wkt), e.location);
+    END;
+    $$ LANGUAGE plpgsql;
+
+    CREATE OR REPLACE FUNCTION calculate_earthquake_region_stats(earthquake_ids TEXT[])
+    RETURNS TABLE(
+        total_count INTEGER,
+        center_point TEXT,
+        bounding_box TEXT,
+        convex_hull TEXT,
+        area_km2 DECIMAL
+    ) AS $$
+    DECLARE
+        points_geom GEOMETRY;
+    BEGIN
+        -- 지진 위치들을 하나의 멀티포인트로 수집
+        SELECT ST_Collect(location::geometry) INTO points_geom
+        FROM earthquakes
+        WHERE id = ANY(earthquake_ids);
+
+        IF points_geom IS NULL THEN
+            RETURN;
+        END IF;
+
+        RETURN QUERY
+        SELECT
+            array_length(earthquake_ids, 1) as total_count,
+            ST_AsText(ST_Centroid(points_geom)) as center_point,
+            ST_AsText(ST_Envelope(points_geom)) as bounding_box,
+            ST_AsText(ST_ConvexHull(points_geom)) as convex_hull,
+            ROUND((ST_Area(ST_ConvexHull(points_geom)::geography) / 1000000)::numeric, 2) as area_km2;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+CHECKPOINT_DDL = """
+    CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+        job_name VARCHAR(200) NOT NULL,
+        window_key VARCHAR(200) NOT NULL,
+        status VARCHAR(20) NOT NULL,
+        events INTEGER DEFAULT 0,
+        inserted INTEGER DEFAULT 0,
+        updated INTEGER DEFAULT 0,
+        error TEXT,
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (job_name, window_key)
+    );
+"""
+
+CLUSTERS_DDL = """
+    CREATE TABLE IF NOT EXISTS earthquake_clusters (
+        zoom SMALLINT NOT NULL,
+        cell_x INTEGER NOT NULL,
+        cell_y INTEGER NOT NULL,
+        event_count INTEGER NOT NULL,
+        max_magnitude DECIMAL(5,2),
+        latest_time TIMESTAMP WITH TIME ZONE,
+        sum_longitude DOUBLE PRECISION NOT NULL,
+        sum_latitude DOUBLE PRECISION NOT NULL,
+        PRIMARY KEY (zoom, cell_x, cell_y)
+    );
+"""
+
+STATS_ROLLUP_DDL = """
+    CREATE TABLE IF NOT EXISTS earthquake_stats_rollup (
+        bucket_size VARCHAR(4) NOT NULL,
+        bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+        event_count INTEGER NOT NULL,
+        magnitude_count INTEGER NOT NULL,
+        magnitude_sum DOUBLE PRECISION,
+        magnitude_min DECIMAL(5,2),
+        magnitude_max DECIMAL(5,2),
+        depth_count INTEGER NOT NULL,
+        depth_sum DOUBLE PRECISION,
+        depth_min DECIMAL(6,2),
+        depth_max DECIMAL(6,2),
+        PRIMARY KEY (bucket_size, bucket)
+    );
+    CREATE TABLE IF NOT EXISTS earthquake_magnitude_histogram (
+        bucket_size VARCHAR(4) NOT NULL,
+        bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+        magnitude_bin DECIMAL(4,1) NOT NULL,
+        event_count INTEGER NOT NULL,
+        PRIMARY KEY (bucket_size, bucket, magnitude_bin)
+    );
+"""
+
+POLYGONS_DDL = """
+    CREATE TABLE IF NOT EXISTS search_polygons (
+        polygon_hash VARCHAR(64) PRIMARY KEY,
+        piece_count INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        last_used_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS search_polygon_pieces (
+        polygon_hash VARCHAR(64) NOT NULL REFERENCES search_polygons(polygon_hash) ON DELETE CASCADE,
+        piece_no INTEGER NOT NULL,
+        geom GEOMETRY(POLYGON, 4326) NOT NULL,
+        PRIMARY KEY (polygon_hash, piece_no)
+    );
+"""
+
+DENSITY_ROLLUP_DDL = """
+    CREATE TABLE IF NOT EXISTS earthquake_density_rollup (
+        zoom SMALLINT NOT NULL,
+        bucket_size VARCHAR(5) NOT NULL,
+        bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+        cell_x INTEGER NOT NULL,
+        cell_y INTEGER NOT NULL,
+        event_count INTEGER NOT NULL,
+        energy_sum DOUBLE PRECISION NOT NULL,
+        max_magnitude DECIMAL(5,2),
+        PRIMARY KEY (zoom, bucket_size, bucket, cell_x, cell_y)
+    );
+"""
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "earthquakes 파티션 테이블 및 검색 인덱스", _earthquakes),
+    Migration(2, "백필 체크포인트", _execute(CHECKPOINT_DDL)),
+    Migration(3, "저줌 클러스터 사전 집계", _execute(CLUSTERS_DDL)),
+    Migration(4, "시간/일 단위 통계 롤업", _execute(STATS_ROLLUP_DDL)),
+    Migration(5, "지역 검색용 준비 다각형", _execute(POLYGONS_DDL)),
+    Migration(6, "검색/경계 계산 SQL 함수", _execute(SEARCH_FUNCTIONS_DDL)),
+    Migration(7, "줌/일/월 단위 밀도 롤업", _execute(DENSITY_ROLLUP_DDL)),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# ---------------------------------------------------------------------------
+# 실행
+# ---------------------------------------------------------------------------
+
+@contextmanager
+def advisory_lock(conn):
+    """세션 단위 advisory lock - 다른 프로세스가 마이그레이션 중이면 끝날 때까지 대기"""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+    conn.commit()
+    try:
+        yield
+    finally:
+        if not conn.closed:
+            conn.rollback()
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+            conn.commit()
+
+
+def applied_versions(conn) -> Dict[int, Any]:
+    """적용된 버전 -> 적용 시각"""
+    with conn.cursor() as cursor:
+        cursor.execute(MIGRATIONS_DDL)
+        cursor.execute("SELECT version, applied_at FROM schema_migrations ORDER BY version")
+        versions = dict(cursor.fetchall())
+    conn.commit()
+    return versions
+
+
+def apply_pending(conn) -> List[int]:
+    """아직 적용되지 않은 마이그레이션을 버전 순으로 적용 (advisory_lock 안에서 호출)
+
+    마이그레이션 하나와 그 적용 기록은 한 트랜잭션으로 커밋되므로, 중간에 실패하면
+    그 버전부터 다음 시작 때 다시 시도한다.
+    """
+    applied = applied_versions(conn)
+    newer = [version for version in applied if version > LATEST_VERSION]
+    if newer:
+        logger.warning("코드가 모르는 스키마 버전이 적용되어 있음: %s (코드 최신 버전 %d)", newer, LATEST_VERSION)
+
+    done = []
+    for migration in MIGRATIONS:
+        if migration.version in applied:
+            continue
+        logger.info("마이그레이션 %d 적용: %s", migration.version, migration.name)
+        try:
+            with conn.cursor() as cursor:
+                migration.apply(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                    (migration.version, migration.name),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        done.append(migration.version)
+    return done
+
+
+def migrate(conn) -> List[int]:
+    """advisory lock 을 잡고 남은 마이그레이션 적용 (CLI 스크립트가 서버 없이 실행될 때 사용)"""
+    with advisory_lock(conn):
+        return apply_pending(conn)
+
+
+def status(conn) -> List[Dict[str, Any]]:
+    applied = applied_versions(conn)
+    return [
+        {"version": m.version, "name": m.name, "applied_at": applied.get(m.version)}
+        for m in MIGRATIONS
+    ]
+
+
+def main():
+    from database import get_db
+    from logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="데이터베이스 스키마 마이그레이션")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate", help="남은 마이그레이션 적용")
+    subparsers.add_parser("status", help="마이그레이션별 적용 여부")
+    args = parser.parse_args()
+    configure_logging()
+
+    with get_db() as conn:
+        if args.command == "migrate":
+            applied = migrate(conn)
+            print(f"적용한 버전: {applied}" if applied else f"최신 상태 (버전 {LATEST_VERSION})")
+        else:
+            for row in status(conn):
+                applied_at = row["applied_at"].isoformat() if row["applied_at"] else "미적용"
+                print(f"{row['version']:>4}  {applied_at:<32}  {row['name']}")
+
+
+if __name__ == "__main__":
+    main()
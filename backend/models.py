@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import List, Optional
 
@@ -14,23 +14,142 @@ class EarthquakeResponse(BaseModel):
     url: Optional[str]
     distance_km: Optional[float] = None
 
-class RadiusSearchRequest(BaseModel):
+class EarthquakePage(BaseModel):
+    items: List[EarthquakeResponse]
+    next_cursor: Optional[str] = None  # 다음 페이지 요청 시 cursor 파라미터로 전달
+
+class SearchFilters(BaseModel):
+    """반경/지역/최근접 검색 공통 선택 필터"""
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None  # 미포함
+    min_magnitude: Optional[float] = None
+    max_magnitude: Optional[float] = None
+    min_depth: Optional[float] = None
+    max_depth: Optional[float] = None
+    limit: Optional[int] = Field(None, ge=1, le=10000)
+
+class RadiusSearchRequest(SearchFilters):
     latitude: float
     longitude: float
     radius_km: float
 
-class RegionSearchRequest(BaseModel):
+class ExportRequest(SearchFilters):
+    """대량 내보내기 대상 - 반경 또는 다각형 + 기간/규모/깊이 필터 (모두 없으면 전체 카탈로그)"""
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = Field(None, gt=0)
+    polygon_wkt: Optional[str] = None
+    limit: Optional[int] = Field(None, ge=1)  # 검색과 달리 상한 없음
+
+class BatchRadiusCenter(SearchFilters):
+    id: str  # 호출자가 붙인 지점 식별자 (결과 묶음 키)
+    latitude: float
+    longitude: float
+    radius_km: float = Field(gt=0)
+
+class BatchRadiusSearchRequest(BaseModel):
+    centers: List[BatchRadiusCenter] = Field(min_length=1, max_length=10000)
+
+class NearestSearchRequest(SearchFilters):
+    latitude: float
+    longitude: float
+    limit: int = Field(20, ge=1, le=1000)
+    max_distance_km: Optional[float] = Field(None, gt=0)
+
+class RegionSearchRequest(SearchFilters):
     polygon_wkt: str  # WKT 형식의 다각형
 
+class BoundarySearchRequest(SearchFilters):
+    """경계 통계 대상 - id 목록, 반경, 다각형, 기간/규모/깊이 필터를 조합 (모두 AND)"""
+    ids: Optional[List[str]] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = Field(None, gt=0)
+    polygon_wkt: Optional[str] = None
+    # 선택 집계
+    weighted_centroid: bool = False  # 규모 가중 중심점
+    concave_hull_ratio: Optional[float] = Field(None, gt=0, le=1)  # ST_ConcaveHull target_percent
+    density_cell_deg: Optional[float] = Field(None, gt=0, le=90)  # 격자 밀도 셀 크기(도)
+
+class DensityCell(BaseModel):
+    longitude: float  # 셀 남서쪽 모서리
+    latitude: float
+    count: int
+    max_magnitude: Optional[float]
+
 class BoundaryStatsResponse(BaseModel):
     total_count: int
     center_point: str
     bounding_box: str
     convex_hull: str
     area_km2: float
+    weighted_centroid: Optional[str] = None
+    concave_hull: Optional[str] = None
+    density_cell_deg: Optional[float] = None
+    density: Optional[List[DensityCell]] = None
 
 class StatsResponse(BaseModel):
     total_earthquakes: int
     magnitude_stats: dict
     depth_stats: dict
-    recent_24h: int 
\ No newline at end of file
+    recent_24h: int 
+
+class HistogramBin(BaseModel):
+    magnitude: float  # 구간 하한
+    count: int
+
+class MagnitudeHistogramResponse(BaseModel):
+    bin_width: float
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    bins: List[HistogramBin]
+
+class ClusterResponse(BaseModel):
+    latitude: float
+    longitude: float
+    count: int
+    max_magnitude: Optional[float]
+    latest_time: Optional[datetime]
+
+class ClusterListResponse(BaseModel):
+    zoom: int
+    cell_size_deg: float
+    clusters: List[ClusterResponse]
+
+class DensityGridCell(BaseModel):
+    cell_x: int
+    cell_y: int
+    min_longitude: float  # 셀 남서쪽 모서리
+    min_latitude: float
+    count: int
+    energy_joules: float
+    max_magnitude: Optional[float]
+
+class DensityGridResponse(BaseModel):
+    zoom: int
+    cell_size_deg: float
+    start_time: Optional[datetime] = None  # 실제 집계 구간 (UTC 일 경계)
+    end_time: Optional[datetime] = None
+    cells: List[DensityGridCell]
+
+class DensityBucket(BaseModel):
+    bucket: datetime
+    count: int
+    energy_joules: float
+    max_magnitude: Optional[float]
+
+class DensitySeriesResponse(BaseModel):
+    bucket: str
+    zoom: int
+    cell_size_deg: float
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    buckets: List[DensityBucket]
+
+class BackfillRequest(BaseModel):
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    window_days: float = Field(7, gt=0)
+    concurrency: int = Field(4, ge=1, le=16)
+    source_dir: Optional[str] = None  # 네트워크 대신 읽을 로컬 GeoJSON 디렉터리
+    job_name: Optional[str] = None
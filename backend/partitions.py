@@ -0,0 +1,346 @@
+import argparse
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import clusters
+import density
+import query_cache
+import stats
+import tiles
+from snapshot import hot_snapshot
+
+logger = logging.getLogger(__name__)
+
+# 월 단위 시간 파티션 설정
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+# 이 개월 수보다 오래된 파티션은 보관 정책 적용 (0 이면 무기한 보관)
+PARTITION_RETENTION_MONTHS = int(os.getenv("PARTITION_RETENTION_MONTHS", "0"))
+# detach: earthquakes_archive_pYYYYMM 테이블로 분리해 보관, drop: 삭제
+PARTITION_RETENTION_MODE = os.getenv("PARTITION_RETENTION_MODE", "detach")
+PARTITION_MAINTENANCE_INTERVAL_SECONDS = int(os.getenv("PARTITION_MAINTENANCE_INTERVAL_SECONDS", "21600"))
+
+DEFAULT_PARTITION = "earthquakes_default"
+
+# 파티션 키(time)가 기본 키에 포함되어야 하므로 (id, time) 복합 키.
+# id 유일성은 적재 경로(UPSERT_SQL)가 시각이 바뀐 행을 옮기는 방식으로 유지한다.
+EARTHQUAKES_DDL = """
+    CREATE TABLE IF NOT EXISTS earthquakes (
+        id VARCHAR(50) NOT NULL,
+        magnitude DECIMAL(5,2),
+        place VARCHAR(500),
+        time TIMESTAMP WITH TIME ZONE NOT NULL,
+        updated TIMESTAMP WITH TIME ZONE,
+        depth DECIMAL(6,2),
+        location GEOGRAPHY(POINT, 4326),
+        url TEXT,
+        detail TEXT,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (id, time)
+    ) PARTITION BY RANGE (time);
+    CREATE TABLE IF NOT EXISTS earthquakes_default PARTITION OF earthquakes DEFAULT;
+"""
+
+EARTHQUAKE_COLUMN_NAMES = "id, magnitude, place, time, updated, depth, location, url, detail, created_at"
+
+# 상위 테이블에 만들면 모든 파티션에 같은 인덱스가 생성됨 (현재 정의 - 적용된 마이그레이션은 migrations.py 의 사본을 씀)
+EARTHQUAKE_INDEX_DDL = (
+    "CREATE INDEX IF NOT EXISTS idx_earthquakes_location ON earthquakes USING GIST(location)",
+    "CREATE INDEX IF NOT EXISTS idx_earthquakes_time ON earthquakes(time)",
+    "CREATE INDEX IF NOT EXISTS idx_earthquakes_magnitude ON earthquakes(magnitude)",
+    "CREATE INDEX IF NOT EXISTS idx_earthquakes_depth ON earthquakes(depth)",
+    # 키셋 페이지네이션 (time DESC, id DESC) 용 복합 인덱스
+    "CREATE INDEX IF NOT EXISTS idx_earthquakes_time_id ON earthquakes(time, id)",
+    # 벡터 타일/경위도 bbox 필터용 geometry 표현식 인덱스
+    "CREATE INDEX IF NOT EXISTS idx_earthquakes_location_geom ON earthquakes USING GIST((location::geometry))",
+)
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"earthquakes_p{month:%Y%m}"
+
+
+def _months(start: datetime, end: datetime) -> Iterable[datetime]:
+    """[start, end) 구간에 걸친 월 시작 시각들"""
+    end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    month = month_start(start)
+    while month < end:
+        yield month
+        month = add_months(month, 1)
+
+
+def table_kind(cursor) -> Optional[str]:
+    """earthquakes 테이블 종류: 'partitioned', 'regular', 또는 없으면 None"""
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('earthquakes')")
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    return "partitioned" if row[0] == "p" else "regular"
+
+
+def existing_partitions(cursor) -> Dict[str, datetime]:
+    """월 파티션 이름 -> 월 시작 시각 (기본 파티션 제외)"""
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'earthquakes'::regclass
+    """)
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        if name.startswith("earthquakes_p") and name[len("earthquakes_p"):].isdigit():
+            partitions[name] = datetime.strptime(name[-6:], "%Y%m").replace(tzinfo=timezone.utc)
+    return partitions
+
+
+def create_schema(cursor) -> None:
+    """파티션된 earthquakes 테이블 + 공통 인덱스 + 현재 월부터 미리 만든 파티션 (단일 테이블 이전용)
+
+    새 DB 는 migrations.py 에 고정된 버전별 SQL 로 만든다. 테이블/인덱스를 바꿀 때는 여기의 현재 정의와
+    함께 migrations.py 에 새 버전을 추가해, 이전 후의 테이블도 최신 스키마가 되게 한다.
+    """
+    from services import SEARCH_INDEX_DDL
+
+    cursor.execute(EARTHQUAKES_DDL)
+    for statement in EARTHQUAKE_INDEX_DDL + SEARCH_INDEX_DDL:
+        cursor.execute(statement)
+    current = month_start(datetime.now(timezone.utc))
+    for offset in range(PARTITION_PREMAKE_MONTHS + 1):
+        ensure_month(cursor, add_months(current, offset))
+
+
+def ensure_month(cursor, month: datetime) -> bool:
+    """해당 월 파티션이 없으면 생성 (기본 파티션에 들어가 있던 그 달 행은 새 파티션으로 이동)"""
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (name,))
+    if cursor.fetchone()[0]:
+        return False
+
+    lower, upper = month, add_months(month, 1)
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE time >= %s AND time < %s)",
+        (lower, upper),
+    )
+    has_default_rows = cursor.fetchone()[0]
+
+    if has_default_rows:
+        # 기본 파티션에 해당 범위 행이 있으면 파티션 생성이 거부되므로 잠시 분리한 뒤 옮김
+        cursor.execute(f"ALTER TABLE earthquakes DETACH PARTITION {DEFAULT_PARTITION}")
+    cursor.execute(
+        f"CREATE TABLE {name} PARTITION OF earthquakes FOR VALUES FROM (%s) TO (%s)",
+        (lower, upper),
+    )
+    if has_default_rows:
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE time >= %s AND time < %s
+                RETURNING {EARTHQUAKE_COLUMN_NAMES}
+            )
+            INSERT INTO earthquakes ({EARTHQUAKE_COLUMN_NAMES}) SELECT * FROM moved
+        """, (lower, upper))
+        cursor.execute(f"ALTER TABLE earthquakes ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+    logger.info("파티션 생성: %s", name)
+    return True
+
+
+def ensure_range(conn, start: datetime, end: datetime) -> List[str]:
+    """[start, end) 기간의 월 파티션을 미리 생성 (백필 시작 전 호출)"""
+    created = []
+    with conn.cursor() as cursor:
+        if table_kind(cursor) != "partitioned":
+            return created
+        for month in _months(start, end):
+            if ensure_month(cursor, month):
+                created.append(partition_name(month))
+    conn.commit()
+    return created
+
+
+def apply_retention(conn, now: Optional[datetime] = None) -> List[str]:
+    """보관 기간이 지난 월 파티션을 분리(보관) 또는 삭제하고 파생 데이터를 맞춤"""
+    if PARTITION_RETENTION_MONTHS <= 0:
+        return []
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -PARTITION_RETENTION_MONTHS)
+
+    removed = []
+    with conn.cursor() as cursor:
+        for name, month in sorted(existing_partitions(cursor).items(), key=lambda item: item[1]):
+            if month >= cutoff:
+                continue
+            cursor.execute(f"ALTER TABLE earthquakes DETACH PARTITION {name}")
+            if PARTITION_RETENTION_MODE == "drop":
+                cursor.execute(f"DROP TABLE {name}")
+            else:
+                cursor.execute(f"ALTER TABLE {name} RENAME TO earthquakes_archive_p{month:%Y%m}")
+            stats.delete_rollups(cursor, month, add_months(month, 1))
+            density.delete_rollups(cursor, month, add_months(month, 1))
+            removed.append(name)
+        if removed and PARTITION_RETENTION_MODE == "drop":
+            cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE time < %s", (cutoff,))
+    conn.commit()
+
+    if removed:
+        logger.info("보관 정책 적용 (%s): %s", PARTITION_RETENTION_MODE, ", ".join(removed))
+        # 셀 단위로 되돌릴 정보가 없으므로 클러스터는 다시 집계하고, 메모리 캐시는 비움
+        clusters.rebuild_clusters(conn)
+        query_cache.search_cache.bump()
+        tiles.tile_cache.clear()
+        hot_snapshot.trim(cutoff)
+    return removed
+
+
+def maintain_partitions(conn) -> Dict[str, Any]:
+    """기본 파티션에 쌓인 달 분리 + 앞으로 쓸 달 미리 생성 + 보관 정책 적용"""
+    created = []
+    with conn.cursor() as cursor:
+        if table_kind(cursor) != "partitioned":
+            return {"partitioned": False}
+        cursor.execute(f"SELECT DISTINCT date_trunc('month', time, 'UTC') FROM {DEFAULT_PARTITION}")
+        months = {row[0] for row in cursor.fetchall()}
+        current = month_start(datetime.now(timezone.utc))
+        months.update(add_months(current, offset) for offset in range(PARTITION_PREMAKE_MONTHS + 1))
+        for month in sorted(months):
+            if ensure_month(cursor, month_start(month)):
+                created.append(partition_name(month_start(month)))
+    conn.commit()
+    removed = apply_retention(conn)
+    return {"partitioned": True, "created": created, "removed": removed}
+
+
+def migrate_to_partitioned(conn, drop_legacy: bool = False) -> Dict[str, Any]:
+    """기존 단일 earthquakes 테이블을 월 파티션 테이블로 옮김 (한 트랜잭션)
+
+    기존 테이블은 earthquakes_legacy 로 이름을 바꿔 남기며(drop_legacy 면 삭제), time 이 없는 행은
+    파티션 키가 없으므로 옮기지 않고 legacy 테이블에만 남는다.
+    """
+    with conn.cursor() as cursor:
+        kind = table_kind(cursor)
+        if kind != "regular":
+            return {"migrated": False, "reason": "이미 파티션 테이블이거나 테이블이 없습니다"}
+
+        cursor.execute("LOCK TABLE earthquakes IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("ALTER TABLE earthquakes RENAME TO earthquakes_legacy")
+        # 새 테이블이 같은 이름의 인덱스/제약을 만들 수 있도록 기존 이름을 비움
+        cursor.execute("""
+            SELECT c.relname
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'earthquakes_legacy'::regclass
+        """)
+        for (index_name,) in cursor.fetchall():
+            cursor.execute(f"ALTER INDEX {index_name} RENAME TO {index_name[:50]}_legacy")
+
+        create_schema(cursor)
+
+        cursor.execute("SELECT min(time), max(time) FROM earthquakes_legacy")
+        first, last = cursor.fetchone()
+        if first is not None:
+            for month in _months(first, last + timedelta(microseconds=1)):
+                ensure_month(cursor, month)
+            for month in _months(first, last + timedelta(microseconds=1)):
+                cursor.execute(f"""
+                    INSERT INTO earthquakes ({EARTHQUAKE_COLUMN_NAMES})
+                    SELECT {EARTHQUAKE_COLUMN_NAMES} FROM earthquakes_legacy
+                    WHERE time >= %s AND time < %s
+                """, (month, add_months(month, 1)))
+                logger.info("%s: %d행 이동", partition_name(month), cursor.rowcount)
+
+        cursor.execute("SELECT COUNT(*) FROM earthquakes_legacy WHERE time IS NULL")
+        skipped = cursor.fetchone()[0]
+        if drop_legacy and not skipped:
+            cursor.execute("DROP TABLE earthquakes_legacy")
+        cursor.execute("ANALYZE earthquakes")
+    conn.commit()
+    return {"migrated": True, "skipped_without_time": skipped, "legacy_dropped": drop_legacy and not skipped}
+
+
+# ---------------------------------------------------------------------------
+# 파티션 프루닝 확인
+# ---------------------------------------------------------------------------
+
+def _scanned_partitions(plan: Dict[str, Any]) -> List[str]:
+    names = []
+    if plan.get("Relation Name", "").startswith("earthquakes_"):
+        names.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        names.extend(_scanned_partitions(child))
+    return names
+
+
+def verify_pruning(conn) -> List[Dict[str, Any]]:
+    """EarthquakeService 의 기간 조건 쿼리들이 필요한 파티션만 읽는지 EXPLAIN 으로 확인"""
+    from models import RadiusSearchRequest
+    from services import EARTHQUAKE_COLUMNS, radius_query
+
+    now = datetime.now(timezone.utc)
+    day_ago = now - timedelta(hours=24)
+    radius = RadiusSearchRequest(latitude=37.5665, longitude=126.9780, radius_km=500, start_time=day_ago)
+    checks = [
+        ("최근 24시간 목록", f"""
+            SELECT {EARTHQUAKE_COLUMNS} FROM earthquakes
+            WHERE time >= %s AND time < %s ORDER BY time DESC LIMIT 100
+        """, (day_ago, now)),
+        ("키셋 페이지 (커서 이후)", f"""
+            SELECT {EARTHQUAKE_COLUMNS} FROM earthquakes
+            WHERE time IS NOT NULL AND time <= %s::timestamptz AND (time, id) < (%s::timestamptz, %s::varchar)
+            ORDER BY time DESC, id DESC LIMIT 101
+        """, (day_ago, day_ago, "")),
+        ("반경 + 기간 필터", *radius_query(radius.latitude, radius.longitude, radius.radius_km, radius)[1:]),
+        ("통계 원본 가장자리", "SELECT COUNT(*) FROM earthquakes WHERE time IS NOT NULL AND time >= %s AND time < %s",
+         (now - timedelta(minutes=30), now)),
+    ]
+
+    results = []
+    with conn.cursor() as cursor:
+        total = len(existing_partitions(cursor)) + 1
+        for label, query, params in checks:
+            cursor.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            scanned = sorted(set(_scanned_partitions(plan[0]["Plan"])))
+            results.append({"query": label, "scanned": scanned, "total_partitions": total,
+                            "pruned": len(scanned) < total})
+    conn.rollback()
+    return results
+
+
+def main():
+    from database import get_db
+    from logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="earthquakes 월 파티션 관리")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    migrate = subparsers.add_parser("migrate", help="기존 단일 테이블을 파티션 테이블로 이전")
+    migrate.add_argument("--drop-legacy", action="store_true", help="이전 후 earthquakes_legacy 삭제")
+    subparsers.add_parser("maintain", help="파티션 미리 생성 + 기본 파티션 분리 + 보관 정책 적용")
+    subparsers.add_parser("verify-pruning", help="주요 쿼리의 파티션 프루닝 여부 확인")
+    args = parser.parse_args()
+    configure_logging()
+
+    with get_db() as conn:
+        if args.command == "migrate":
+            print(migrate_to_partitioned(conn, args.drop_legacy))
+        elif args.command == "maintain":
+            print(maintain_partitions(conn))
+        else:
+            for result in verify_pruning(conn):
+                status = "OK" if result["pruned"] else "FAIL"
+                print(f"[{status}] {result['query']}: {len(result['scanned'])}/{result['total_partitions']} "
+                      f"파티션 - {', '.join(result['scanned'])}")
+
+
+if __name__ == "__main__":
+    main()
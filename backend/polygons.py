@@ -0,0 +1,123 @@
+import hashlib
+import logging
+import os
+import time
+from typing import Optional
+
+import psycopg2
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# 검색 다각형 준비 설정
+POLYGON_SIMPLIFY_TOLERANCE = float(os.getenv("POLYGON_SIMPLIFY_TOLERANCE", "0.001"))  # 도 (약 100m)
+# 대원(great circle) 변을 이 길이 이하로 잘라 평면 조각의 변이 대원 경로를 따르게 함
+# (25km 변의 경위도 직선과 대원의 차이는 중위도에서 수십 m 로 단순화 허용 오차보다 작음)
+POLYGON_SEGMENT_LENGTH_KM = float(os.getenv("POLYGON_SEGMENT_LENGTH_KM", "25"))
+POLYGON_SUBDIVIDE_MAX_VERTICES = int(os.getenv("POLYGON_SUBDIVIDE_MAX_VERTICES", "64"))
+POLYGON_CACHE_SIZE = int(os.getenv("POLYGON_CACHE_SIZE", "256"))
+# 이 기간 동안 쓰이지 않은 준비 다각형은 새 다각형을 준비할 때 정리
+POLYGON_RETENTION_DAYS = int(os.getenv("POLYGON_RETENTION_DAYS", "30"))
+# 메모리에 있는 해시도 이 간격마다 DB에서 사용 시각을 갱신 (정리 대상이 되지 않도록)
+POLYGON_TOUCH_INTERVAL = 3600
+
+# 1) 대원 세분화 -> 2) 날짜변경선 분할 -> 3) 유효화/단순화 -> 4) ST_Subdivide 조각 저장
+#
+# 조각은 geometry 로 판정(평면)하므로, 클릭한 꼭짓점 몇 개로 된 큰 다각형의 긴 변이 geography 처럼
+# 대원을 따르도록 먼저 geography ST_Segmentize 로 촘촘히 나눈다 (변 하나가 수천 km 이면 평면 직선과
+# 대원은 몇 도씩 벌어짐). 세분화된 변은 날짜변경선을 지날 때 경도가 ±180 에서 건너뛰므로, 그런 변이
+# 있으면 경도를 0~360 으로 옮겨 이어 붙인 뒤 ST_WrapX 로 180도에서 잘라 -180~180 조각으로 되돌린다.
+_PREPARE_SQL = """
+    WITH src AS (
+        SELECT ST_Segmentize(ST_GeogFromText(%s), %s * 1000)::geometry AS geom
+    ),
+    unwrapped AS (
+        SELECT CASE
+                   WHEN EXISTS (
+                       SELECT 1 FROM ST_DumpSegments(src.geom) AS s
+                       WHERE abs(ST_X(ST_StartPoint(s.geom)) - ST_X(ST_EndPoint(s.geom))) > 180
+                   ) THEN ST_ShiftLongitude(src.geom)
+                   ELSE src.geom
+               END AS geom
+        FROM src
+    ),
+    wrapped AS (
+        SELECT ST_WrapX(ST_WrapX(ST_CollectionExtract(ST_MakeValid(geom), 3), 180, -360), -180, 360) AS geom
+        FROM unwrapped
+    ),
+    simplified AS (
+        SELECT ST_CollectionExtract(ST_MakeValid(ST_SimplifyPreserveTopology(geom, %s)), 3) AS geom
+        FROM wrapped
+    ),
+    pieces AS (
+        SELECT (ST_Dump(ST_Subdivide(geom, %s))).geom AS geom FROM simplified
+    )
+    INSERT INTO search_polygon_pieces (polygon_hash, piece_no, geom)
+    SELECT %s, row_number() OVER (), geom
+    FROM pieces
+    WHERE NOT ST_IsEmpty(geom)
+"""
+
+# 해시 -> 마지막으로 DB 사용 시각을 갱신한 시각
+_prepared = LRUCache(POLYGON_CACHE_SIZE)
+
+
+def polygon_hash(polygon_wkt: str) -> str:
+    """준비 조각 캐시 키 (WKT + 준비 설정)"""
+    source = f"{polygon_wkt}|{POLYGON_SEGMENT_LENGTH_KM}|{POLYGON_SIMPLIFY_TOLERANCE}|{POLYGON_SUBDIVIDE_MAX_VERTICES}"
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def _build(conn, key: str, polygon_wkt: str) -> None:
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "DELETE FROM search_polygons WHERE last_used_at < now() - %s * INTERVAL '1 day'",
+            (POLYGON_RETENTION_DAYS,),
+        )
+        cursor.execute(
+            "INSERT INTO search_polygons (polygon_hash) VALUES (%s) ON CONFLICT DO NOTHING RETURNING 1",
+            (key,),
+        )
+        if cursor.fetchone() is None:
+            # 다른 요청이 같은 다각형을 먼저 준비함 (그 트랜잭션 커밋까지 대기한 뒤 여기로 옴)
+            conn.commit()
+            return
+        cursor.execute(_PREPARE_SQL, (
+            polygon_wkt, POLYGON_SEGMENT_LENGTH_KM, POLYGON_SIMPLIFY_TOLERANCE, POLYGON_SUBDIVIDE_MAX_VERTICES, key,
+        ))
+        piece_count = cursor.rowcount
+        if piece_count <= 0:
+            raise ValueError("면적이 있는 다각형이 아닙니다")
+        cursor.execute(
+            "UPDATE search_polygons SET piece_count = %s WHERE polygon_hash = %s",
+            (piece_count, key),
+        )
+    conn.commit()
+    logger.info("검색 다각형 준비", extra={"polygon_hash": key[:12], "pieces": piece_count})
+
+
+def prepare_polygon(conn, polygon_wkt: str) -> str:
+    """다각형을 인덱스 친화적 조각으로 준비하고 해시 반환 (이미 준비된 다각형은 재사용)"""
+    key = polygon_hash(polygon_wkt)
+    touched: Optional[float] = _prepared.get(key)
+    if touched is not None and time.monotonic() - touched < POLYGON_TOUCH_INTERVAL:
+        return key
+
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("UPDATE search_polygons SET last_used_at = now() WHERE polygon_hash = %s", (key,))
+            exists = cursor.rowcount > 0
+        conn.commit()
+        if not exists:
+            _build(conn, key, polygon_wkt)
+    except (psycopg2.DataError, psycopg2.InternalError) as e:
+        # WKT 파싱 실패 등 입력 오류
+        conn.rollback()
+        raise ValueError(f"잘못된 다각형입니다: {str(e).strip()}")
+    except ValueError:
+        conn.rollback()
+        raise
+
+    _prepared.put(key, time.monotonic())
+    return key
@@ -0,0 +1,110 @@
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from cache import LRUCache
+from ingest import IngestResult, register_ingest_listener
+
+# 공간 검색 결과 캐시 설정
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+# 항목 최대 수명 (초, 0 이하면 무제한) - 다른 프로세스(CLI 백필, 벤치마크 적재, 직접 SQL)의 변경은
+# 이 프로세스의 적재 리스너가 모르므로 늦어도 이 시간 안에 다시 조회되도록 함
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "60"))
+# 좌표는 소수점 5자리(약 1m), 반경은 1m 단위로 정규화
+COORDINATE_PRECISION = 5
+RADIUS_PRECISION = 3
+
+_WKT_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+def radius_params(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float]:
+    """캐시 키이자 실제 조회에 쓰는 정규화된 반경 검색 파라미터"""
+    return (
+        round(lat, COORDINATE_PRECISION),
+        round(lon, COORDINATE_PRECISION),
+        round(radius_km, RADIUS_PRECISION),
+    )
+
+
+def canonical_wkt(polygon_wkt: str) -> str:
+    """공백/대소문자/숫자 표기 차이를 없앤 WKT (좌표는 소수점 5자리로 반올림)"""
+    def number(match: re.Match) -> str:
+        text = f"{float(match.group()):.{COORDINATE_PRECISION}f}".rstrip("0").rstrip(".")
+        return "0" if text == "-0" else text
+
+    text = " ".join(polygon_wkt.upper().split())
+    text = re.sub(r"\s*([(),])\s*", r"\1", text)
+    text = re.sub(r"^([A-Z]+)\(", r"\1 (", text)
+    return _WKT_NUMBER.sub(number, text)
+
+
+class QueryCache:
+    """데이터 세대(generation)로 무효화되는 조회 결과 캐시
+
+    키에 현재 세대를 함께 넣으므로, 적재로 행이 실제로 바뀌어 세대가 오르면 이전 결과는
+    다시 조회되지 않는다. 세대를 읽은 뒤 실행된 조회가 그사이 바뀐 데이터를 보더라도
+    옛 세대 키로 저장되어 새 세대에서는 쓰이지 않는다.
+
+    세대는 이 프로세스의 적재만 올리므로, 프로세스 밖의 변경은 항목 수명(ttl_seconds)으로 반영한다.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float = QUERY_CACHE_TTL_SECONDS):
+        self._cache = LRUCache(max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.expirations = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Tuple[Hashable, ...]) -> Optional[Any]:
+        key = (self._generation,) + key
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            self._cache.pop(key)
+            self.expirations += 1
+            return None
+        return value
+
+    def put(self, key: Tuple[Hashable, ...], value: Any, generation: int) -> None:
+        if generation != self._generation:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        self._cache.put((generation,) + key, (expires_at, value))
+
+    def bump(self, result: Optional[IngestResult] = None) -> None:
+        """데이터가 바뀌었음을 알림 - 세대를 올리고 이전 세대 항목을 비움"""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generation": self._generation,
+            "ttl_seconds": self.ttl_seconds,
+            "expirations": self.expirations,
+            **self._cache.stats(),
+        }
+
+
+search_cache = QueryCache(QUERY_CACHE_SIZE)
+
+
+async def cached_rows(key: Tuple[Hashable, ...], fetch) -> List[tuple]:
+    """캐시에 있으면 DB를 거치지 않고 반환, 없으면 fetch()로 조회 후 저장"""
+    rows = search_cache.get(key)
+    if rows is None:
+        generation = search_cache.generation
+        rows = await fetch()
+        search_cache.put(key, rows, generation)
+    return rows
+
+
+register_ingest_listener(search_cache.bump)
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from database import run_db
+from ingest import IngestResult
+from services import EarthquakeService
+import partitions
+
+logger = logging.getLogger(__name__)
+
+# USGS summary feed 폴링 설정
+USGS_API_BASE_URL = os.getenv(
+    "USGS_API_BASE_URL", "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary"
+)
+SYNC_FEEDS = [feed.strip() for feed in os.getenv("SYNC_FEEDS", "all_day").split(",") if feed.strip()]
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS", "60"))
+SYNC_SCHEDULER_ENABLED = os.getenv("SYNC_SCHEDULER_ENABLED", "true").lower() == "true"
+# 늦게 게시된 이벤트를 놓치지 않도록 워터마크에서 조금 겹쳐 읽음 (ms)
+WATERMARK_OVERLAP_MS = 5 * 60 * 1000
+
+
+class FeedState:
+    """피드별 조건부 요청 헤더와 updated 워터마크"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.watermark_ms: Optional[int] = None
+        self.last_status: Optional[int] = None
+        self.last_received = 0
+        self.last_fresh = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "feed": self.name,
+            "last_status": self.last_status,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "watermark": (
+                datetime.fromtimestamp(self.watermark_ms / 1000, tz=timezone.utc)
+                if self.watermark_ms else None
+            ),
+            "last_received": self.last_received,
+            "last_fresh": self.last_fresh,
+        }
+
+
+class SyncScheduler:
+    """USGS summary feed를 주기적으로 조건부 요청하고, 한 번에 하나의 동기화만 실행"""
+
+    def __init__(self, feeds: List[str] = SYNC_FEEDS, interval: float = SYNC_INTERVAL_SECONDS):
+        self.feeds = {name: FeedState(name) for name in feeds}
+        self.interval = interval
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop_task: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Task] = None
+
+        self.runs = 0
+        self.last_started_at: Optional[datetime] = None
+        self.last_finished_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+        self.next_run_at: Optional[datetime] = None
+        self._last_maintenance: Optional[float] = None
+        self.last_maintenance: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._loop())
+            logger.info("동기화 스케줄러 시작", extra={"feeds": list(self.feeds), "interval_seconds": self.interval})
+
+    async def stop(self) -> None:
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("예약 동기화 오류: %s", e)
+            await self._maintain_partitions()
+            self.next_run_at = datetime.now(timezone.utc) + timedelta(seconds=self.interval)
+            await asyncio.sleep(self.interval)
+
+    async def _maintain_partitions(self) -> None:
+        """파티션 미리 생성/보관 정책을 PARTITION_MAINTENANCE_INTERVAL_SECONDS 마다 적용"""
+        now = time.monotonic()
+        if self._last_maintenance is not None and \
+                now - self._last_maintenance < partitions.PARTITION_MAINTENANCE_INTERVAL_SECONDS:
+            return
+        self._last_maintenance = now
+        try:
+            self.last_maintenance = await run_db(partitions.maintain_partitions)
+        except Exception as e:
+            logger.exception("파티션 관리 오류: %s", e)
+
+    async def run_once(self) -> Dict[str, Any]:
+        """진행 중인 동기화가 있으면 새로 시작하지 않고 그 결과를 함께 기다림 (single-flight)"""
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._sync())
+        return await asyncio.shield(self._inflight)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=30)
+        return self._client
+
+    async def _fetch_feed(self, state: FeedState) -> Tuple[List[Dict[str, Any]], httpx.Headers]:
+        """변경된 피드만 내려받아 워터마크 이후 updated 된 feature만 반환
+
+        프로세스 시작 후 첫 요청은 워터마크가 없으므로 피드 전체를 반영한다.
+        """
+        headers = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+        response = await self._get_client().get(f"{USGS_API_BASE_URL}/{state.name}.geojson", headers=headers)
+        state.last_status = response.status_code
+        if response.status_code == 304:
+            state.last_received = 0
+            state.last_fresh = 0
+            return [], response.headers
+        response.raise_for_status()
+
+        features = response.json().get("features", [])
+        threshold = state.watermark_ms - WATERMARK_OVERLAP_MS if state.watermark_ms else None
+        fresh = [
+            feature for feature in features
+            if threshold is None or ((feature.get("properties") or {}).get("updated") or 0) > threshold
+        ]
+
+        state.last_received = len(features)
+        state.last_fresh = len(fresh)
+        return fresh, response.headers
+
+    async def _sync(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        self.last_started_at = datetime.now(timezone.utc)
+        self.runs += 1
+        total = IngestResult()
+        received = 0
+        try:
+            for state in self.feeds.values():
+                fresh, headers = await self._fetch_feed(state)
+                received += state.last_received
+
+                if fresh:
+                    result = await run_db(lambda db: EarthquakeService(db).sync_usgs_data({"features": fresh}))
+                    total.merge(result)
+                    latest = max((f.get("properties") or {}).get("updated") or 0 for f in fresh)
+                    state.watermark_ms = max(state.watermark_ms or 0, latest)
+
+                # 적재가 성공한 뒤에만 검증자를 저장해야 실패한 피드를 다음 폴링에서 다시 받음
+                if state.last_status == 200:
+                    state.etag = headers.get("ETag")
+                    state.last_modified = headers.get("Last-Modified")
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            self.last_finished_at = datetime.now(timezone.utc)
+            self.last_duration_ms = (time.perf_counter() - started) * 1000
+            self.last_result = {"total_received": received, **total.counts()}
+        return self.last_result
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self._loop_task is not None,
+            "interval_seconds": self.interval,
+            "running": self._inflight is not None and not self._inflight.done(),
+            "runs": self.runs,
+            "last_started_at": self.last_started_at,
+            "last_finished_at": self.last_finished_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_result": self.last_result,
+            "last_error": self.last_error,
+            "next_run_at": self.next_run_at,
+            "last_partition_maintenance": self.last_maintenance,
+            "feeds": [state.to_dict() for state in self.feeds.values()],
+        }
+
+
+sync_scheduler = SyncScheduler()
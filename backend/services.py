@@ -1,315 +1,613 @@
 import psycopg2
 import psycopg2.extras
-from models import EarthquakeResponse, BoundaryStatsResponse, StatsResponse
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from models import (
+    EarthquakeResponse, EarthquakePage, BoundaryStatsResponse, StatsResponse, MagnitudeHistogramResponse,
+    NearestSearchRequest, SearchFilters, BatchRadiusCenter, BoundarySearchRequest
+)
+from ingest import IngestResult, upsert_features
+import stats
+import polygons
+from snapshot import hot_snapshot
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+import base64
+from itertools import zip_longest
 import json
+import logging
+import uuid
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# 스트리밍 조회 시 서버 측 커서에서 한 번에 가져오는 행 수
+STREAM_BATCH_SIZE = 2000
+
+# 목록/검색 응답 공통 컬럼 - EarthquakeResponse 필드 순서와 동일하게 float8로 바로 조회
+EARTHQUAKE_COLUMNS = """
+    id,
+    magnitude::float8 as magnitude,
+    place,
+    time,
+    depth::float8 as depth,
+    ST_Y(location::geometry) as latitude,
+    ST_X(location::geometry) as longitude,
+    url
+"""
+EARTHQUAKE_FIELDS = tuple(EarthquakeResponse.model_fields)
+
+def rows_to_models(rows: List[tuple]) -> List[EarthquakeResponse]:
+    """튜플 행 -> EarthquakeResponse 목록 (기존 response_model 경로)"""
+    return [EarthquakeResponse(**dict(zip(EARTHQUAKE_FIELDS, row))) for row in rows]
+
+def rows_to_json(rows: List[tuple]) -> bytes:
+    """튜플 행 -> JSON 바이트 (모델 생성/재검증 없이 orjson 으로 한 번에 직렬화)
+
+    response_model 경로와 같은 필드 순서, 같은 datetime 표기(UTC는 'Z')를 사용한다.
+    distance_km 열이 없는 행도 모델 경로처럼 distance_km: null 을 포함한다.
+    """
+    return orjson.dumps(
+        [dict(zip_longest(EARTHQUAKE_FIELDS, row)) for row in rows],
+        option=orjson.OPT_UTC_Z,
+    )
+
+def encode_cursor(time: datetime, earthquake_id: str) -> str:
+    """(time, id) 키셋 위치를 불투명한 커서 문자열로 인코딩"""
+    raw = f"{time.isoformat()}|{earthquake_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """커서 문자열을 (time, id)로 복원 - 형식이 잘못되면 ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        time_part, earthquake_id = raw.split("|", 1)
+        return datetime.fromisoformat(time_part), earthquake_id
+    except Exception:
+        raise ValueError("잘못된 커서입니다")
+
+def _to_positional(query: str) -> str:
+    """%s 자리표시자를 PREPARE 용 $1, $2 ... 로 변환"""
+    parts = query.split('%s')
+    return ''.join(
+        part + (f'${i + 1}' if i < len(parts) - 1 else '')
+        for i, part in enumerate(parts)
+    )
+
+# 검색 공통 필터: (요청 필드, SQL 조건, 준비문 이름 접미사)
+SEARCH_FILTERS = (
+    ("start_time", "time >= %s::timestamptz", "t0"),
+    ("end_time", "time < %s::timestamptz", "t1"),
+    ("min_magnitude", "magnitude >= %s::numeric", "m0"),
+    ("max_magnitude", "magnitude <= %s::numeric", "m1"),
+    ("min_depth", "depth >= %s::numeric", "d0"),
+    ("max_depth", "depth <= %s::numeric", "d1"),
+    # 명시적 id 집합은 개수와 무관하게 배열 파라미터 하나로 전달
+    ("ids", "id = ANY(%s::varchar[])", "ids"),
+)
+# 이 규모 이상만 담는 부분 인덱스(idx_earthquakes_significant_*)의 조건과 같은 값
+SIGNIFICANT_MAGNITUDE = 4.5
+
+def build_search_filters(request) -> Tuple[str, list, str]:
+    """요청에 지정된 필터만 골라 (AND 조건 SQL, 파라미터, 준비문 이름 접미사) 생성
+
+    지정된 필터 조합마다 준비문 이름이 달라지므로 조합별로 따로 계획된다.
+    """
+    conditions, params, suffix = [], [], ""
+    for field_name, condition, code in SEARCH_FILTERS:
+        value = getattr(request, field_name, None) if request is not None else None
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+            suffix += "_" + code
+    min_magnitude = getattr(request, "min_magnitude", None) if request is not None else None
+    if min_magnitude is not None and min_magnitude >= SIGNIFICANT_MAGNITUDE:
+        # 파라미터만으로는 플래너가 부분 인덱스 조건을 증명할 수 없으므로 상수 조건을 함께 붙임
+        conditions.append(f"magnitude >= {SIGNIFICANT_MAGNITUDE}")
+        suffix += "_sig"
+    return "".join(f" AND {condition}" for condition in conditions), params, suffix
+
+def search_filter_key(request) -> tuple:
+    """캐시 키용 필터 값 (필드 순서 고정)"""
+    return tuple(getattr(request, field_name, None) for field_name, _, _ in SEARCH_FILTERS) + (
+        getattr(request, "limit", None),
+    )
+
+# 복합 필터 검색용 인덱스 현재 정의 (새 DB 에는 migrations.py 에 고정된 버전 1 사본이 적용됨)
+SEARCH_INDEX_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    # 시간순으로 적재되므로 블록 범위 요약만으로 기간 조건을 거름 (btree 대비 수백 분의 1 크기)
+    "CREATE INDEX IF NOT EXISTS idx_earthquakes_time_brin ON earthquakes USING BRIN(time)",
+    # 위치 + 시간 + 규모를 한 번의 GiST 탐색으로 거름
+    "CREATE INDEX IF NOT EXISTS idx_earthquakes_location_time ON earthquakes USING GIST(location, time, magnitude)",
+    # 유의미한 규모 이상만 담은 작은 부분 인덱스
+    f"CREATE INDEX IF NOT EXISTS idx_earthquakes_significant_location ON earthquakes USING GIST(location) "
+    f"WHERE magnitude >= {SIGNIFICANT_MAGNITUDE}",
+    f"CREATE INDEX IF NOT EXISTS idx_earthquakes_significant_time ON earthquakes(time DESC) "
+    f"WHERE magnitude >= {SIGNIFICANT_MAGNITUDE}",
+)
+
+_POINT = "ST_Point(%s::float8, %s::float8)::geography"
+
+def radius_query(lat: float, lon: float, radius_km: float, filters=None) -> Tuple[str, str, tuple]:
+    """반경 검색 (준비문 이름, 쿼리, 파라미터)"""
+    conditions, filter_params, name = build_search_filters(filters)
+    query = f"""
+        SELECT {EARTHQUAKE_COLUMNS},
+            ROUND((ST_Distance(location, {_POINT}) / 1000)::numeric, 2)::float8 as distance_km
+        FROM earthquakes
+        WHERE ST_DWithin(location, {_POINT}, %s::float8 * 1000){conditions}
+        ORDER BY distance_km
+    """
+    params = [lon, lat, lon, lat, radius_km] + filter_params
+    limit = getattr(filters, "limit", None)
+    if limit is not None:
+        query += " LIMIT %s::bigint"
+        params.append(limit)
+        name += "_lim"
+    return "eq_radius" + name, query, tuple(params)
+
+def polygon_query(polygon_hash: str, filters=None) -> Tuple[str, str, tuple]:
+    """준비된 다각형 조각들에 대한 내포 검색 (준비문 이름, 쿼리, 파라미터)
+
+    조각마다 bbox 인덱스 탐색 + 정점 수십 개짜리 판정만 하고, 조각 경계에 걸린 점의 중복은 DISTINCT ON 으로 제거한다.
+    """
+    conditions, filter_params, name = build_search_filters(filters)
+    query = f"""
+        SELECT * FROM (
+            SELECT DISTINCT ON (id) {EARTHQUAKE_COLUMNS}, NULL::float8 as distance_km
+            FROM search_polygon_pieces p
+            JOIN earthquakes e ON ST_Covers(p.geom, e.location::geometry)
+            WHERE p.polygon_hash = %s::text{conditions}
+            ORDER BY id
+        ) matched
+    """
+    params = [polygon_hash] + filter_params
+    limit = getattr(filters, "limit", None)
+    if limit is not None:
+        query += " ORDER BY time DESC LIMIT %s::bigint"
+        params.append(limit)
+        name += "_lim"
+    return "eq_polygon" + name, query, tuple(params)
+
+def boundary_selection_query(conn, request: BoundarySearchRequest) -> Tuple[str, str, tuple]:
+    """경계 통계 대상 집합 (이름, 쿼리, 파라미터) - 다각형/반경/필터 검색 쿼리를 그대로 재사용"""
+    radius = (request.latitude, request.longitude, request.radius_km)
+    if any(v is not None for v in radius) and any(v is None for v in radius):
+        raise ValueError("반경 조건에는 latitude, longitude, radius_km 가 모두 필요합니다")
+    if request.polygon_wkt is not None and request.radius_km is not None:
+        raise ValueError("반경과 다각형은 함께 지정할 수 없습니다")
+    if request.polygon_wkt is not None:
+        return polygon_query(polygons.prepare_polygon(conn, request.polygon_wkt), request)
+    if request.radius_km is not None:
+        return radius_query(request.latitude, request.longitude, request.radius_km, request)
+
+    conditions, filter_params, name = build_search_filters(request)
+    if not conditions:
+        raise ValueError("ids, 반경, 다각형, 필터 중 하나 이상을 지정해야 합니다")
+    query = f"""
+        SELECT {EARTHQUAKE_COLUMNS}, NULL::float8 as distance_km
+        FROM earthquakes
+        WHERE true{conditions}
+    """
+    if request.limit is not None:
+        query += " ORDER BY time DESC LIMIT %s::bigint"
+        filter_params.append(request.limit)
+        name += "_lim"
+    return "eq_filter" + name, query, tuple(filter_params)
+
+def boundary_stats_query(selection: str, request: BoundarySearchRequest) -> Tuple[str, tuple]:
+    """대상 집합 쿼리를 CTE로 감싼 경계 통계 쿼리와 추가 파라미터
+
+    선택 집계(규모 가중 중심, 오목 껍질, 격자 밀도)는 요청된 것만 같은 CTE 위에 붙인다.
+    """
+    columns = [
+        "COUNT(*) as total_count",
+        "ST_AsText(ST_Centroid(ST_Collect(geom))) as center_point",
+        "ST_AsText(ST_Envelope(ST_Collect(geom))) as bounding_box",
+        "ST_AsText(ST_ConvexHull(ST_Collect(geom))) as convex_hull",
+        "ST_Area(ST_ConvexHull(ST_Collect(geom))::geography) / 1000000 as area_km2",
+    ]
+    params: list = []
+    if request.weighted_centroid:
+        # 규모가 없거나 음수인 지진은 가중치 0
+        columns.append("""
+            ST_AsText(ST_SetSRID(ST_MakePoint(
+                SUM(longitude * weight) / NULLIF(SUM(weight), 0),
+                SUM(latitude * weight) / NULLIF(SUM(weight), 0)
+            ), 4326)) as weighted_centroid""")
+    if request.concave_hull_ratio is not None:
+        columns.append("ST_AsText(ST_ConcaveHull(ST_Collect(geom), %s::float8)) as concave_hull")
+        params.append(request.concave_hull_ratio)
+    if request.density_cell_deg is not None:
+        columns.append("""
+            (SELECT json_agg(json_build_object(
+                        'longitude', cell_x * %s::float8, 'latitude', cell_y * %s::float8,
+                        'count', cell_count, 'max_magnitude', max_magnitude
+                    ) ORDER BY cell_count DESC, cell_y, cell_x)
+             FROM (
+                SELECT floor(longitude / %s::float8) as cell_x, floor(latitude / %s::float8) as cell_y,
+                       COUNT(*) as cell_count, MAX(magnitude) as max_magnitude
+                FROM points
+                GROUP BY 1, 2
+             ) cells) as density""")
+        params.extend([request.density_cell_deg] * 4)
+
+    query = f"""
+        WITH selected AS ({selection}),
+        points AS (
+            SELECT latitude, longitude, magnitude,
+                   GREATEST(COALESCE(magnitude, 0), 0) as weight,
+                   ST_SetSRID(ST_MakePoint(longitude, latitude), 4326) as geom
+            FROM selected
+        )
+        SELECT {", ".join(columns)}
+        FROM points
+    """
+    return query, tuple(params)
+
+# 지점별 필터는 NULL 이면 조건이 꺼지는 형태로 LATERAL 안에서 평가
+BATCH_RADIUS_QUERY = f"""
+    SELECT c.ord, c.center_id, r.*
+    FROM unnest(
+        %s::text[], %s::float8[], %s::float8[], %s::float8[],
+        %s::timestamptz[], %s::timestamptz[], %s::numeric[], %s::numeric[], %s::numeric[], %s::numeric[],
+        %s::bigint[]
+    ) WITH ORDINALITY AS c(
+        center_id, center_lat, center_lon, center_radius_km,
+        filter_start, filter_end, filter_min_mag, filter_max_mag, filter_min_depth, filter_max_depth,
+        max_rows, ord
+    )
+    LEFT JOIN LATERAL (
+        SELECT {EARTHQUAKE_COLUMNS},
+            ROUND((ST_Distance(location, ST_Point(c.center_lon, c.center_lat)::geography) / 1000)::numeric, 2)::float8
+                as distance_km
+        FROM earthquakes
+        WHERE ST_DWithin(location, ST_Point(c.center_lon, c.center_lat)::geography, c.center_radius_km * 1000)
+          AND (c.filter_start IS NULL OR time >= c.filter_start)
+          AND (c.filter_end IS NULL OR time < c.filter_end)
+          AND (c.filter_min_mag IS NULL OR magnitude >= c.filter_min_mag)
+          AND (c.filter_max_mag IS NULL OR magnitude <= c.filter_max_mag)
+          AND (c.filter_min_depth IS NULL OR depth >= c.filter_min_depth)
+          AND (c.filter_max_depth IS NULL OR depth <= c.filter_max_depth)
+        ORDER BY distance_km
+        LIMIT c.max_rows
+    ) r ON true
+    ORDER BY c.ord, r.distance_km
+"""
+
+def batch_radius_params(centers: List[BatchRadiusCenter]) -> tuple:
+    """지점 목록 -> unnest 에 넘길 열 단위 배열들"""
+    return (
+        [c.id for c in centers],
+        [c.latitude for c in centers],
+        [c.longitude for c in centers],
+        [c.radius_km for c in centers],
+        [c.start_time for c in centers],
+        [c.end_time for c in centers],
+        [c.min_magnitude for c in centers],
+        [c.max_magnitude for c in centers],
+        [c.min_depth for c in centers],
+        [c.max_depth for c in centers],
+        [c.limit for c in centers],
+    )
+
+def nearest_query(request: NearestSearchRequest) -> Tuple[str, str, tuple]:
+    """최근접 k개 검색 (준비문 이름, 쿼리, 파라미터)"""
+    conditions, filter_params, name = build_search_filters(request)
+    query = f"""
+        SELECT {EARTHQUAKE_COLUMNS},
+            ROUND((ST_Distance(location, {_POINT}) / 1000)::numeric, 2)::float8 as distance_km
+        FROM earthquakes
+        WHERE location IS NOT NULL{conditions}
+    """
+    params = [request.longitude, request.latitude] + filter_params
+    if request.max_distance_km is not None:
+        query += f" AND ST_DWithin(location, {_POINT}, %s::float8 * 1000)"
+        params += [request.longitude, request.latitude, request.max_distance_km]
+        name += "_max_dist"
+    query += f" ORDER BY location <-> {_POINT} LIMIT %s::bigint"
+    params += [request.longitude, request.latitude, request.limit]
+    return "eq_nearest" + name, query, tuple(params)
 
 class EarthquakeService:
     def __init__(self, db_conn):
         self.db = db_conn
-        self._ensure_tables_exist()
-
-    def _ensure_tables_exist(self):
-        """테이블이 존재하지 않으면 생성"""
-        try:
-            with self.db.cursor() as cursor:
-                # 테이블 존재 확인
-                cursor.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables 
-                        WHERE table_name = 'earthquakes'
-                    );
-                """)
-                table_exists = cursor.fetchone()[0]
-                
-                if not table_exists:
-                    print("earthquakes 테이블이 없음. 생성 중...")
-                    
-                    # PostGIS 확장 활성화
-                    cursor.execute("CREATE EXTENSION IF NOT EXISTS postgis;")
-                    cursor.execute("CREATE EXTENSION IF NOT EXISTS postgis_topology;")
-                    
-                    # 지진 데이터 테이블 생성
-                    cursor.execute("""
-                        CREATE TABLE earthquakes (
-                            id VARCHAR(50) PRIMARY KEY,
-                            magnitude DECIMAL(5,2),
-                            place VARCHAR(500),
-                            time TIMESTAMP WITH TIME ZONE,
-                            updated TIMESTAMP WITH TIME ZONE,
-                            depth DECIMAL(6,2),
-                            location GEOGRAPHY(POINT, 4326),
-                            url TEXT,
-                            detail TEXT,
-                            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-                        );
-                    """)
-                    
-                    # 인덱스 생성
-                    cursor.execute("CREATE INDEX idx_earthquakes_location ON earthquakes USING GIST(location);")
-                    cursor.execute("CREATE INDEX idx_earthquakes_time ON earthquakes(time);")
-                    cursor.execute("CREATE INDEX idx_earthquakes_magnitude ON earthquakes(magnitude);")
-                    cursor.execute("CREATE INDEX idx_earthquakes_depth ON earthquakes(depth);")
-                    
-                    self.db.commit()
-                    print("earthquakes 테이블 생성 완료!")
-                    
-        except Exception as e:
-            print(f"테이블 생성 오류: {str(e)}")
-            # 오류가 발생해도 계속 진행
 
-    def get_earthquakes(self, limit: int = 100, min_magnitude: Optional[float] = None) -> List[EarthquakeResponse]:
-        """전체 지진 목록 조회"""
-        with self.db.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            query = """
-                SELECT id, magnitude, place, time, depth, 
-                       ST_Y(location::geometry) as latitude, 
-                       ST_X(location::geometry) as longitude, 
-                       url
-                FROM earthquakes 
-                WHERE 1=1
-            """
-            params = []
-            
-            if min_magnitude:
-                query += " AND magnitude >= %s"
-                params.append(min_magnitude)
-            
-            query += " ORDER BY time DESC LIMIT %s"
-            params.append(limit)
-            
+    def _execute_prepared(self, cursor, name: str, query: str, params=()):
+        """고정 쿼리는 연결마다 한 번만 PREPARE 하고 이후 EXECUTE 로 재사용"""
+        prepared = getattr(self.db, 'prepared_statements', None)
+        if prepared is None:
+            # 풀 밖에서 만든 일반 연결이면 그냥 실행
             cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            return [
-                EarthquakeResponse(
-                    id=row['id'],
-                    magnitude=float(row['magnitude']) if row['magnitude'] else None,
-                    place=row['place'],
-                    time=row['time'],
-                    depth=float(row['depth']) if row['depth'] else None,
-                    latitude=float(row['latitude']) if row['latitude'] else None,
-                    longitude=float(row['longitude']) if row['longitude'] else None,
-                    url=row['url']
-                ) for row in rows
-            ]
-
-    def sync_usgs_data(self, geojson_data: Dict[str, Any]) -> int:
-        """USGS GeoJSON 데이터를 데이터베이스에 동기화"""
-        count = 0
-        skipped = 0
-        processed = 0
+            return
+        if name not in prepared:
+            cursor.execute(f"PREPARE {name} AS {_to_positional(query)}")
+            prepared.add(name)
+        if params:
+            placeholders = ', '.join(['%s'] * len(params))
+            cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+
+    def _fetch_earthquake_rows(self, limit: int, min_magnitude: Optional[float]) -> List[tuple]:
+        rows = hot_snapshot.latest_rows(limit, min_magnitude)
+        if rows is not None:
+            return rows
+        query = f"""
+            SELECT {EARTHQUAKE_COLUMNS}, NULL::float8 as distance_km
+            FROM earthquakes 
+            WHERE 1=1
+        """
+        params = []
+        name = "eq_list"
+        
+        if min_magnitude:
+            query += " AND magnitude >= %s::numeric"
+            params.append(min_magnitude)
+            name = "eq_list_min_mag"
+        
+        query += " ORDER BY time DESC LIMIT %s::bigint"
+        params.append(limit)
         
         with self.db.cursor() as cursor:
-            for feature in geojson_data.get('features', []):
-                processed += 1
-                properties = feature['properties']
-                geometry = feature['geometry']
-                
-                if geometry['type'] != 'Point':
-                    print(f"지원하지 않는 geometry 타입: {geometry['type']}")
-                    skipped += 1
-                    continue
-                    
-                coords = geometry['coordinates']
-                
-                # ID 파싱: ids가 ",nn00898840," 형태이므로 쉼표로 분리 후 빈 문자열 제외
-                if properties.get('ids'):
-                    ids_list = [id_str.strip() for id_str in properties['ids'].split(',') if id_str.strip()]
-                    earthquake_id = ids_list[0] if ids_list else None
+            self._execute_prepared(cursor, name, query, tuple(params))
+            return cursor.fetchall()
+
+    def get_earthquakes(self, limit: int = 100, min_magnitude: Optional[float] = None) -> List[EarthquakeResponse]:
+        """전체 지진 목록 조회"""
+        return rows_to_models(self._fetch_earthquake_rows(limit, min_magnitude))
+
+    def get_earthquakes_json(self, limit: int = 100, min_magnitude: Optional[float] = None) -> bytes:
+        """전체 지진 목록 조회 - 모델 생성 없이 JSON 바이트로 바로 직렬화"""
+        return rows_to_json(self._fetch_earthquake_rows(limit, min_magnitude))
+
+    def get_earthquakes_page(self, limit: int = 100, cursor: Optional[str] = None,
+                             min_magnitude: Optional[float] = None) -> EarthquakePage:
+        """(time, id) 키셋 페이지네이션 - 깊은 페이지도 인덱스 범위 탐색으로 조회"""
+        query = f"""
+            SELECT {EARTHQUAKE_COLUMNS}, NULL::float8 as distance_km
+            FROM earthquakes
+            WHERE time IS NOT NULL
+        """
+        params: list = []
+        name = "eq_page"
+
+        if min_magnitude is not None:
+            query += " AND magnitude >= %s::numeric"
+            params.append(min_magnitude)
+            name += "_min_mag"
+        if cursor:
+            after_time, after_id = decode_cursor(cursor)
+            # time <= 조건은 행 비교만으로는 안 되는 파티션 프루닝용
+            query += " AND time <= %s::timestamptz AND (time, id) < (%s::timestamptz, %s::varchar)"
+            params.extend([after_time, after_time, after_id])
+            name += "_after"
+
+        # 다음 페이지 존재 여부 확인을 위해 한 행 더 조회
+        query += " ORDER BY time DESC, id DESC LIMIT %s::bigint"
+        params.append(limit + 1)
+
+        with self.db.cursor() as db_cursor:
+            self._execute_prepared(db_cursor, name, query, tuple(params))
+            rows = db_cursor.fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        # 행 튜플의 0번째는 id, 3번째는 time (EARTHQUAKE_COLUMNS 순서)
+        next_cursor = encode_cursor(rows[-1][3], rows[-1][0]) if has_more and rows else None
+        return EarthquakePage(items=rows_to_models(rows), next_cursor=next_cursor)
+
+    def iter_earthquakes(self, output_format: str = "ndjson", min_magnitude: Optional[float] = None,
+                         batch_size: int = STREAM_BATCH_SIZE) -> Iterator[bytes]:
+        """서버 측 named cursor에서 고정 크기 배치로 읽어 NDJSON 또는 GeoJSON FeatureCollection 조각을 생성"""
+        query = f"""
+            SELECT {EARTHQUAKE_COLUMNS}
+            FROM earthquakes
+            WHERE time IS NOT NULL
+        """
+        params: list = []
+        if min_magnitude is not None:
+            query += " AND magnitude >= %s"
+            params.append(min_magnitude)
+        query += " ORDER BY time DESC, id DESC"
+
+        def encode(row) -> bytes:
+            properties = dict(zip(EARTHQUAKE_FIELDS, row))
+            if output_format == "geojson":
+                return orjson.dumps({
+                    "type": "Feature",
+                    "id": properties["id"],
+                    "geometry": {"type": "Point", "coordinates": [properties["longitude"], properties["latitude"]]},
+                    "properties": properties,
+                }, option=orjson.OPT_UTC_Z)
+            return orjson.dumps(properties, option=orjson.OPT_UTC_Z)
+
+        if output_format == "geojson":
+            yield b'{"type":"FeatureCollection","features":['
+        first = True
+
+        # named cursor는 결과를 서버에 두고 itersize 단위로만 클라이언트로 가져옴
+        with self.db.cursor(name=f"eq_stream_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                if output_format == "geojson":
+                    chunk = b",".join(encode(row) for row in rows)
+                    if not first:
+                        chunk = b"," + chunk
                 else:
-                    earthquake_id = feature.get('id')
-                
-                if not earthquake_id:
-                    print(f"earthquake_id 없음: {feature}")
-                    skipped += 1
-                    continue
-                
-                # 중복 체크
-                cursor.execute("SELECT id FROM earthquakes WHERE id = %s", (earthquake_id,))
-                if cursor.fetchone():
-                    print(f"중복 데이터 건너뜀: {earthquake_id}")
-                    skipped += 1
-                    continue
-                
-                # 데이터 삽입
-                insert_query = """
-                    INSERT INTO earthquakes (id, magnitude, place, time, updated, depth, location, url, detail, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s, %s, %s)
-                """
-                
-                try:
-                    cursor.execute(insert_query, (
-                        earthquake_id,
-                        properties.get('mag'),
-                        properties.get('place'),
-                        datetime.fromtimestamp(properties['time'] / 1000) if properties.get('time') else None,
-                        datetime.fromtimestamp(properties['updated'] / 1000) if properties.get('updated') else None,
-                        coords[2] if len(coords) > 2 else None,
-                        coords[0],  # longitude
-                        coords[1],  # latitude
-                        properties.get('url'),
-                        properties.get('detail'),
-                        datetime.now()
-                    ))
-                    count += 1
-                    print(f"삽입 성공: {earthquake_id} - {properties.get('place')}")
-                except Exception as e:
-                    print(f"삽입 실패: {earthquake_id} - {str(e)}")
-                    skipped += 1
-            
-            # Transaction commit
-            self.db.commit()
-            print(f"총 {processed}개 처리, {count}개 삽입, {skipped}개 건너뜀")
-        
-        return count
+                    chunk = b"".join(encode(row) + b"\n" for row in rows)
+                first = False
+                yield chunk
+
+        if output_format == "geojson":
+            yield b']}'
 
-    def search_within_radius(self, lat: float, lon: float, radius_km: float) -> List[EarthquakeResponse]:
+    def sync_usgs_data(self, geojson_data: Dict[str, Any]) -> IngestResult:
+        """USGS GeoJSON 데이터를 데이터베이스에 동기화 (COPY 스테이징 + 배치 업서트)"""
+        result = upsert_features(self.db, geojson_data.get('features', []))
+        logger.info("USGS 데이터 동기화", extra=result.counts())
+        return result
+
+    def fetch_radius_rows(self, lat: float, lon: float, radius_km: float,
+                          filters: Optional[SearchFilters] = None) -> List[tuple]:
+        """반경 검색 - 최근 구간(start_time 이 스냅샷 창 안)이면 메모리 스냅샷에서 응답"""
+        rows = hot_snapshot.radius_rows(lat, lon, radius_km, filters)
+        if rows is not None:
+            return rows
+        with self.db.cursor() as cursor:
+            self._execute_prepared(cursor, *radius_query(lat, lon, radius_km, filters))
+            return cursor.fetchall()
+
+    def search_within_radius(self, lat: float, lon: float, radius_km: float,
+                             filters: Optional[SearchFilters] = None) -> List[EarthquakeResponse]:
         """반경 검색"""
-        with self.db.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            cursor.execute("""
-                SELECT 
-                    e.id,
-                    e.magnitude,
-                    e.place,
-                    e.time,
-                    e.depth,
-                    e.url,
-                    ST_Y(e.location::geometry) as latitude,
-                    ST_X(e.location::geometry) as longitude,
-                    ROUND((ST_Distance(e.location, ST_Point(%s, %s)::geography) / 1000)::numeric, 2) as distance_km
-                FROM earthquakes e
-                WHERE ST_DWithin(e.location, ST_Point(%s, %s)::geography, %s * 1000)
-                ORDER BY distance_km
-            """, (lon, lat, lon, lat, radius_km))
-            
-            rows = cursor.fetchall()
-            
-            return [
-                EarthquakeResponse(
-                    id=row['id'],
-                    magnitude=float(row['magnitude']) if row['magnitude'] else None,
-                    place=row['place'],
-                    time=row['time'],
-                    depth=float(row['depth']) if row['depth'] else None,
-                    latitude=float(row['latitude']) if row['latitude'] else None,
-                    longitude=float(row['longitude']) if row['longitude'] else None,
-                    url=row['url'],
-                    distance_km=float(row['distance_km']) if row['distance_km'] else None
-                ) for row in rows
-            ]
-
-    def search_within_polygon(self, polygon_wkt: str) -> List[EarthquakeResponse]:
+        return rows_to_models(self.fetch_radius_rows(lat, lon, radius_km, filters))
+
+    def search_within_radius_json(self, lat: float, lon: float, radius_km: float,
+                                  filters: Optional[SearchFilters] = None) -> bytes:
+        """반경 검색 - JSON 바이트 직렬화"""
+        return rows_to_json(self.fetch_radius_rows(lat, lon, radius_km, filters))
+
+    def iter_batch_radius(self, centers: List[BatchRadiusCenter], output_format: str = "ndjson",
+                          batch_size: int = STREAM_BATCH_SIZE) -> Iterator[bytes]:
+        """여러 지점 반경 검색을 한 번의 LATERAL 조인으로 실행하고 지점별로 묶어 스트리밍
+
+        ndjson 이면 지점마다 한 줄, json 이면 {"results": [...]} 를 조각으로 나눠 보낸다.
+        """
+        def encode(center_id: str, rows: List[tuple]) -> bytes:
+            return orjson.dumps({
+                "id": center_id,
+                "count": len(rows),
+                "earthquakes": [dict(zip(EARTHQUAKE_FIELDS, row)) for row in rows],
+            }, option=orjson.OPT_UTC_Z)
+
+        if output_format == "json":
+            yield b'{"results":['
+        first = True
+        current_ord, current_id, group = None, None, []
+
+        def flush() -> bytes:
+            nonlocal first
+            chunk = encode(current_id, group)
+            if output_format == "json":
+                chunk = chunk if first else b"," + chunk
+            else:
+                chunk += b"\n"
+            first = False
+            return chunk
+
+        with self.db.cursor(name=f"eq_batch_{uuid.uuid4().hex}") as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(BATCH_RADIUS_QUERY, batch_radius_params(centers))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    ord_, center_id, earthquake = row[0], row[1], row[2:]
+                    if ord_ != current_ord:
+                        if current_ord is not None:
+                            yield flush()
+                        current_ord, current_id, group = ord_, center_id, []
+                    # LEFT JOIN 이라 결과가 없는 지점은 id 가 NULL 인 행 하나로 옴
+                    if earthquake[0] is not None:
+                        group.append(earthquake)
+        if current_ord is not None:
+            yield flush()
+
+        if output_format == "json":
+            yield b"]}"
+
+    def fetch_nearest_rows(self, request: NearestSearchRequest) -> List[tuple]:
+        """GiST 인덱스의 <-> 거리 순서로 가장 가까운 limit 개만 읽음 (주변 이벤트 수와 무관)"""
+        with self.db.cursor() as cursor:
+            self._execute_prepared(cursor, *nearest_query(request))
+            return cursor.fetchall()
+
+    def search_nearest(self, request: NearestSearchRequest) -> List[EarthquakeResponse]:
+        """최근접 k개 검색"""
+        return rows_to_models(self.fetch_nearest_rows(request))
+
+    def fetch_polygon_rows(self, polygon_wkt: str, filters: Optional[SearchFilters] = None) -> List[tuple]:
+        """다각형을 유효화/날짜변경선 분할/단순화/분할한 조각(해시로 재사용)으로 검색"""
+        polygon_hash = polygons.prepare_polygon(self.db, polygon_wkt)
+        with self.db.cursor() as cursor:
+            self._execute_prepared(cursor, *polygon_query(polygon_hash, filters))
+            return cursor.fetchall()
+
+    def search_within_polygon(self, polygon_wkt: str,
+                              filters: Optional[SearchFilters] = None) -> List[EarthquakeResponse]:
         """다각형 내 검색 - 날짜변경선 처리 개선"""
-        with self.db.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            # Geography 타입을 사용하여 날짜변경선 문제 해결
-            cursor.execute("""
-                SELECT 
-                    e.id,
-                    e.magnitude,
-                    e.place,
-                    e.time,
-                    e.depth,
-                    e.url,
-                    ST_Y(e.location::geometry) as latitude,
-                    ST_X(e.location::geometry) as longitude
-                FROM earthquakes e
-                WHERE ST_Covers(ST_GeogFromText(%s), e.location)
-            """, (polygon_wkt,))
-            
-            rows = cursor.fetchall()
-            
-            return [
-                EarthquakeResponse(
-                    id=row['id'],
-                    magnitude=float(row['magnitude']) if row['magnitude'] else None,
-                    place=row['place'],
-                    time=row['time'],
-                    depth=float(row['depth']) if row['depth'] else None,
-                    latitude=float(row['latitude']) if row['latitude'] else None,
-                    longitude=float(row['longitude']) if row['longitude'] else None,
-                    url=row['url']
-                ) for row in rows
-            ]
+        return rows_to_models(self.fetch_polygon_rows(polygon_wkt, filters))
+
+    def search_within_polygon_json(self, polygon_wkt: str, filters: Optional[SearchFilters] = None) -> bytes:
+        """다각형 내 검색 - JSON 바이트 직렬화"""
+        return rows_to_json(self.fetch_polygon_rows(polygon_wkt, filters))
 
     def calculate_boundary_stats(self, earthquake_ids: List[str]) -> BoundaryStatsResponse:
-        """경계 계산 - 직접 SQL 구현"""
+        """경계 계산 - id 목록을 배열 파라미터 하나로 전달"""
+        return self.calculate_boundary_stats_for(BoundarySearchRequest(ids=earthquake_ids))
+
+    def calculate_boundary_stats_for(self, request: BoundarySearchRequest) -> BoundaryStatsResponse:
+        """검색 조건으로 정의된 지진 집합의 경계 통계 - 대상 선택부터 집계까지 한 번의 쿼리로 PostGIS 안에서 계산"""
+        _, selection, params = boundary_selection_query(self.db, request)
+        query, extra_params = boundary_stats_query(selection, request)
         with self.db.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            # 지진 ID들을 WHERE 조건으로 사용
-            placeholders = ','.join(['%s'] * len(earthquake_ids))
-            
-            cursor.execute(f"""
-                SELECT 
-                    COUNT(*) as total_count,
-                    ST_AsText(ST_Centroid(ST_Collect(location::geometry))) as center_point,
-                    ST_AsText(ST_Envelope(ST_Collect(location::geometry))) as bounding_box,
-                    ST_AsText(ST_ConvexHull(ST_Collect(location::geometry))) as convex_hull,
-                    ST_Area(ST_ConvexHull(ST_Collect(location::geometry))::geography) / 1000000 as area_km2
-                FROM earthquakes 
-                WHERE id IN ({placeholders})
-            """, earthquake_ids)
-            
+            cursor.execute(query, params + extra_params)
             row = cursor.fetchone()
-            
-            if not row or row['total_count'] == 0:
-                raise ValueError("계산할 지진 데이터가 없습니다")
-            
-            return BoundaryStatsResponse(
-                total_count=row['total_count'],
-                center_point=row['center_point'],
-                bounding_box=row['bounding_box'],
-                convex_hull=row['convex_hull'],
-                area_km2=float(row['area_km2']) if row['area_km2'] else 0.0
-            )
-
-    def get_statistics(self) -> StatsResponse:
-        """통계 정보"""
-        with self.db.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
-            # 전체 지진 수
-            cursor.execute("SELECT COUNT(*) as total FROM earthquakes")
-            total_count = cursor.fetchone()['total']
-            
-            # 규모별 통계
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    AVG(magnitude) as avg_magnitude,
-                    MAX(magnitude) as max_magnitude,
-                    MIN(magnitude) as min_magnitude
-                FROM earthquakes WHERE magnitude IS NOT NULL
-            """)
-            mag_stats = cursor.fetchone()
-            
-            # 깊이별 통계
-            cursor.execute("""
-                SELECT 
-                    AVG(depth) as avg_depth,
-                    MAX(depth) as max_depth,
-                    MIN(depth) as min_depth
-                FROM earthquakes WHERE depth IS NOT NULL
-            """)
-            depth_stats = cursor.fetchone()
-            
-            # 최근 24시간
-            cursor.execute("""
-                SELECT COUNT(*) as recent_count 
-                FROM earthquakes 
-                WHERE time >= %s
-            """, (datetime.now() - timedelta(hours=24),))
-            recent_count = cursor.fetchone()['recent_count']
-            
-            return StatsResponse(
-                total_earthquakes=total_count,
-                magnitude_stats={
-                    'average': float(mag_stats['avg_magnitude']) if mag_stats['avg_magnitude'] else 0,
-                    'maximum': float(mag_stats['max_magnitude']) if mag_stats['max_magnitude'] else 0,
-                    'minimum': float(mag_stats['min_magnitude']) if mag_stats['min_magnitude'] else 0
-                },
-                depth_stats={
-                    'average': float(depth_stats['avg_depth']) if depth_stats['avg_depth'] else 0,
-                    'maximum': float(depth_stats['max_depth']) if depth_stats['max_depth'] else 0,
-                    'minimum': float(depth_stats['min_depth']) if depth_stats['min_depth'] else 0
-                },
-                recent_24h=recent_count
-            ) 
\ No newline at end of file
+
+        if not row or row['total_count'] == 0:
+            raise ValueError("계산할 지진 데이터가 없습니다")
+
+        return BoundaryStatsResponse(
+            total_count=row['total_count'],
+            center_point=row['center_point'],
+            bounding_box=row['bounding_box'],
+            convex_hull=row['convex_hull'],
+            area_km2=float(row['area_km2']) if row['area_km2'] else 0.0,
+            weighted_centroid=row.get('weighted_centroid'),
+            concave_hull=row.get('concave_hull'),
+            density_cell_deg=request.density_cell_deg,
+            density=row.get('density') or ([] if request.density_cell_deg is not None else None),
+        )
+
+    def get_statistics(self, start_time: Optional[datetime] = None,
+                       end_time: Optional[datetime] = None) -> StatsResponse:
+        """통계 정보 - 스냅샷 창 안의 구간은 메모리에서, 그 밖은 시간/일 롤업에서 집계"""
+        window = hot_snapshot.aggregate(start_time, end_time) or stats.aggregate_window(self.db, start_time, end_time)
+
+        # 최근 24시간 (DB 로 가면 양 끝 1시간 미만만 원본에서 읽음)
+        now = datetime.now(timezone.utc)
+        day_ago = now - timedelta(hours=24)
+        recent = hot_snapshot.aggregate(day_ago, now) or stats.aggregate_window(self.db, day_ago, now)
+
+        def summary(values: Dict[str, Any]) -> Dict[str, float]:
+            return {
+                'average': values['average'] or 0,
+                'maximum': values['maximum'] or 0,
+                'minimum': values['minimum'] or 0
+            }
+
+        return StatsResponse(
+            total_earthquakes=window['count'],
+            magnitude_stats=summary(window['magnitude']),
+            depth_stats=summary(window['depth']),
+            recent_24h=recent['count']
+        )
+
+    def get_magnitude_histogram(self, start_time: Optional[datetime] = None,
+                                end_time: Optional[datetime] = None,
+                                bin_width: float = 0.5) -> MagnitudeHistogramResponse:
+        """규모 히스토그램 (스냅샷 창 안이면 메모리, 아니면 롤업 기반)"""
+        bins = hot_snapshot.magnitude_histogram(start_time, end_time, bin_width)
+        if bins is None:
+            bins = stats.magnitude_histogram(self.db, start_time, end_time, bin_width)
+        return MagnitudeHistogramResponse(
+            bin_width=bin_width,
+            start_time=start_time,
+            end_time=end_time,
+            bins=bins
+        ) 
\ No newline at end of file
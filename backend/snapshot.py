@@ -0,0 +1,749 @@
+import argparse
+import asyncio
+import logging
+import math
+import operator
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import metrics
+from database import run_db
+from ingest import ChangedEvent, IngestResult, register_ingest_listener
+from stats import histogram_width
+
+logger = logging.getLogger(__name__)
+
+# 최근 이벤트 메모리 스냅샷 설정 (목록/반경/통계 조회를 DB 없이 응답)
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "false").lower() == "true"
+SNAPSHOT_WINDOW_DAYS = float(os.getenv("SNAPSHOT_WINDOW_DAYS", "30"))
+# 위경도 격자 색인 칸 크기(도)
+SNAPSHOT_GRID_DEG = float(os.getenv("SNAPSHOT_GRID_DEG", "1.0"))
+# 적재 리스너로 패치하더라도 창을 앞으로 밀고 다른 프로세스의 적재를 반영하도록 주기적으로 다시 구축
+SNAPSHOT_REBUILD_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_REBUILD_INTERVAL_SECONDS", "3600"))
+SNAPSHOT_FETCH_SIZE = 20000
+
+# WGS84 (PostGIS geography 거리 계산과 같은 타원체)
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+# 구면 거리 사전 필터용 평균 반지름과 여유 (타원체 측지 거리는 구면 거리와 최대 약 0.6% 차이)
+EARTH_MEAN_RADIUS_M = 6371008.8
+SPHERE_MARGIN = 0.01
+VINCENTY_MAX_ITERATIONS = 200
+VINCENTY_TOLERANCE = 1e-12
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_CENTI = Decimal("0.01")
+
+# services.SEARCH_FILTERS 중 스냅샷 열로 평가할 수 있는 조건 (요청 필드, 열, 비교)
+_RANGE_FILTERS = (
+    ("start_time", "time_us", operator.ge),
+    ("end_time", "time_us", operator.lt),
+    ("min_magnitude", "magnitude", operator.ge),
+    ("max_magnitude", "magnitude", operator.le),
+    ("min_depth", "depth", operator.ge),
+    ("max_depth", "depth", operator.le),
+)
+# 스냅샷으로 평가하지 않는 필터 - 지정되면 DB 로 보냄
+_UNSUPPORTED_FILTERS = ("ids",)
+
+
+def to_us(value: datetime) -> int:
+    """datetime -> UTC epoch 마이크로초 (시간대 없는 값은 UTC로 간주)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_us(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+def _nullable(value: float) -> Optional[float]:
+    return None if value != value else value
+
+
+def _as_float(value) -> float:
+    """numeric(Decimal) -> float8 와 같은 값 (NULL 은 NaN)"""
+    return float(value) if value is not None else math.nan
+
+
+class StringColumn:
+    """문자열 열 - UTF-8 바이트를 버퍼 하나에 이어 붙이고 행별 오프셋으로 접근 (valid=False 는 NULL)"""
+
+    __slots__ = ("data", "offsets", "valid")
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray, valid: np.ndarray):
+        self.data = data
+        self.offsets = offsets
+        self.valid = valid
+
+    @classmethod
+    def from_values(cls, values: Sequence[Optional[str]]) -> "StringColumn":
+        encoded = [value.encode() if value is not None else b"" for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(item) for item in encoded], out=offsets[1:])
+        return cls(
+            np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            offsets,
+            np.array([value is not None for value in values], dtype=bool),
+        )
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    def get(self, index: int) -> Optional[str]:
+        if not self.valid[index]:
+            return None
+        return self.data[self.offsets[index]:self.offsets[index + 1]].tobytes().decode()
+
+    def take(self, indices: np.ndarray) -> "StringColumn":
+        """지정한 행만 골라 새 열 생성 (바이트 복사까지 벡터 연산)"""
+        starts = self.offsets[indices]
+        lengths = self.offsets[indices + 1] - starts
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        total = int(offsets[-1])
+        positions = np.repeat(starts - offsets[:-1], lengths) + np.arange(total, dtype=np.int64)
+        return StringColumn(self.data[positions], offsets, self.valid[indices])
+
+    @staticmethod
+    def concat(first: "StringColumn", second: "StringColumn") -> "StringColumn":
+        return StringColumn(
+            np.concatenate([first.data, second.data]),
+            np.concatenate([first.offsets, second.offsets[1:] + first.offsets[-1]]),
+            np.concatenate([first.valid, second.valid]),
+        )
+
+
+# ---------------------------------------------------------------------------
+# 거리 계산
+# ---------------------------------------------------------------------------
+
+def haversine_m(lat: float, lon: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """평균 반지름 구면 거리(m) - 타원체 거리 계산 전 후보를 줄이는 용도"""
+    phi1, phi2 = math.radians(lat), np.radians(latitudes)
+    half_dphi = (phi2 - phi1) / 2
+    half_dlambda = np.radians(longitudes - lon) / 2
+    h = np.sin(half_dphi) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(half_dlambda) ** 2
+    return 2 * EARTH_MEAN_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(h)))
+
+
+def vincenty_m(lat: float, lon: float, latitudes: np.ndarray,
+               longitudes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """WGS84 타원체 측지 거리(m)와 수렴 여부 (Vincenty 역문제, 배열 전체를 한 번에 반복)
+
+    PostGIS geography 의 ST_Distance/ST_DWithin(use_spheroid) 과 0.1mm 수준으로 일치하며,
+    거의 대척점인 경우 수렴하지 않을 수 있으므로 호출자는 수렴 여부를 확인해야 한다.
+    """
+    f = WGS84_F
+    L = np.radians(longitudes - lon)
+    U1 = math.atan((1 - f) * math.tan(math.radians(lat)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(latitudes)))
+    sin_u1, cos_u1 = math.sin(U1), math.cos(U1)
+    sin_u2, cos_u2 = np.sin(U2), np.cos(U2)
+
+    lam = L
+    converged = np.zeros(len(L), dtype=bool)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(VINCENTY_MAX_ITERATIONS):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+            cos2_alpha = 1 - sin_alpha ** 2
+            # 적도 위의 두 점이면 cos2_alpha = 0
+            cos_2sigma_m = np.where(cos2_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha)
+            C = f / 16 * cos2_alpha * (4 + f * (4 - 3 * cos2_alpha))
+            previous = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = np.abs(lam - previous) < VINCENTY_TOLERANCE
+            if converged.all():
+                break
+
+        u2 = cos2_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+        A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+        B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+        delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+            cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+            - B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+        ))
+        distance = WGS84_B * A * (sigma - delta_sigma)
+    return distance, converged & np.isfinite(distance)
+
+
+def round_km(meters: np.ndarray) -> np.ndarray:
+    """ROUND((m / 1000)::numeric, 2)::float8 과 같은 값
+
+    float8 -> numeric 변환은 유효숫자 15자리 문자열을 거치고 ROUND 는 0.5 에서 0 반대쪽으로 올리므로,
+    .5 경계 근처 값만 같은 규칙으로 Decimal 계산하고 나머지는 배열 연산으로 처리한다.
+    """
+    km = meters / 1000
+    scaled = km * 100
+    hundredths = np.floor(scaled + 0.5)
+    ambiguous = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for index in ambiguous:
+        exact = Decimal(f"{km[index]:.15g}").quantize(_CENTI, rounding=ROUND_HALF_UP)
+        hundredths[index] = float(exact * 100)
+    return hundredths / 100
+
+
+# ---------------------------------------------------------------------------
+# 스냅샷
+# ---------------------------------------------------------------------------
+
+class EventSnapshot:
+    """window_start 이후 이벤트를 시각 내림차순 열 배열로 담은 불변 스냅샷 + 위경도 격자 색인
+
+    바꿀 때는 patched() 로 새 스냅샷을 만들어 통째로 교체하므로 읽는 쪽은 잠금이 필요 없다.
+    """
+
+    def __init__(self, window_start_us: int, built_at: datetime, time_us: np.ndarray,
+                 latitude: np.ndarray, longitude: np.ndarray, magnitude: np.ndarray, depth: np.ndarray,
+                 ids: StringColumn, places: StringColumn, urls: StringColumn, id_hash: np.ndarray,
+                 grid_deg: float = SNAPSHOT_GRID_DEG):
+        order = np.argsort(-time_us, kind="stable")
+        if not np.array_equal(order, np.arange(len(order))):
+            time_us, latitude, longitude, magnitude, depth, id_hash = (
+                column[order] for column in (time_us, latitude, longitude, magnitude, depth, id_hash)
+            )
+            ids, places, urls = ids.take(order), places.take(order), urls.take(order)
+
+        self.window_start_us = window_start_us
+        self.built_at = built_at
+        self.time_us = time_us
+        self.latitude = latitude
+        self.longitude = longitude
+        self.magnitude = magnitude
+        self.depth = depth
+        self.ids = ids
+        self.places = places
+        self.urls = urls
+        self.id_hash = id_hash
+        # 오름차순 이진 탐색용
+        self._neg_time = -time_us
+        self._build_grid(grid_deg)
+
+    @classmethod
+    def from_rows(cls, window_start_us: int, rows: Sequence[tuple]) -> "EventSnapshot":
+        """EARTHQUAKE_COLUMNS 순서의 행 튜플로 생성"""
+        ids = [row[0] for row in rows]
+        return cls(
+            window_start_us,
+            datetime.now(timezone.utc),
+            np.array([to_us(row[3]) for row in rows], dtype=np.int64),
+            np.array([row[5] for row in rows], dtype=np.float64),
+            np.array([row[6] for row in rows], dtype=np.float64),
+            np.array([row[1] for row in rows], dtype=np.float64),
+            np.array([row[4] for row in rows], dtype=np.float64),
+            StringColumn.from_values(ids),
+            StringColumn.from_values([row[2] for row in rows]),
+            StringColumn.from_values([row[7] for row in rows]),
+            np.array([hash(earthquake_id) for earthquake_id in ids], dtype=np.int64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.time_us)
+
+    def _build_grid(self, grid_deg: float) -> None:
+        """격자 칸 번호순으로 정렬한 행 번호(CSR) - 같은 위도 줄의 칸은 연속 구간"""
+        self.grid_deg = grid_deg
+        self.n_lat = math.ceil(180 / grid_deg)
+        self.n_lon = math.ceil(360 / grid_deg)
+        n_cells = self.n_lat * self.n_lon
+        with np.errstate(invalid="ignore"):
+            lat_index = np.clip(np.floor((self.latitude + 90) / grid_deg), 0, self.n_lat - 1)
+            lon_index = np.mod(np.floor((self.longitude + 180) / grid_deg), self.n_lon)
+        cell = lat_index * self.n_lon + lon_index
+        # 위치가 없는 행은 마지막 칸 뒤로 보내 색인에서 제외
+        cell = np.where(np.isnan(cell), n_cells, cell).astype(np.int64)
+        self.grid_order = np.argsort(cell, kind="stable")
+        self.grid_starts = np.searchsorted(cell[self.grid_order], np.arange(n_cells + 1))
+
+    def _lat_row(self, latitude: float) -> int:
+        return min(max(int(math.floor((latitude + 90) / self.grid_deg)), 0), self.n_lat - 1)
+
+    def _lon_col(self, longitude: float) -> int:
+        return min(int(math.floor((longitude + 180) / self.grid_deg)), self.n_lon - 1)
+
+    def _lon_ranges(self, lo: float, hi: float) -> List[Tuple[int, int]]:
+        """[lo, hi] 경도 구간의 칸 범위 - ±180 을 넘는 쪽은 경도를 360 돌려 칸을 구함
+        (grid_deg 가 360 의 약수가 아니면 마지막 칸이 좁으므로 칸 번호로 돌리면 안 됨)"""
+        if hi - lo >= 360:
+            return [(0, self.n_lon - 1)]
+        if lo < -180:
+            first, last = self._lon_col(lo + 360), self._lon_col(hi)
+        elif hi >= 180:
+            first, last = self._lon_col(lo), self._lon_col(hi - 360)
+        else:
+            return [(self._lon_col(lo), self._lon_col(hi))]
+        # 양쪽 범위가 같은 칸에서 만나면 행이 두 번 나오지 않도록 전체 한 번
+        return [(0, self.n_lon - 1)] if last >= first else [(first, self.n_lon - 1), (0, last)]
+
+    def grid_candidates(self, lat: float, lon: float, radius_m: float) -> np.ndarray:
+        """구면 캡(반경 + 여유)에 걸리는 격자 칸의 행 번호"""
+        angle = radius_m * (1 + SPHERE_MARGIN) / EARTH_MEAN_RADIUS_M
+        if angle >= math.pi:
+            return self.grid_order[:self.grid_starts[-1]]
+        dlat = math.degrees(angle)
+        lat_lo, lat_hi = lat - dlat, lat + dlat
+        full = [(0, self.n_lon - 1)]
+        if lat_lo <= -90 or lat_hi >= 90:
+            lon_ranges = full
+        else:
+            ratio = math.sin(angle) / math.cos(math.radians(lat))
+            if ratio >= 1:
+                lon_ranges = full
+            else:
+                dlon = math.degrees(math.asin(ratio))
+                lon_ranges = self._lon_ranges(lon - dlon, lon + dlon)
+
+        chunks = []
+        for row in range(self._lat_row(lat_lo), self._lat_row(lat_hi) + 1):
+            base = row * self.n_lon
+            for first, last in lon_ranges:
+                start, end = self.grid_starts[base + first], self.grid_starts[base + last + 1]
+                if end > start:
+                    chunks.append(self.grid_order[start:end])
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def covers(self, start_time: Optional[datetime]) -> bool:
+        """[start_time, ∞) 구간의 행을 모두 갖고 있는지"""
+        return start_time is not None and to_us(start_time) >= self.window_start_us
+
+    def time_slice(self, start_time: Optional[datetime], end_time: Optional[datetime]) -> slice:
+        """[start_time, end_time) 에 해당하는 행 구간 (시각 내림차순이므로 연속)"""
+        lo = 0 if end_time is None else int(np.searchsorted(self._neg_time, -to_us(end_time), side="right"))
+        hi = len(self) if start_time is None else int(np.searchsorted(self._neg_time, -to_us(start_time), side="right"))
+        return slice(lo, max(lo, hi))
+
+    def filter_mask(self, indices: np.ndarray, filters) -> np.ndarray:
+        """SEARCH_FILTERS 와 같은 조건 (NULL 은 NaN 이라 모든 비교가 거짓)"""
+        mask = np.ones(len(indices), dtype=bool)
+        for field_name, column, compare in _RANGE_FILTERS:
+            value = getattr(filters, field_name, None) if filters is not None else None
+            if value is None:
+                continue
+            if column == "time_us":
+                value = to_us(value)
+            mask &= compare(getattr(self, column)[indices], value)
+        return mask
+
+    def rows(self, indices: np.ndarray, distances_km: Optional[np.ndarray] = None) -> List[tuple]:
+        """EARTHQUAKE_COLUMNS + distance_km 순서의 행 튜플 (DB 조회 결과와 같은 형태)"""
+        distances = distances_km.tolist() if distances_km is not None else [None] * len(indices)
+        return [
+            (
+                self.ids.get(index),
+                _nullable(magnitude),
+                self.places.get(index),
+                from_us(time_us),
+                _nullable(depth),
+                _nullable(latitude),
+                _nullable(longitude),
+                self.urls.get(index),
+                distance,
+            )
+            for index, time_us, magnitude, depth, latitude, longitude, distance in zip(
+                indices.tolist(),
+                self.time_us[indices].tolist(),
+                self.magnitude[indices].tolist(),
+                self.depth[indices].tolist(),
+                self.latitude[indices].tolist(),
+                self.longitude[indices].tolist(),
+                distances,
+            )
+        ]
+
+    def patched(self, changes: Sequence[ChangedEvent]) -> "EventSnapshot":
+        """적재로 바뀐 행을 반영한 새 스냅샷 (같은 id 의 기존 행은 지우고 창 안의 새 값만 추가)"""
+        events = {event.id: event for event in changes}
+        if not events:
+            return self
+        hashes = np.array([hash(earthquake_id) for earthquake_id in events], dtype=np.int64)
+        keep = np.ones(len(self), dtype=bool)
+        for index in np.flatnonzero(np.isin(self.id_hash, hashes)).tolist():
+            if self.ids.get(index) in events:
+                keep[index] = False
+        added = [
+            event for event in events.values()
+            if event.time is not None and to_us(event.time) >= self.window_start_us
+        ]
+        if keep.all() and not added:
+            return self
+
+        kept = np.flatnonzero(keep)
+
+        def column(values: np.ndarray, new_values: list) -> np.ndarray:
+            return np.concatenate([values[kept], np.array(new_values, dtype=values.dtype)])
+
+        return EventSnapshot(
+            self.window_start_us,
+            self.built_at,
+            column(self.time_us, [to_us(event.time) for event in added]),
+            column(self.latitude, [event.latitude for event in added]),
+            column(self.longitude, [event.longitude for event in added]),
+            column(self.magnitude, [_as_float(event.magnitude) for event in added]),
+            column(self.depth, [_as_float(event.depth) for event in added]),
+            StringColumn.concat(self.ids.take(kept), StringColumn.from_values([event.id for event in added])),
+            StringColumn.concat(self.places.take(kept), StringColumn.from_values([event.place for event in added])),
+            StringColumn.concat(self.urls.take(kept), StringColumn.from_values([event.url for event in added])),
+            column(self.id_hash, [hash(event.id) for event in added]),
+            self.grid_deg,
+        )
+
+    def trimmed(self, before: datetime) -> "EventSnapshot":
+        """before 이전 행을 버리고 창 시작을 before 로 올린 새 스냅샷 (보관 정책으로 원본이 빠질 때)"""
+        before_us = to_us(before)
+        if before_us <= self.window_start_us:
+            return self
+        kept = np.arange(self.time_slice(before, None).stop, dtype=np.int64)
+        return EventSnapshot(
+            before_us, self.built_at,
+            self.time_us[kept], self.latitude[kept], self.longitude[kept], self.magnitude[kept], self.depth[kept],
+            self.ids.take(kept), self.places.take(kept), self.urls.take(kept), self.id_hash[kept],
+            self.grid_deg,
+        )
+
+
+class HotSnapshot:
+    """현재 스냅샷을 들고 조회를 라우팅하고, 적재 결과로 패치하거나 주기적으로 다시 구축
+
+    조회 메서드는 스냅샷으로 PostGIS 와 같은 결과를 낼 수 없으면 None 을 반환하며, 호출자는 DB 로 조회한다.
+    """
+
+    def __init__(self, enabled: bool = SNAPSHOT_ENABLED):
+        self.enabled = enabled
+        self._current: Optional[EventSnapshot] = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # 다시 구축하는 동안 들어온 변경 (구축이 끝나면 새 스냅샷에 다시 적용)
+        self._pending: Optional[List[List[ChangedEvent]]] = None
+        self.rebuilds = 0
+        self.patches = 0
+        self.last_rebuild_ms: Optional[float] = None
+
+    @property
+    def current(self) -> Optional[EventSnapshot]:
+        return self._current if self.enabled else None
+
+    def _served(self, query: str, served: bool) -> None:
+        metrics.SNAPSHOT_QUERIES.inc(1.0, query, "served" if served else "fallback")
+
+    # --- 조회 ---------------------------------------------------------------
+
+    def latest_rows(self, limit: int, min_magnitude: Optional[float] = None) -> Optional[List[tuple]]:
+        """최신순 목록 - 스냅샷 안에 limit 개가 모두 있을 때만 (창 밖 행은 모두 더 오래됨)"""
+        snapshot = self.current
+        if snapshot is None:
+            return None
+        if min_magnitude:
+            indices = np.flatnonzero(snapshot.magnitude >= min_magnitude)[:limit]
+        else:
+            indices = np.arange(min(limit, len(snapshot)), dtype=np.int64)
+        served = len(indices) == limit
+        self._served("list", served)
+        return snapshot.rows(indices) if served else None
+
+    def radius_rows(self, lat: float, lon: float, radius_km: float, filters=None) -> Optional[List[tuple]]:
+        """반경 검색 - start_time 이 창 안이어야 하며, 격자 -> 구면 거리 -> 타원체 거리 순으로 거름"""
+        snapshot = self.current
+        if snapshot is None:
+            return None
+        if not snapshot.covers(getattr(filters, "start_time", None)) or any(
+                getattr(filters, field_name, None) is not None for field_name in _UNSUPPORTED_FILTERS):
+            self._served("radius", False)
+            return None
+
+        radius_m = radius_km * 1000
+        candidates = snapshot.grid_candidates(lat, lon, radius_m)
+        candidates = candidates[snapshot.filter_mask(candidates, filters)]
+        near = haversine_m(lat, lon, snapshot.latitude[candidates], snapshot.longitude[candidates])
+        candidates = candidates[near <= radius_m * (1 + SPHERE_MARGIN)]
+        distances, converged = vincenty_m(lat, lon, snapshot.latitude[candidates], snapshot.longitude[candidates])
+        if not converged.all():
+            # 대척점 근처는 PostGIS(GeographicLib)에 맡김
+            self._served("radius", False)
+            return None
+
+        inside = distances <= radius_m
+        candidates, distances = candidates[inside], distances[inside]
+        rounded = round_km(distances)
+        order = np.lexsort((distances, rounded))
+        limit = getattr(filters, "limit", None)
+        if limit is not None:
+            order = order[:limit]
+        self._served("radius", True)
+        return snapshot.rows(candidates[order], rounded[order])
+
+    def aggregate(self, start_time: Optional[datetime], end_time: Optional[datetime]) -> Optional[Dict[str, Any]]:
+        """stats.aggregate_window 과 같은 형태의 구간 집계"""
+        snapshot = self.current
+        if snapshot is None:
+            return None
+        if not snapshot.covers(start_time):
+            self._served("stats", False)
+            return None
+        window = snapshot.time_slice(start_time, end_time)
+
+        def summary(values: np.ndarray) -> Dict[str, Any]:
+            values = values[~np.isnan(values)]
+            count = len(values)
+            return {
+                "count": count,
+                "average": float(values.sum()) / count if count else None,
+                "minimum": float(values.min()) if count else None,
+                "maximum": float(values.max()) if count else None,
+            }
+
+        self._served("stats", True)
+        return {
+            "count": window.stop - window.start,
+            "magnitude": summary(snapshot.magnitude[window]),
+            "depth": summary(snapshot.depth[window]),
+        }
+
+    def magnitude_histogram(self, start_time: Optional[datetime], end_time: Optional[datetime],
+                            bin_width: float) -> Optional[List[Dict[str, Any]]]:
+        """stats.magnitude_histogram 과 같은 구간 - 규모(소수 둘째 자리)를 정수로 바꿔 정확히 나눔"""
+        width = histogram_width(bin_width)
+        snapshot = self.current
+        if snapshot is None:
+            return None
+        if not snapshot.covers(start_time):
+            self._served("histogram", False)
+            return None
+        magnitudes = snapshot.magnitude[snapshot.time_slice(start_time, end_time)]
+        hundredths = np.rint(magnitudes[~np.isnan(magnitudes)] * 100).astype(np.int64)
+        width_hundredths = int(width * 100)
+        bins, counts = np.unique(np.floor_divide(hundredths, width_hundredths) * width_hundredths,
+                                 return_counts=True)
+        self._served("histogram", True)
+        return [
+            {"magnitude": float(Decimal(int(bin_start)) / 100), "count": int(count)}
+            for bin_start, count in zip(bins.tolist(), counts.tolist())
+        ]
+
+    # --- 유지 ---------------------------------------------------------------
+
+    def rebuild(self, conn) -> Optional[EventSnapshot]:
+        """최근 SNAPSHOT_WINDOW_DAYS 일 행을 DB 에서 다시 읽어 교체 (이미 구축 중이면 건너뜀)"""
+        from services import EARTHQUAKE_COLUMNS
+
+        if not self._rebuild_lock.acquire(blocking=False):
+            return None
+        try:
+            started = time.perf_counter()
+            window_start = datetime.now(timezone.utc) - timedelta(days=SNAPSHOT_WINDOW_DAYS)
+            with self._lock:
+                self._pending = []
+            rows: List[tuple] = []
+            with conn.cursor(name=f"snapshot_{uuid.uuid4().hex}") as cursor:
+                cursor.itersize = SNAPSHOT_FETCH_SIZE
+                cursor.execute(f"""
+                    SELECT {EARTHQUAKE_COLUMNS}
+                    FROM earthquakes
+                    WHERE time >= %s
+                    ORDER BY time DESC
+                """, (window_start,))
+                while True:
+                    batch = cursor.fetchmany(SNAPSHOT_FETCH_SIZE)
+                    if not batch:
+                        break
+                    rows.extend(batch)
+            conn.rollback()
+
+            snapshot = EventSnapshot.from_rows(to_us(window_start), rows)
+            with self._lock:
+                for changes in self._pending:
+                    snapshot = snapshot.patched(changes)
+                self._pending = None
+                self._current = snapshot
+            self.rebuilds += 1
+            self.last_rebuild_ms = (time.perf_counter() - started) * 1000
+            logger.info("스냅샷 구축", extra={"rows": len(snapshot), "elapsed_ms": round(self.last_rebuild_ms, 1)})
+            return snapshot
+        finally:
+            with self._lock:
+                self._pending = None
+            self._rebuild_lock.release()
+
+    def apply_changes(self, result: IngestResult) -> None:
+        """적재 리스너 - 커밋된 변경 행으로 현재 스냅샷 패치"""
+        if not self.enabled:
+            return
+        changes = list(result.changed)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(changes)
+            if self._current is not None:
+                self._current = self._current.patched(changes)
+                self.patches += 1
+
+    def trim(self, before: datetime) -> None:
+        """보관 정책으로 before 이전 원본이 빠졌을 때 스냅샷도 맞춤"""
+        with self._lock:
+            if self._current is not None:
+                self._current = self._current.trimmed(before)
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._current
+        return {
+            "enabled": self.enabled,
+            "ready": snapshot is not None,
+            "rows": len(snapshot) if snapshot is not None else 0,
+            "window_start": from_us(snapshot.window_start_us) if snapshot is not None else None,
+            "built_at": snapshot.built_at if snapshot is not None else None,
+            "grid_deg": snapshot.grid_deg if snapshot is not None else SNAPSHOT_GRID_DEG,
+            "rebuilds": self.rebuilds,
+            "patches": self.patches,
+            "last_rebuild_ms": self.last_rebuild_ms,
+        }
+
+
+hot_snapshot = HotSnapshot()
+
+register_ingest_listener(hot_snapshot.apply_changes)
+
+
+async def refresh_loop(interval: float = SNAPSHOT_REBUILD_INTERVAL_SECONDS) -> None:
+    """시작 직후 한 번 구축하고 interval 마다 다시 구축 (앱 lifespan 에서 실행)"""
+    while True:
+        try:
+            await run_db(hot_snapshot.rebuild)
+        except Exception as e:
+            logger.exception("스냅샷 구축 오류: %s", e)
+        await asyncio.sleep(interval)
+
+
+# ---------------------------------------------------------------------------
+# 결과 비교 (스냅샷 vs PostGIS)
+# ---------------------------------------------------------------------------
+
+def verify(conn, queries: int = 100, seed: int = 0) -> Dict[str, Any]:
+    """무작위 목록/반경/통계 조회를 스냅샷과 PostGIS 양쪽에서 실행해 결과 비교"""
+    from models import RadiusSearchRequest
+    from services import EARTHQUAKE_COLUMNS, radius_query
+    import stats
+
+    checker = HotSnapshot(enabled=True)
+    snapshot = checker.rebuild(conn)
+    if snapshot is None or not len(snapshot):
+        raise RuntimeError("스냅샷 창 안에 이벤트가 없습니다")
+    rng = random.Random(seed)
+    window_start = from_us(snapshot.window_start_us)
+    now = datetime.now(timezone.utc)
+    mismatches: List[Dict[str, Any]] = []
+    checked = {"list": 0, "radius": 0, "stats": 0}
+
+    def db_rows(query: str, params) -> List[tuple]:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    # 목록
+    for limit in (1, 10, 100):
+        for min_magnitude in (None, 2.5, 4.5):
+            rows = checker.latest_rows(limit, min_magnitude)
+            if rows is None:
+                continue
+            condition = "magnitude >= %s::numeric" if min_magnitude else "true"
+            expected = db_rows(
+                f"SELECT {EARTHQUAKE_COLUMNS}, NULL::float8 FROM earthquakes WHERE {condition} "
+                f"ORDER BY time DESC LIMIT %s",
+                ((min_magnitude,) if min_magnitude else ()) + (limit,),
+            )
+            checked["list"] += 1
+            # 같은 시각끼리는 순서가 정해져 있지 않으므로 (시각, id) 집합으로 비교
+            if sorted((r[3], r[0]) for r in rows) != sorted((r[3], r[0]) for r in expected):
+                mismatches.append({"query": "list", "limit": limit, "min_magnitude": min_magnitude})
+
+    # 반경: 실제 이벤트 근처를 중심으로, 시작 시각은 창 안에서
+    for _ in range(queries):
+        index = rng.randrange(len(snapshot))
+        lat = _nullable(float(snapshot.latitude[index]))
+        lon = _nullable(float(snapshot.longitude[index]))
+        if lat is None or lon is None:
+            continue
+        request = RadiusSearchRequest(
+            latitude=max(-90.0, min(90.0, lat + rng.uniform(-2, 2))),
+            longitude=lon + rng.uniform(-2, 2),
+            radius_km=rng.choice([10, 50, 200, 1000, 5000]) * rng.uniform(0.5, 1.5),
+            start_time=window_start + (now - window_start) * rng.random(),
+            min_magnitude=rng.choice([None, None, 1.0, 3.0]),
+        )
+        rows = checker.radius_rows(request.latitude, request.longitude, request.radius_km, request)
+        if rows is None:
+            continue
+        _, query, params = radius_query(request.latitude, request.longitude, request.radius_km, request)
+        expected = db_rows(query, params)
+        checked["radius"] += 1
+        got = {row[0]: row[8] for row in rows}
+        want = {row[0]: row[8] for row in expected}
+        if got.keys() != want.keys():
+            mismatches.append({
+                "query": "radius", "request": request.model_dump(mode="json"),
+                "missing": sorted(want.keys() - got.keys())[:10], "extra": sorted(got.keys() - want.keys())[:10],
+            })
+        else:
+            # 반올림 경계(0.005km)에 걸린 값은 한 자리 차이까지 허용
+            off = [key for key in got if abs(got[key] - want[key]) > 0.0100001]
+            if off:
+                mismatches.append({"query": "radius", "request": request.model_dump(mode="json"),
+                                   "distance_mismatch": off[:10]})
+
+    # 통계
+    for _ in range(max(queries // 10, 1)):
+        start = window_start + (now - window_start) * rng.random()
+        end = rng.choice([None, start + (now - start) * rng.random()])
+        got = checker.aggregate(start, end)
+        want = stats.aggregate_window(conn, start, end)
+        checked["stats"] += 1
+        if got["count"] != want["count"] or any(
+            got[part][key] != want[part][key]
+            if key != "average" or got[part][key] is None or want[part][key] is None
+            else not math.isclose(got[part][key], want[part][key], rel_tol=1e-9)
+            for part in ("magnitude", "depth") for key in ("count", "average", "minimum", "maximum")
+        ):
+            mismatches.append({"query": "stats", "start": start.isoformat(),
+                               "end": end.isoformat() if end else None, "snapshot": got, "postgis": want})
+    conn.rollback()
+    return {"rows": len(snapshot), "window_start": window_start.isoformat(), "checked": checked,
+            "mismatches": mismatches}
+
+
+def main() -> int:
+    import json
+
+    from database import get_db
+    from logging_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="최근 이벤트 메모리 스냅샷")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    check = subparsers.add_parser("verify", help="스냅샷 조회 결과가 PostGIS 와 같은지 무작위 조회로 확인")
+    check.add_argument("--queries", type=int, default=100, help="반경 검색 횟수 (통계는 1/10)")
+    check.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    configure_logging()
+
+    with get_db() as conn:
+        report = verify(conn, args.queries, args.seed)
+    print(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+    return 1 if report["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
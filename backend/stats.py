@@ -0,0 +1,290 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from ingest import IngestResult, lock_rollups, register_ingest_db_hook
+
+# 롤업 히스토그램의 기본 구간 폭 (조회 시 이 값의 배수로만 묶을 수 있음)
+HISTOGRAM_BASE_BIN = Decimal("0.1")
+
+# 원본 행 집계 (롤업과 같은 컬럼 구성)
+_RAW_AGGREGATES = """
+    COUNT(*), COUNT(magnitude), SUM(magnitude)::float8, MIN(magnitude), MAX(magnitude),
+    COUNT(depth), SUM(depth)::float8, MIN(depth), MAX(depth)
+"""
+_ROLLUP_AGGREGATES = """
+    SUM(event_count), SUM(magnitude_count), SUM(magnitude_sum), MIN(magnitude_min), MAX(magnitude_max),
+    SUM(depth_count), SUM(depth_sum), MIN(depth_min), MAX(depth_max)
+"""
+
+Segment = Tuple[str, Optional[datetime], Optional[datetime]]
+
+
+# ---------------------------------------------------------------------------
+# 롤업 유지 (적재 경로에서 호출)
+# ---------------------------------------------------------------------------
+
+def _refresh_hours(cursor) -> None:
+    """stats_dirty_hours 의 시간 버킷을 원본에서 다시 집계하고, 해당 일 버킷을 시간 롤업에서 다시 집계"""
+    for table in ("earthquake_stats_rollup", "earthquake_magnitude_histogram"):
+        cursor.execute(f"""
+            DELETE FROM {table} r
+            USING stats_dirty_hours d
+            WHERE r.bucket_size = 'hour' AND r.bucket = d.bucket
+        """)
+    cursor.execute(f"""
+        INSERT INTO earthquake_stats_rollup
+        SELECT 'hour', d.bucket, {_RAW_AGGREGATES}
+        FROM stats_dirty_hours d
+        JOIN earthquakes e ON e.time >= d.bucket AND e.time < d.bucket + INTERVAL '1 hour'
+        GROUP BY d.bucket
+    """)
+    cursor.execute("""
+        INSERT INTO earthquake_magnitude_histogram
+        SELECT 'hour', d.bucket, floor(e.magnitude * 10) / 10, COUNT(*)
+        FROM stats_dirty_hours d
+        JOIN earthquakes e ON e.time >= d.bucket AND e.time < d.bucket + INTERVAL '1 hour'
+        WHERE e.magnitude IS NOT NULL
+        GROUP BY d.bucket, floor(e.magnitude * 10) / 10
+    """)
+
+    # 일 버킷은 해당 일의 시간 롤업(최대 24행)만 다시 합산
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS stats_dirty_days (bucket TIMESTAMP WITH TIME ZONE) ON COMMIT DROP
+    """)
+    cursor.execute("TRUNCATE stats_dirty_days")
+    cursor.execute("""
+        INSERT INTO stats_dirty_days
+        SELECT DISTINCT date_trunc('day', bucket, 'UTC') FROM stats_dirty_hours
+    """)
+    for table in ("earthquake_stats_rollup", "earthquake_magnitude_histogram"):
+        cursor.execute(f"""
+            DELETE FROM {table} r
+            USING stats_dirty_days d
+            WHERE r.bucket_size = 'day' AND r.bucket = d.bucket
+        """)
+    cursor.execute(f"""
+        INSERT INTO earthquake_stats_rollup
+        SELECT 'day', d.bucket, {_ROLLUP_AGGREGATES}
+        FROM stats_dirty_days d
+        JOIN earthquake_stats_rollup r
+          ON r.bucket_size = 'hour' AND r.bucket >= d.bucket AND r.bucket < d.bucket + INTERVAL '1 day'
+        GROUP BY d.bucket
+    """)
+    cursor.execute("""
+        INSERT INTO earthquake_magnitude_histogram
+        SELECT 'day', d.bucket, h.magnitude_bin, SUM(h.event_count)
+        FROM stats_dirty_days d
+        JOIN earthquake_magnitude_histogram h
+          ON h.bucket_size = 'hour' AND h.bucket >= d.bucket AND h.bucket < d.bucket + INTERVAL '1 day'
+        GROUP BY d.bucket, h.magnitude_bin
+    """)
+
+
+def _prepare_dirty_hours(cursor) -> None:
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS stats_dirty_hours (bucket TIMESTAMP WITH TIME ZONE) ON COMMIT DROP
+    """)
+    cursor.execute("TRUNCATE stats_dirty_hours")
+
+
+def refresh_changed_buckets(cursor, result: IngestResult) -> None:
+    """적재로 바뀐 이벤트의 (새/이전) 시각이 속한 시간·일 버킷만 다시 집계
+
+    병렬 백필 창은 UTC 일 경계와 맞지 않아 같은 일 버킷을 함께 건드리므로, upsert_features 가 훅 실행 전에
+    잡는 lock_rollups 아래에서만 실행된다.
+    """
+    times = [event.time for event in result.changed if event.time is not None]
+    times += [event.prev_time for event in result.changed if event.prev_time is not None]
+    if not times:
+        return
+
+    _prepare_dirty_hours(cursor)
+    cursor.execute("""
+        INSERT INTO stats_dirty_hours
+        SELECT DISTINCT date_trunc('hour', t, 'UTC') FROM unnest(%s::timestamptz[]) AS t
+    """, (times,))
+    _refresh_hours(cursor)
+
+
+def rebuild_rollups(conn) -> None:
+    """통계 롤업 전체 재생성 (최초 구축 또는 복구용)"""
+    with conn.cursor() as cursor:
+        lock_rollups(cursor)
+        cursor.execute("TRUNCATE earthquake_stats_rollup, earthquake_magnitude_histogram")
+        _prepare_dirty_hours(cursor)
+        cursor.execute("""
+            INSERT INTO stats_dirty_hours
+            SELECT DISTINCT date_trunc('hour', time, 'UTC') FROM earthquakes WHERE time IS NOT NULL
+        """)
+        _refresh_hours(cursor)
+    conn.commit()
+
+
+def delete_rollups(cursor, start: datetime, end: datetime) -> None:
+    """[start, end) 구간 버킷 삭제 (보관 정책으로 원본 파티션을 떼어낼 때 호출, 일 경계 기준)"""
+    for table in ("earthquake_stats_rollup", "earthquake_magnitude_histogram"):
+        cursor.execute(f"DELETE FROM {table} WHERE bucket >= %s AND bucket < %s", (start, end))
+
+
+# ---------------------------------------------------------------------------
+# 조회: 임의 구간을 원본 가장자리 + 시간 롤업 + 일 롤업 조각으로 분해
+# ---------------------------------------------------------------------------
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """시간대가 없는 값은 UTC로 간주 (롤업 버킷 경계가 UTC 기준)"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _floor(value: datetime, unit: str) -> datetime:
+    if unit == "day":
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil(value: datetime, unit: str) -> datetime:
+    floored = _floor(value, unit)
+    if floored == value:
+        return floored
+    return floored + (timedelta(days=1) if unit == "day" else timedelta(hours=1))
+
+
+def split_window(start: Optional[datetime], end: Optional[datetime]) -> List[Segment]:
+    """[start, end) 를 ('raw'|'hour'|'day', from, to) 조각으로 분해 (None 은 열린 끝)
+
+    원본 행은 양 끝의 1시간 미만 구간에서만 읽으므로 조회 비용이 전체 행 수와 무관하다.
+    """
+    start, end = _as_utc(start), _as_utc(end)
+    hour_start = _ceil(start, "hour") if start else None
+    hour_end = _floor(end, "hour") if end else None
+    if hour_start is not None and hour_end is not None and hour_start >= hour_end:
+        return [("raw", start, end)]
+
+    segments: List[Segment] = []
+    if start is not None and start < hour_start:
+        segments.append(("raw", start, hour_start))
+
+    day_start = _ceil(hour_start, "day") if hour_start else None
+    day_end = _floor(hour_end, "day") if hour_end else None
+    if day_start is not None and day_end is not None and day_start >= day_end:
+        segments.append(("hour", hour_start, hour_end))
+    else:
+        if hour_start is not None and hour_start < day_start:
+            segments.append(("hour", hour_start, day_start))
+        segments.append(("day", day_start, day_end))
+        if hour_end is not None and day_end < hour_end:
+            segments.append(("hour", day_end, hour_end))
+
+    if end is not None and hour_end < end:
+        segments.append(("raw", hour_end, end))
+    return segments
+
+
+def _segment_sql(segment: Segment, raw_select: str, rollup_select: str,
+                 rollup_table: str, params: list, suffix: str = "") -> str:
+    source, lower, upper = segment
+    if source == "raw":
+        conditions = ["time IS NOT NULL"]
+        column = "time"
+        sql = f"SELECT {raw_select} FROM earthquakes WHERE "
+    else:
+        conditions = ["bucket_size = %s"]
+        params.append(source)
+        column = "bucket"
+        sql = f"SELECT {rollup_select} FROM {rollup_table} WHERE "
+    if lower is not None:
+        conditions.append(f"{column} >= %s")
+        params.append(lower)
+    if upper is not None:
+        conditions.append(f"{column} < %s")
+        params.append(upper)
+    return sql + " AND ".join(conditions) + suffix
+
+
+def aggregate_window(conn, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, Any]:
+    """구간 내 개수, 규모/깊이의 합·최소·최대 (롤업 기반)"""
+    params: list = []
+    parts = [
+        _segment_sql(segment, _RAW_AGGREGATES, _ROLLUP_AGGREGATES, "earthquake_stats_rollup", params)
+        for segment in split_window(start, end)
+    ]
+    if start is None and end is None:
+        # 시각이 없는 행은 롤업에 들어가지 않으므로 전체 조회일 때만 따로 더함
+        parts.append(f"SELECT {_RAW_AGGREGATES} FROM earthquakes WHERE time IS NULL")
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(c), 0), COALESCE(SUM(mc), 0), SUM(ms), MIN(mmin), MAX(mmax),
+                   COALESCE(SUM(dc), 0), SUM(ds), MIN(dmin), MAX(dmax)
+            FROM ({" UNION ALL ".join(parts)}) AS s(c, mc, ms, mmin, mmax, dc, ds, dmin, dmax)
+        """, params)
+        count, mag_count, mag_sum, mag_min, mag_max, depth_count, depth_sum, depth_min, depth_max = cursor.fetchone()
+
+    return {
+        "count": int(count),
+        "magnitude": {
+            "count": int(mag_count),
+            "average": mag_sum / mag_count if mag_count else None,
+            "minimum": float(mag_min) if mag_min is not None else None,
+            "maximum": float(mag_max) if mag_max is not None else None,
+        },
+        "depth": {
+            "count": int(depth_count),
+            "average": depth_sum / depth_count if depth_count else None,
+            "minimum": float(depth_min) if depth_min is not None else None,
+            "maximum": float(depth_max) if depth_max is not None else None,
+        },
+    }
+
+
+def histogram_width(bin_width: float) -> Decimal:
+    """히스토그램 구간 폭 검증 - 롤업 기본 구간(0.1)의 양의 배수만 허용"""
+    width = Decimal(str(bin_width))
+    if width <= 0 or width % HISTOGRAM_BASE_BIN != 0:
+        raise ValueError("bin_width는 0.1의 양의 배수여야 합니다")
+    return width
+
+
+def magnitude_histogram(conn, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                        bin_width: float = 0.5) -> List[Dict[str, Any]]:
+    """구간 내 규모 히스토그램 (bin_width 는 0.1의 배수)"""
+    width = histogram_width(bin_width)
+
+    params: list = []
+    parts = []
+    for segment in split_window(start, end):
+        # 조각별 params 순서: bin 폭 2개 -> 조각 조건
+        segment_params: list = [width, width]
+        parts.append(_segment_sql(
+            segment,
+            "floor(magnitude / %s) * %s AS bin, COUNT(*)",
+            "floor(magnitude_bin / %s) * %s AS bin, SUM(event_count)",
+            "earthquake_magnitude_histogram",
+            segment_params,
+            " AND magnitude IS NOT NULL GROUP BY 1" if segment[0] == "raw" else " GROUP BY 1",
+        ))
+        params.extend(segment_params)
+    if start is None and end is None:
+        parts.append("""
+            SELECT floor(magnitude / %s) * %s, COUNT(*) FROM earthquakes
+            WHERE time IS NULL AND magnitude IS NOT NULL GROUP BY 1
+        """)
+        params.extend([width, width])
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT bin, SUM(n)
+            FROM ({" UNION ALL ".join(parts)}) AS s(bin, n)
+            GROUP BY bin
+            ORDER BY bin
+        """, params)
+        return [
+            {"magnitude": float(bin_start), "count": int(count)}
+            for bin_start, count in cursor.fetchall()
+        ]
+
+
+register_ingest_db_hook(refresh_changed_buckets)
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# 백엔드 모듈은 backend/ 를 작업 디렉터리로 두고 평면 import 하므로 같은 경로를 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# DB 가 필요한 테스트는 DATABASE_URL 이 있을 때만 실행
+requires_db = pytest.mark.skipif(not DATABASE_URL, reason="DATABASE_URL 이 설정되지 않음")
+
+
+@pytest.fixture
+def db():
+    """마이그레이션을 적용한 풀 연결 (테스트 후 롤백)"""
+    from database import get_db
+    import migrations
+
+    with get_db() as conn:
+        migrations.migrate(conn)
+        try:
+            yield conn
+        finally:
+            conn.rollback()
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import partitions
+from conftest import requires_db
+from explain_search import PACIFIC_WKT, SEOUL, _cases, explain, plan_usage
+from models import SearchFilters
+from polygons import prepare_polygon
+from services import polygon_query, radius_query
+
+pytestmark = requires_db
+
+# polygon_query 는 DB 없이 쿼리만 만들므로 조합 이름은 미리 얻을 수 있음
+CASE_LABELS = [label for label, _, _ in _cases("")]
+
+
+@pytest.fixture
+def search_db(db):
+    """검색 조합 계획 확인용 연결 - 지난 1년 ~ 다음 달 월 파티션을 미리 만듦"""
+    now = partitions.month_start(datetime.now(timezone.utc))
+    partitions.ensure_range(db, partitions.add_months(now, -12), partitions.add_months(now, 2))
+    return db
+
+
+@pytest.fixture
+def pacific_hash(search_db):
+    return prepare_polygon(search_db, PACIFIC_WKT)
+
+
+def _is_partitioned(conn) -> bool:
+    with conn.cursor() as cursor:
+        kind = partitions.table_kind(cursor)
+    conn.rollback()
+    return kind == "partitioned"
+
+
+@pytest.mark.parametrize("label", CASE_LABELS)
+def test_search_uses_expected_index(search_db, pacific_hash, label):
+    _, (_, query, params), expected = next(case for case in _cases(pacific_hash) if case[0] == label)
+    # 테스트 DB 는 데이터가 적어 순차 스캔이 더 싸므로 인덱스 사용 가능 여부만 확인
+    usage = plan_usage(search_db, explain(search_db, query, params, no_seqscan=True))
+    assert usage.indexes & expected, f"{label}: {sorted(usage.indexes)} / 기대 {sorted(expected)}"
+    assert not usage.seq_scan
+
+
+def _allowed_partitions(start: datetime, end: datetime) -> set:
+    return {partitions.partition_name(month) for month in partitions._months(start, end)} | {
+        partitions.DEFAULT_PARTITION
+    }
+
+
+@pytest.mark.parametrize("build", [
+    lambda filters, polygon_hash: radius_query(*SEOUL, 500, filters),
+    lambda filters, polygon_hash: polygon_query(polygon_hash, filters),
+], ids=["radius", "region"])
+def test_time_filter_prunes_partitions(search_db, pacific_hash, build):
+    if not _is_partitioned(search_db):
+        pytest.skip("earthquakes 가 파티션 테이블이 아님")
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=7)
+    _, query, params = build(SearchFilters(start_time=start, end_time=end), pacific_hash)
+
+    usage = plan_usage(search_db, explain(search_db, query, params, no_seqscan=True))
+    assert usage.relations
+    assert usage.relations <= _allowed_partitions(start, end)
+    assert partitions.partition_name(partitions.add_months(partitions.month_start(end), -6)) not in usage.relations
+
+
+def test_unfiltered_search_scans_all_partitions(search_db):
+    if not _is_partitioned(search_db):
+        pytest.skip("earthquakes 가 파티션 테이블이 아님")
+    _, query, params = radius_query(*SEOUL, 500, None)
+    usage = plan_usage(search_db, explain(search_db, query, params, no_seqscan=True))
+    old_month = partitions.partition_name(partitions.add_months(partitions.month_start(datetime.now(timezone.utc)), -6))
+    assert old_month in usage.relations
@@ -0,0 +1,41 @@
+import json
+import logging
+import queue
+import sys
+
+from logging_config import JSONFormatter, RecordQueueHandler, TextFormatter
+
+
+def _queued_record(message: str, *args, **extra) -> logging.LogRecord:
+    """RecordQueueHandler 를 거쳐 리스너가 받는 레코드"""
+    records: queue.Queue = queue.Queue()
+    handler = RecordQueueHandler(records)
+    logger = logging.getLogger("tests.logging_config")
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = logger.makeRecord(logger.name, logging.ERROR, __file__, 1, message, args,
+                                   exc_info=sys.exc_info(), extra=extra)
+    handler.handle(record)
+    return records.get_nowait()
+
+
+def test_json_formatter_keeps_exception_field_through_queue():
+    payload = json.loads(JSONFormatter().format(_queued_record("적재 실패: %s", "x", window="w1")))
+    assert payload["message"] == "적재 실패: x"
+    assert "Traceback" not in payload["message"]
+    assert "ValueError: boom" in payload["exception"]
+    assert payload["window"] == "w1"
+    assert payload["level"] == "ERROR"
+
+
+def test_queued_record_message_is_resolved_in_caller():
+    record = _queued_record("%s + %s", 1, 2)
+    assert record.getMessage() == "1 + 2"
+    assert record.args is None
+
+
+def test_text_formatter_appends_traceback_once():
+    text = TextFormatter().format(_queued_record("실패", job="j1"))
+    assert text.count("ValueError: boom") == 1
+    assert "job=j1" in text
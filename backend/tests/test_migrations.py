@@ -0,0 +1,82 @@
+import hashlib
+
+import pytest
+
+import migrations
+import partitions
+import services
+from migrations import MIGRATIONS
+
+# 배포된 버전의 SQL 해시 - 이 값이 바뀌면 이미 적용된 버전을 고친 것이므로 새 버전을 추가해야 함
+APPLIED_SQL_SHA256 = {
+    "1:None": "8a4b163979e4cda3dcd8623ce93f8c7f5499bb697a71dc009afc151b3eb30b93",
+    "1:p": "7b6b7a5e5e3ff9920f65297cb1876e9a12058e240b51c738b885d4e6c1e13e12",
+    "1:r": "64ca108fa4c33227528616d504edc28055582b8bf1e0ff930971a2bdc81e195b",
+    "2": "ec9d7a092336cf279c19731fd984dd42fb43fb2c51cfeebc1a925a8d3f257e43",
+    "3": "e3acd9103fa05d1434e1484ca9816e1bc2e5df692e1f30491906dfe43cd204ac",
+    "4": "6d835220701f2de138b319c3184bbb36986da476df17bd129f3ce194ca88eab7",
+    "5": "4505fd9b3f3a43ece4024ac3c74cf924d5a6c2f4dacf62cf0ae6ea999c062869",
+    "6": "7b55f3ee84da5b422e85c73169baa18dffd232affd0678486a6eec7a6ec7b100",
+    "7": "3c19da187671260afa749230f6e20c103e6cb6d253d983b4fccf6a0b0cf84cb0",
+}
+
+
+class RecordingCursor:
+    """실행한 SQL 을 기록하는 커서 (table_kind 조회에는 relkind 로 응답)"""
+
+    def __init__(self, relkind=None):
+        self.relkind = relkind
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        if "FROM pg_class" not in sql:
+            self.statements.append(sql)
+
+    def fetchone(self):
+        return None if self.relkind is None else (self.relkind,)
+
+
+def _sql_digest(migration: migrations.Migration, relkind=None) -> str:
+    cursor = RecordingCursor(relkind)
+    migration.apply(cursor)
+    return hashlib.sha256("\n".join(cursor.statements).encode()).hexdigest()
+
+
+def _digests() -> dict:
+    digests = {}
+    for migration in MIGRATIONS:
+        if migration.version == 1:
+            for relkind in (None, "p", "r"):
+                digests[f"1:{relkind}"] = _sql_digest(migration, relkind)
+        else:
+            digests[str(migration.version)] = _sql_digest(migration)
+    return digests
+
+
+def test_versions_are_unique_and_increasing():
+    versions = [migration.version for migration in MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert migrations.LATEST_VERSION == versions[-1]
+
+
+@pytest.mark.parametrize("key", sorted(APPLIED_SQL_SHA256))
+def test_applied_migration_sql_is_frozen(key):
+    assert _digests()[key] == APPLIED_SQL_SHA256[key]
+
+
+def test_migration_1_ignores_live_module_constants(monkeypatch):
+    before = _digests()
+    monkeypatch.setattr(partitions, "EARTHQUAKES_DDL", "SELECT 1")
+    monkeypatch.setattr(partitions, "EARTHQUAKE_INDEX_DDL", ("SELECT 2",))
+    monkeypatch.setattr(services, "SEARCH_INDEX_DDL", ("SELECT 3",))
+    assert _digests() == before
+
+
+def test_current_index_definitions_match_migrations():
+    """현재 인덱스 정의(단일 테이블 이전용)가 마이그레이션으로 만든 인덱스와 어긋나지 않는지"""
+    cursor = RecordingCursor(None)
+    for migration in MIGRATIONS:
+        migration.apply(cursor)
+    migrated = " ".join(" ".join(statement.split()) for statement in cursor.statements)
+    for statement in partitions.EARTHQUAKE_INDEX_DDL + services.SEARCH_INDEX_DDL:
+        assert " ".join(statement.split()) in migrated
@@ -0,0 +1,70 @@
+import pytest
+
+import polygons
+from conftest import requires_db
+from polygons import polygon_hash, prepare_polygon
+
+# 프론트엔드처럼 꼭짓점 몇 개로 넓은 영역을 그린 다각형 (긴 변은 대원과 평면 직선이 크게 벌어짐)
+WIDE_WKTS = [
+    "POLYGON((100 50, 160 50, 160 20, 100 20, 100 50))",
+    "POLYGON((-150 60, -60 60, -60 10, -150 10, -150 60))",
+    # 날짜변경선을 지나는 다각형
+    "POLYGON((160 -10, -160 -10, -160 -50, 160 -50, 160 -10))",
+]
+
+# 격자 점마다 준비 조각 판정과 geography ST_Covers 판정이 다른 점 수
+# (경계에서 5km 이내의 점은 단순화 허용 오차 범위이므로 제외)
+_MISMATCH_SQL = """
+    WITH g AS (SELECT ST_GeogFromText(%s) AS geog),
+    pts AS (
+        SELECT ST_SetSRID(ST_MakePoint(lon, lat), 4326) AS geom
+        FROM generate_series(-179.75, 179.75, 1) lon, generate_series(-79.75, 79.75, 1) lat
+    )
+    SELECT count(*)
+    FROM pts, g
+    WHERE ST_Covers(g.geog, pts.geom::geography) IS DISTINCT FROM EXISTS (
+              SELECT 1 FROM search_polygon_pieces p
+              WHERE p.polygon_hash = %s AND ST_Covers(p.geom, pts.geom)
+          )
+      AND ST_Distance(ST_ExteriorRing(g.geog::geometry)::geography, pts.geom::geography) > 5000
+"""
+
+
+@requires_db
+@pytest.mark.parametrize("wkt", WIDE_WKTS)
+def test_prepared_pieces_follow_great_circle_edges(db, wkt):
+    key = prepare_polygon(db, wkt)
+    with db.cursor() as cursor:
+        cursor.execute(_MISMATCH_SQL, (wkt, key))
+        assert cursor.fetchone()[0] == 0
+
+
+@requires_db
+def test_planar_edge_differs_from_great_circle(db):
+    """세분화 없이 평면 직선으로 잇는 경우 결과가 달라지는 점이 실제로 있는지 (위 테스트의 대조군)"""
+    wkt = WIDE_WKTS[0]
+    with db.cursor() as cursor:
+        # 50N 변의 중간(130E): 대원은 북쪽으로 휘어 50N 보다 위를 지나므로 52N 은 geography 로는 안쪽
+        cursor.execute("""
+            SELECT ST_Covers(ST_GeogFromText(%s), ST_GeogFromText('POINT(130 52)')),
+                   ST_Covers(ST_GeomFromText(%s, 4326), ST_GeomFromText('POINT(130 52)', 4326))
+        """, (wkt, wkt))
+        geodesic, planar = cursor.fetchone()
+    assert geodesic and not planar
+
+    key = prepare_polygon(db, wkt)
+    with db.cursor() as cursor:
+        cursor.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM search_polygon_pieces
+                WHERE polygon_hash = %s AND ST_Covers(geom, ST_GeomFromText('POINT(130 52)', 4326))
+            )
+        """, (key,))
+        assert cursor.fetchone()[0]
+
+
+def test_polygon_hash_depends_on_preparation_settings(monkeypatch):
+    wkt = WIDE_WKTS[0]
+    before = polygon_hash(wkt)
+    monkeypatch.setattr(polygons, "POLYGON_SEGMENT_LENGTH_KM", 10.0)
+    assert polygon_hash(wkt) != before
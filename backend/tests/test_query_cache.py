@@ -0,0 +1,46 @@
+import query_cache
+from query_cache import QueryCache, canonical_wkt
+
+
+def test_put_and_get_in_current_generation():
+    cache = QueryCache(8)
+    cache.put(("radius", 1), [("a",)], cache.generation)
+    assert cache.get(("radius", 1)) == [("a",)]
+
+
+def test_bump_discards_previous_generation():
+    cache = QueryCache(8)
+    generation = cache.generation
+    cache.put(("radius", 1), [("a",)], generation)
+    cache.bump()
+    assert cache.get(("radius", 1)) is None
+    # bump 이전 세대에서 시작한 조회 결과는 저장되지 않음
+    cache.put(("radius", 1), [("b",)], generation)
+    assert cache.get(("radius", 1)) is None
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = QueryCache(8, ttl_seconds=60)
+    cache.put(("radius", 1), [("a",)], cache.generation)
+    now[0] += 59
+    assert cache.get(("radius", 1)) == [("a",)]
+    now[0] += 1
+    assert cache.get(("radius", 1)) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_zero_ttl_never_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = QueryCache(8, ttl_seconds=0)
+    cache.put(("radius", 1), [("a",)], cache.generation)
+    now[0] += 10 ** 9
+    assert cache.get(("radius", 1)) == [("a",)]
+
+
+def test_canonical_wkt_normalizes_spacing_case_and_numbers():
+    assert canonical_wkt("polygon((0 0,  1.000000 0, 1 1 ,0 0))") == canonical_wkt("POLYGON ((0 0, 1 0, 1 1, 0 0))")
+    assert canonical_wkt("POLYGON((-0.000001 0, 1 0, 1 1, -0.000001 0))").startswith("POLYGON ((0 0,")
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from models import SearchFilters
+from services import (
+    SIGNIFICANT_MAGNITUDE, build_search_filters, polygon_query, radius_query, rows_to_json, rows_to_models,
+    search_filter_key,
+)
+
+KST = timezone(timedelta(hours=9))
+
+# EARTHQUAKE_COLUMNS 행 (distance_km 없음) 과 반경 검색 행 (distance_km 포함)
+ROWS = [
+    ("us1", 4.5, "10 km N of Somewhere", datetime(2024, 1, 1, tzinfo=timezone.utc), 10.0, 35.5, 139.25,
+     "https://earthquake.usgs.gov/earthquakes/eventpage/us1"),
+    ("us2", None, None, datetime(2024, 2, 29, 23, 59, 59, 999999, tzinfo=timezone.utc), None, -89.9, 179.999, None),
+    ("us3", 0.1, "경계", datetime(2024, 3, 1, 9, 0, 0, 500, tzinfo=KST), 0.0, 0.0, -180.0, None),
+]
+RADIUS_ROWS = [row + (distance,) for row, distance in zip(ROWS, (0.0, 12.345, None))]
+
+
+def _model_output(rows):
+    return jsonable_encoder(rows_to_models(rows))
+
+
+def test_rows_to_json_matches_model_path():
+    assert orjson.loads(rows_to_json(ROWS)) == _model_output(ROWS)
+
+
+def test_rows_to_json_matches_model_path_with_distance():
+    assert orjson.loads(rows_to_json(RADIUS_ROWS)) == _model_output(RADIUS_ROWS)
+
+
+def test_rows_to_json_keeps_field_order():
+    document = orjson.loads(rows_to_json(RADIUS_ROWS[:1]))[0]
+    assert list(document) == list(_model_output(RADIUS_ROWS[:1])[0])
+
+
+def test_rows_to_json_utc_suffix():
+    document = orjson.loads(rows_to_json(ROWS[:1]))[0]
+    assert document["time"] == "2024-01-01T00:00:00Z"
+
+
+def test_rows_to_json_empty():
+    assert rows_to_json([]) == b"[]"
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+
+def test_build_search_filters_without_filters():
+    assert build_search_filters(None) == ("", [], "")
+    assert build_search_filters(SearchFilters()) == ("", [], "")
+
+
+def test_build_search_filters_in_fixed_order():
+    filters = SearchFilters(max_depth=70, min_depth=0, max_magnitude=6, min_magnitude=2, end_time=END,
+                            start_time=START)
+    conditions, params, suffix = build_search_filters(filters)
+    assert conditions == (
+        " AND time >= %s::timestamptz AND time < %s::timestamptz"
+        " AND magnitude >= %s::numeric AND magnitude <= %s::numeric"
+        " AND depth >= %s::numeric AND depth <= %s::numeric"
+    )
+    assert params == [START, END, 2, 6, 0, 70]
+    assert suffix == "_t0_t1_m0_m1_d0_d1"
+
+
+def test_build_search_filters_ids_as_one_array_param():
+    conditions, params, suffix = build_search_filters(SimpleNamespace(ids=["a", "b", "c"]))
+    assert conditions == " AND id = ANY(%s::varchar[])"
+    assert params == [["a", "b", "c"]]
+    assert suffix == "_ids"
+
+
+@pytest.mark.parametrize("min_magnitude", [SIGNIFICANT_MAGNITUDE, 5.0, 9.5])
+def test_significant_magnitude_adds_partial_index_predicate(min_magnitude):
+    conditions, params, suffix = build_search_filters(SearchFilters(min_magnitude=min_magnitude))
+    # 부분 인덱스 조건과 글자 그대로 같은 상수 조건 (파라미터가 아님)
+    assert conditions == " AND magnitude >= %s::numeric AND magnitude >= 4.5"
+    assert params == [min_magnitude]
+    assert suffix == "_m0_sig"
+
+
+@pytest.mark.parametrize("min_magnitude", [0.0, 4.4, 4.49])
+def test_small_magnitude_has_no_partial_index_predicate(min_magnitude):
+    conditions, _, suffix = build_search_filters(SearchFilters(min_magnitude=min_magnitude))
+    assert "magnitude >= 4.5" not in conditions
+    assert suffix == "_m0"
+
+
+def test_statement_names_per_filter_combination():
+    assert radius_query(0, 0, 10)[0] == "eq_radius"
+    assert radius_query(0, 0, 10, SearchFilters(start_time=START, limit=5))[0] == "eq_radius_t0_lim"
+    assert radius_query(0, 0, 10, SearchFilters(min_magnitude=5, max_depth=70, limit=5))[0] == "eq_radius_m0_d1_sig_lim"
+    assert polygon_query("h")[0] == "eq_polygon"
+    assert polygon_query("h", SearchFilters(end_time=END, min_magnitude=1))[0] == "eq_polygon_t1_m0"
+
+
+def test_statement_params_follow_placeholders():
+    _, query, params = radius_query(1.5, 2.5, 10, SearchFilters(start_time=START, min_magnitude=5, limit=5))
+    assert query.count("%s") == len(params)
+    assert params == (2.5, 1.5, 2.5, 1.5, 10, START, 5, 5)
+
+
+def test_search_filter_key_distinguishes_limit():
+    assert search_filter_key(SearchFilters(limit=5)) != search_filter_key(SearchFilters(limit=6))
+    assert search_filter_key(None) == search_filter_key(SearchFilters())
@@ -0,0 +1,277 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pytest
+
+from conftest import requires_db
+from ingest import ChangedEvent
+from models import RadiusSearchRequest
+from snapshot import EventSnapshot, HotSnapshot, haversine_m, round_km, to_us, vincenty_m
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+WINDOW_START = NOW - timedelta(days=30)
+
+
+def _row(earthquake_id, time, lat=10.0, lon=20.0, magnitude=3.0, depth=10.0, place="p", url="u"):
+    """EARTHQUAKE_COLUMNS 순서의 행"""
+    return (earthquake_id, magnitude, place, time, depth, lat, lon, url)
+
+
+def _snapshot(rows, grid_deg=1.0):
+    snapshot = EventSnapshot.from_rows(to_us(WINDOW_START), rows)
+    if grid_deg != snapshot.grid_deg:
+        snapshot._build_grid(grid_deg)
+    return snapshot
+
+
+def _event(earthquake_id, time, lat=10.0, lon=20.0, magnitude="3.5", inserted=True):
+    return ChangedEvent(earthquake_id, inserted, Decimal(magnitude), "new place", time, Decimal("5.0"),
+                        lat, lon, "new url", None, None, None)
+
+
+# ---------------------------------------------------------------------------
+# 거리
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("start, end, meters", [
+    # Vincenty(1975) 예제: Flinders Peak -> Buninyong
+    ((-37.95103341666667, 144.42486788888888), (-37.65282113888889, 143.92649552777777), 54972.271),
+    # 적도 경도 1도 = a * pi / 180
+    ((0.0, 0.0), (0.0, 1.0), 111319.491),
+    # 적도 -> 극 (자오선 사분호)
+    ((0.0, 0.0), (90.0, 0.0), 10001965.729),
+    # 날짜변경선을 사이에 둔 두 점
+    ((0.0, 179.5), (0.0, -179.5), 111319.491),
+    ((10.0, 20.0), (10.0, 20.0), 0.0),
+])
+def test_vincenty_matches_known_geodesic_distances(start, end, meters):
+    distance, converged = vincenty_m(start[0], start[1], np.array([end[0]]), np.array([end[1]]))
+    assert converged[0]
+    assert distance[0] == pytest.approx(meters, abs=1e-3)
+
+
+def test_vincenty_reports_near_antipodal_points_as_not_converged():
+    distance, converged = vincenty_m(0.0, 0.0, np.array([0.0, 0.2, 0.5, 10.0]), np.array([180.0, 179.8, 179.5, 20.0]))
+    assert converged.tolist() == [False, False, True, True]
+
+
+def test_radius_search_falls_back_near_antipode():
+    checker = HotSnapshot(enabled=True)
+    checker._current = _snapshot([_row("far", NOW, lat=0.0, lon=179.9), _row("near", NOW, lat=0.0, lon=0.1)])
+    request = RadiusSearchRequest(latitude=0, longitude=0, radius_km=20000, start_time=WINDOW_START)
+    assert checker.radius_rows(0.0, 0.0, 20000, request) is None
+    # 대척점 근처 후보가 없으면 스냅샷이 응답
+    request = RadiusSearchRequest(latitude=0, longitude=0, radius_km=100, start_time=WINDOW_START)
+    assert [row[0] for row in checker.radius_rows(0.0, 0.0, 100, request)] == ["near"]
+
+
+# ---------------------------------------------------------------------------
+# ROUND((m / 1000)::numeric, 2)
+# ---------------------------------------------------------------------------
+
+def _numeric_round(meters: float) -> float:
+    """PostgreSQL: float8 -> numeric 은 유효숫자 15자리, ROUND 는 0.5 에서 0 반대쪽으로"""
+    return float(Decimal(f"{meters / 1000:.15g}").quantize(Decimal("0.01"), rounding=ROUND_HALF_UP))
+
+
+@pytest.mark.parametrize("meters", [1005.0, 2675.0, 1015.0, 5.0, 15.0, 125.0, 999995.0, 0.0, 4.999, 1234567.891])
+def test_round_km_ties_match_numeric_round(meters):
+    assert round_km(np.array([meters]))[0] == _numeric_round(meters)
+
+
+def test_round_km_matches_numeric_round_on_random_values():
+    rng = random.Random(0)
+    values = [rng.uniform(0, 2e7) for _ in range(5000)]
+    # .5 경계에 걸친 값 (10m 단위의 정확한 5 배수)
+    values += [rng.randrange(0, 2_000_000) * 10 + 5.0 for _ in range(1000)]
+    got = round_km(np.array(values))
+    assert got.tolist() == [_numeric_round(value) for value in values]
+
+
+# ---------------------------------------------------------------------------
+# 스냅샷 패치 / 자르기 / 시간 구간
+# ---------------------------------------------------------------------------
+
+def test_patched_inserts_updates_and_drops_rows():
+    snapshot = _snapshot([
+        _row("a", NOW - timedelta(days=1)),
+        _row("b", NOW - timedelta(days=2)),
+        _row("c", NOW - timedelta(days=3)),
+    ])
+    patched = snapshot.patched([
+        _event("d", NOW - timedelta(hours=1)),
+        # 갱신: 시각과 위치가 바뀜
+        _event("b", NOW - timedelta(days=5), lat=-40.0, lon=-170.0, inserted=False),
+        # 창 밖으로 옮겨진 행은 빠짐
+        _event("c", WINDOW_START - timedelta(days=1), inserted=False),
+    ])
+    assert [patched.ids.get(i) for i in range(len(patched))] == ["d", "a", "b"]
+    assert np.all(np.diff(patched.time_us) <= 0)
+    d, _, b = patched.rows(np.arange(len(patched)))
+    assert d[1] == 3.5 and d[2] == "new place" and d[4] == 5.0
+    assert (b[5], b[6]) == (-40.0, -170.0)
+    # 격자 색인도 새 위치로 갱신됨
+    assert 2 in patched.grid_candidates(-40.0, -170.0, 10_000).tolist()
+    # 원래 스냅샷은 그대로
+    assert len(snapshot) == 3 and snapshot.ids.get(1) == "b"
+
+
+def test_patched_without_changes_returns_same_snapshot():
+    snapshot = _snapshot([_row("a", NOW)])
+    assert snapshot.patched([]) is snapshot
+    assert snapshot.patched([_event("x", WINDOW_START - timedelta(seconds=1))]) is snapshot
+
+
+def test_trimmed_drops_rows_before_cutoff():
+    snapshot = _snapshot([_row("a", NOW - timedelta(days=1)), _row("b", NOW - timedelta(days=20))])
+    cutoff = NOW - timedelta(days=10)
+    trimmed = snapshot.trimmed(cutoff)
+    assert [trimmed.ids.get(i) for i in range(len(trimmed))] == ["a"]
+    assert trimmed.window_start_us == to_us(cutoff)
+    assert not trimmed.covers(cutoff - timedelta(seconds=1))
+    assert snapshot.trimmed(WINDOW_START) is snapshot
+
+
+def test_time_slice_is_start_inclusive_end_exclusive():
+    times = [NOW - timedelta(hours=hours) for hours in (1, 2, 2, 3, 5)]
+    snapshot = _snapshot([_row(str(i), time) for i, time in enumerate(times)])
+
+    def ids(start, end):
+        window = snapshot.time_slice(start, end)
+        return sorted(snapshot.ids.get(i) for i in range(window.start, window.stop))
+
+    assert ids(None, None) == ["0", "1", "2", "3", "4"]
+    assert ids(NOW - timedelta(hours=2), None) == ["0", "1", "2"]
+    assert ids(None, NOW - timedelta(hours=2)) == ["3", "4"]
+    assert ids(NOW - timedelta(hours=3), NOW - timedelta(hours=1)) == ["1", "2", "3"]
+    assert ids(NOW - timedelta(hours=1), NOW - timedelta(hours=3)) == []
+
+
+# ---------------------------------------------------------------------------
+# 격자 후보
+# ---------------------------------------------------------------------------
+
+def _assert_candidates_cover(snapshot, lat, lon, radius_m):
+    candidates = set(snapshot.grid_candidates(lat, lon, radius_m).tolist())
+    distances = haversine_m(lat, lon, snapshot.latitude, snapshot.longitude)
+    inside = set(np.flatnonzero(distances <= radius_m).tolist())
+    assert inside <= candidates
+
+
+@pytest.mark.parametrize("grid_deg", [1.0, 5.0])
+def test_grid_candidates_at_poles(grid_deg):
+    rows = [_row(f"n{lon}", NOW, lat=89.9, lon=lon) for lon in range(-180, 180, 15)]
+    rows += [_row(f"s{lon}", NOW, lat=-89.5, lon=lon) for lon in range(-180, 180, 15)]
+    snapshot = _snapshot(rows, grid_deg)
+    candidates = set(snapshot.grid_candidates(89.0, 0.0, 300_000).tolist())
+    # 북극 주변 점은 경도와 관계없이 모두 후보
+    assert {i for i in range(len(rows)) if snapshot.latitude[i] > 0} <= candidates
+    _assert_candidates_cover(snapshot, 89.0, 0.0, 300_000)
+    _assert_candidates_cover(snapshot, -90.0, 0.0, 100_000)
+
+
+@pytest.mark.parametrize("grid_deg", [1.0, 5.0])
+def test_grid_candidates_across_antimeridian(grid_deg):
+    rows = [_row("east", NOW, lat=0.0, lon=179.95), _row("west", NOW, lat=0.0, lon=-179.95),
+            _row("far", NOW, lat=0.0, lon=170.0)]
+    snapshot = _snapshot(rows, grid_deg)
+    for lon in (179.9, -179.9, 180.0, -180.0):
+        candidates = snapshot.grid_candidates(0.0, lon, 50_000).tolist()
+        assert {0, 1} <= set(candidates)
+
+
+@pytest.mark.parametrize("grid_deg", [1.0, 7.0])
+def test_grid_candidates_have_no_duplicates_near_full_circle(grid_deg):
+    rows = [_row(str(lon), NOW, lat=60.0, lon=lon) for lon in np.arange(-179.5, 180, 0.5)]
+    snapshot = _snapshot(rows, grid_deg)
+    # 고위도에서 경도 폭이 360도에 가까운 반경
+    for lon in (-170.0, 0.0, 170.0):
+        candidates = snapshot.grid_candidates(60.0, lon, 3_300_000).tolist()
+        assert len(candidates) == len(set(candidates))
+
+
+def test_grid_candidates_cover_all_points_in_radius():
+    rng = random.Random(1)
+    rows = [_row(str(i), NOW, lat=rng.uniform(-90, 90), lon=rng.uniform(-180, 180)) for i in range(3000)]
+    for grid_deg in (0.5, 1.0, 7.0):
+        snapshot = _snapshot(rows, grid_deg)
+        for _ in range(50):
+            _assert_candidates_cover(snapshot, rng.uniform(-90, 90), rng.uniform(-180, 180),
+                                     rng.choice([1e4, 1e5, 1e6, 5e6]))
+
+
+# ---------------------------------------------------------------------------
+# PostGIS 비교 (DB)
+# ---------------------------------------------------------------------------
+
+@pytest.fixture
+def synthetic_events(db):
+    """최근 하루 안의 합성 이벤트 (날짜변경선/극 근처 포함) - 테스트 트랜잭션 안에서만 존재"""
+    rng = random.Random(2)
+    now = datetime.now(timezone.utc)
+    points = [(rng.uniform(-85, 85), rng.uniform(-180, 180)) for _ in range(1500)]
+    points += [(rng.uniform(-5, 5), rng.choice([-1, 1]) * rng.uniform(179, 180)) for _ in range(200)]
+    points += [(rng.choice([-1, 1]) * rng.uniform(88, 90), rng.uniform(-180, 180)) for _ in range(100)]
+    with db.cursor() as cursor:
+        for index, (lat, lon) in enumerate(points):
+            cursor.execute("""
+                INSERT INTO earthquakes (id, magnitude, place, time, depth, location, url)
+                VALUES (%s, %s, %s, %s, %s, ST_Point(%s, %s)::geography, %s)
+            """, (f"snaptest{index}", round(rng.uniform(0, 7), 2), f"place {index}",
+                  now - timedelta(seconds=rng.uniform(0, 86400)), round(rng.uniform(0, 600), 2), lon, lat, None))
+    return now - timedelta(days=1), points
+
+
+@requires_db
+def test_snapshot_radius_matches_radius_query(db, synthetic_events):
+    from services import EARTHQUAKE_COLUMNS, radius_query
+
+    window_start, points = synthetic_events
+    with db.cursor() as cursor:
+        cursor.execute(f"SELECT {EARTHQUAKE_COLUMNS} FROM earthquakes WHERE time >= %s ORDER BY time DESC",
+                       (window_start,))
+        checker = HotSnapshot(enabled=True)
+        checker._current = EventSnapshot.from_rows(to_us(window_start), cursor.fetchall())
+
+    rng = random.Random(3)
+    compared = 0
+    for _ in range(60):
+        lat, lon = rng.choice(points)
+        request = RadiusSearchRequest(
+            latitude=max(-90.0, min(90.0, lat + rng.uniform(-1, 1))),
+            longitude=lon + rng.uniform(-1, 1),
+            radius_km=rng.choice([10, 100, 500, 2000]),
+            start_time=window_start + timedelta(hours=rng.uniform(0, 12)),
+            min_magnitude=rng.choice([None, 2.0]),
+        )
+        rows = checker.radius_rows(request.latitude, request.longitude, request.radius_km, request)
+        if rows is None:
+            continue
+        _, query, params = radius_query(request.latitude, request.longitude, request.radius_km, request)
+        with db.cursor() as cursor:
+            cursor.execute(query, params)
+            expected = cursor.fetchall()
+        compared += 1
+        got = {row[0]: row[8] for row in rows}
+        want = {row[0]: row[8] for row in expected}
+        assert got.keys() == want.keys()
+        # Vincenty 와 GeographicLib 은 0.1mm 수준으로 달라 반올림 경계(0.005km)에서만 한 자리 차이가 날 수 있음
+        assert all(abs(got[key] - want[key]) <= 0.0100001 for key in got)
+        assert [row[8] for row in rows] == sorted(row[8] for row in rows)
+    assert compared > 0
+
+
+@requires_db
+def test_round_km_matches_postgres_round(db):
+    rng = random.Random(4)
+    values = [rng.uniform(0, 2e7) for _ in range(2000)] + [rng.randrange(0, 2_000_000) * 10 + 5.0 for _ in range(500)]
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT ROUND((m / 1000)::numeric, 2)::float8 FROM unnest(%s::float8[]) WITH ORDINALITY AS t(m, n) ORDER BY n",
+            (values,),
+        )
+        expected = [row[0] for row in cursor.fetchall()]
+    assert round_km(np.array(values)).tolist() == expected
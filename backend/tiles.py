@@ -0,0 +1,153 @@
+import logging
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Iterable, Optional, Set, Tuple
+
+from cache import LRUCache
+from ingest import IngestResult, register_ingest_listener
+
+logger = logging.getLogger(__name__)
+
+# 벡터 타일 설정
+TILE_CACHE_SIZE = int(os.getenv("TILE_CACHE_SIZE", "2048"))
+MAX_TILE_ZOOM = int(os.getenv("MAX_TILE_ZOOM", "16"))
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_LAYER = "earthquakes"
+
+# 타일 경계 근처 점은 버퍼 때문에 이웃 타일에도 그려지므로 무효화 범위도 그만큼 넓힘
+_BUFFER_FRACTION = TILE_BUFFER / TILE_EXTENT
+
+TileKey = Tuple[int, int, int, Optional[float], Optional[str], Optional[str]]
+
+
+
+class TileCache(LRUCache):
+    """무효화 세대를 함께 세는 타일 캐시
+
+    렌더링은 작업 스레드에서 DB를 읽은 뒤 put 하므로, 그사이 적재 리스너가 무효화하면 읽은 타일은
+    이미 낡았다. 렌더 전에 읽은 세대가 put 시점과 다르면 저장하지 않는다.
+    """
+
+    def __init__(self, max_entries: int):
+        super().__init__(max_entries)
+        self._generation = 0
+        # 세대 확인과 저장을 한 번에 - 무효화는 세대를 올린 뒤 키를 읽으므로 그 전에 들어간 항목은 지워짐
+        self._generation_lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def bump(self) -> None:
+        with self._generation_lock:
+            self._generation += 1
+
+    def put(self, key: TileKey, value: bytes, generation: Optional[int] = None) -> None:
+        with self._generation_lock:
+            if generation is not None and generation != self._generation:
+                return
+            super().put(key, value)
+
+    def clear(self) -> None:
+        self.bump()
+        super().clear()
+
+
+tile_cache = TileCache(TILE_CACHE_SIZE)
+
+
+def tile_key(z: int, x: int, y: int, min_magnitude: Optional[float] = None,
+             start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> TileKey:
+    """타일 좌표 + 필터로 캐시 키 생성"""
+    return (
+        z, x, y,
+        min_magnitude,
+        start_time.isoformat() if start_time else None,
+        end_time.isoformat() if end_time else None,
+    )
+
+
+def render_tile(conn, z: int, x: int, y: int, min_magnitude: Optional[float] = None,
+                start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> bytes:
+    """ST_AsMVT로 z/x/y 타일 생성"""
+    conditions = []
+    params = [z, x, y, _BUFFER_FRACTION, z, x, y, TILE_EXTENT, TILE_BUFFER]
+
+    if min_magnitude is not None:
+        conditions.append("e.magnitude >= %s")
+        params.append(min_magnitude)
+    if start_time is not None:
+        conditions.append("e.time >= %s")
+        params.append(start_time)
+    if end_time is not None:
+        conditions.append("e.time < %s")
+        params.append(end_time)
+
+    where = "".join(f" AND {condition}" for condition in conditions)
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            WITH bounds AS (
+                SELECT ST_Transform(ST_TileEnvelope(%s, %s, %s, margin => %s), 4326) AS search_geom,
+                       ST_TileEnvelope(%s, %s, %s) AS tile_geom
+            ),
+            mvtgeom AS (
+                SELECT
+                    ST_AsMVTGeom(ST_Transform(e.location::geometry, 3857), bounds.tile_geom, %s, %s, true) AS geom,
+                    e.id,
+                    e.magnitude::float8 AS magnitude,
+                    e.depth::float8 AS depth,
+                    (EXTRACT(EPOCH FROM e.time) * 1000)::bigint AS time,
+                    e.place
+                FROM earthquakes e, bounds
+                WHERE e.location::geometry && bounds.search_geom{where}
+            )
+            SELECT ST_AsMVT(mvtgeom.*, '{TILE_LAYER}', {TILE_EXTENT}, 'geom') FROM mvtgeom
+        """, params)
+        row = cursor.fetchone()
+        return bytes(row[0]) if row and row[0] is not None else b""
+
+
+def _tiles_for_point(lon: float, lat: float, z: int) -> Iterable[Tuple[int, int]]:
+    """경위도 점(과 버퍼 여백)이 그려지는 z 레벨 타일 좌표"""
+    n = 2 ** z
+    lat = max(min(lat, 85.0511), -85.0511)
+    fx = (lon + 180.0) / 360.0 * n
+    fy = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    for tx in range(math.floor(fx - _BUFFER_FRACTION), math.floor(fx + _BUFFER_FRACTION) + 1):
+        for ty in range(math.floor(fy - _BUFFER_FRACTION), math.floor(fy + _BUFFER_FRACTION) + 1):
+            if 0 <= ty < n:
+                yield tx % n, ty
+
+
+def invalidate_changed_tiles(result: IngestResult) -> None:
+    """새로 들어오거나 바뀐 이벤트가 걸치는 타일만 캐시에서 제거"""
+    # 캐시가 비어 있어도 세대는 올려, 지금 렌더링 중인 타일이 커밋 전 데이터로 저장되지 않게 함
+    tile_cache.bump()
+    keys = tile_cache.keys()
+    if not keys:
+        return
+
+    zooms = {key[0] for key in keys}
+    affected: Set[Tuple[int, int, int]] = set()
+    for event in result.changed:
+        positions = [(event.longitude, event.latitude)]
+        if event.prev_longitude is not None and event.prev_latitude is not None:
+            positions.append((event.prev_longitude, event.prev_latitude))
+        for lon, lat in positions:
+            for z in zooms:
+                affected.update((z, tx, ty) for tx, ty in _tiles_for_point(lon, lat, z))
+
+    removed = 0
+    for key in keys:
+        if key[:3] in affected:
+            tile_cache.pop(key)
+            removed += 1
+    if removed:
+        logger.debug("타일 캐시 무효화", extra={"removed": removed})
+
+
+register_ingest_listener(invalidate_changed_tiles)
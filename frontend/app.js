@@ -6,6 +6,11 @@ let isPolygonMode = false;
 let polygonPoints = [];
 let polygonPointMarkers = []; // 다각형 점 마커들
 let searchMarkers = []; // 검색 관련 마커들 (중심점, 반경 원 등)
+let markersById = new Map(); // 지진 id -> { eq, group } (실시간 피드 변경분 반영용)
+let liveSource = null; // 실시간 피드 EventSource
+let liveListActive = false; // 최신 목록을 표시 중일 때만 실시간 변경분 반영 (검색 결과는 그대로 둠)
+let liveLoading = false; // 목록을 다시 받는 동안 도착한 변경분은 모아 두었다가 적용
+let livePending = [];
 
 // API 기본 URL - 환경에 따라 자동 설정
 const API_BASE = window.location.hostname === 'localhost' 
@@ -237,132 +242,192 @@ function addEarthquakeMarkers(earthquakes) {
     
     earthquakes.forEach(eq => {
         if (!eq.latitude || !eq.longitude) return;
-        
-        // 태평양 중심 좌표계로 변환 (0 ~ 360 범위로)
-        const pacificLng = toPacificCentricLongitude(eq.longitude);
-        
-        const magnitude = eq.magnitude || 0;
-        const visualSize = Math.max(2, Math.min(10, magnitude*0.8));
-        const clickSize = Math.max(8, visualSize * 2); // 클릭 영역을 시각적 크기보다 크게
-        
-        // 시각적 마커 (규모별 색상) - 태평양 중심 좌표로 표시
-        const markerColor = magnitudeToColor(magnitude);
-        const visualMarker = L.circleMarker([eq.latitude, pacificLng], {
-            radius: visualSize,
-            fillColor: 'red',
-            color: 'darkred',
-            weight: 1,
-            opacity: 1,
-            fillOpacity: 0.9
-        });
-        
-        // 클릭 영역 마커 (투명한 큰 원) - 태평양 중심 좌표로 표시
-        const clickMarker = L.circleMarker([eq.latitude, pacificLng], {
-            radius: clickSize,
-            fillColor: 'transparent',
-            color: 'transparent',
-            weight: 0,
-            opacity: 0,
-            fillOpacity: 0
-        });
-        
-        // 그룹으로 묶어서 함께 관리
-        const markerGroup = L.layerGroup([visualMarker, clickMarker]);
-        const marker = clickMarker; // 이벤트는 클릭 마커에 붙임
-        
-        const fullPlace = eq.place || '';
-        let locationName = fullPlace;
-        let distanceInfo = '';
+        const markerGroup = createEarthquakeMarker(eq);
+        markerGroup.addTo(map);
+        markers.push(markerGroup);
+        markersById.set(eq.id, { eq, group: markerGroup });
+    });
+}
 
-        // "DISTANCE DIRECTION of LOCATION" 패턴 파싱
-        const ofIndex = fullPlace.indexOf(' of ');
-        if (ofIndex !== -1) {
-            distanceInfo = fullPlace.substring(0, ofIndex).trim();
-            locationName = fullPlace.substring(ofIndex + ' of '.length).trim();
-        } else {
-            // 'of'가 없으면 전체를 지역명으로 간주하고 거리 정보는 비워둠
-            locationName = fullPlace;
-            distanceInfo = '';
-        }
-        
-        // 규모에 따른 색상
-        let bgColor = '#16a34a';
-        if (magnitude >= 6.0) bgColor = '#dc2626';
-        else if (magnitude >= 4.0) bgColor = '#ea580c';
-        else if (magnitude >= 2.0) bgColor = '#ca8a04';
-        
-        // 팝업 내용 - 극도로 컴팩트하게, 요청된 형식으로 재구성
-        const popupContent = `
+// 지진 한 건의 마커 그룹 (시각 마커 + 클릭 영역 마커) 생성
+function createEarthquakeMarker(eq) {
+    // 태평양 중심 좌표계로 변환 (0 ~ 360 범위로)
+    const pacificLng = toPacificCentricLongitude(eq.longitude);
+    
+    const magnitude = eq.magnitude || 0;
+    const visualSize = Math.max(2, Math.min(10, magnitude*0.8));
+    const clickSize = Math.max(8, visualSize * 2); // 클릭 영역을 시각적 크기보다 크게
+    
+    // 시각적 마커 (규모별 색상) - 태평양 중심 좌표로 표시
+    const markerColor = magnitudeToColor(magnitude);
+    const visualMarker = L.circleMarker([eq.latitude, pacificLng], {
+        radius: visualSize,
+        fillColor: 'red',
+        color: 'darkred',
+        weight: 1,
+        opacity: 1,
+        fillOpacity: 0.9
+    });
+    
+    // 클릭 영역 마커 (투명한 큰 원) - 태평양 중심 좌표로 표시
+    const clickMarker = L.circleMarker([eq.latitude, pacificLng], {
+        radius: clickSize,
+        fillColor: 'transparent',
+        color: 'transparent',
+        weight: 0,
+        opacity: 0,
+        fillOpacity: 0
+    });
+    
+    // 그룹으로 묶어서 함께 관리
+    const markerGroup = L.layerGroup([visualMarker, clickMarker]);
+    const marker = clickMarker; // 이벤트는 클릭 마커에 붙임
+    
+    const fullPlace = eq.place || '';
+    let locationName = fullPlace;
+    let distanceInfo = '';
+
+    // "DISTANCE DIRECTION of LOCATION" 패턴 파싱
+    const ofIndex = fullPlace.indexOf(' of ');
+    if (ofIndex !== -1) {
+        distanceInfo = fullPlace.substring(0, ofIndex).trim();
+        locationName = fullPlace.substring(ofIndex + ' of '.length).trim();
+    } else {
+        // 'of'가 없으면 전체를 지역명으로 간주하고 거리 정보는 비워둠
+        locationName = fullPlace;
+        distanceInfo = '';
+    }
+    
+    // 규모에 따른 색상
+    let bgColor = '#16a34a';
+    if (magnitude >= 6.0) bgColor = '#dc2626';
+    else if (magnitude >= 4.0) bgColor = '#ea580c';
+    else if (magnitude >= 2.0) bgColor = '#ca8a04';
+    
+    // 팝업 내용 - 극도로 컴팩트하게, 요청된 형식으로 재구성
+    const popupContent = `
+        <div style="
+            min-width: 100px; 
+            max-width: 120px; 
+            font-size: 11px; 
+            line-height: 1.2;
+            padding: 4px;
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
+        ">
             <div style="
-                min-width: 100px; 
-                max-width: 120px; 
-                font-size: 11px; 
-                line-height: 1.2;
-                padding: 4px;
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
+                background: ${bgColor}; 
+                color: white; 
+                padding: 2px 6px; 
+                margin: -4px -4px 3px -4px;
+                font-weight: bold;
+                font-size: 12px;
             ">
-                <div style="
-                    background: ${bgColor}; 
-                    color: white; 
-                    padding: 2px 6px; 
-                    margin: -4px -4px 3px -4px;
-                    font-weight: bold;
-                    font-size: 12px;
-                ">
-                    M${magnitude || '?'}
-                </div>
-                <div style="color: #333; padding: 1px 6px; font-size: 10px; word-wrap: break-word;">
-                    ${locationName || '위치 미상'}
-                </div>
-                <div style="color: #666; padding: 1px 6px; font-size: 9px;">
-                    ${distanceInfo || ''}
-                </div>
+                M${magnitude || '?'}
             </div>
-        `;
+            <div style="color: #333; padding: 1px 6px; font-size: 10px; word-wrap: break-word;">
+                ${locationName || '위치 미상'}
+            </div>
+            <div style="color: #666; padding: 1px 6px; font-size: 9px;">
+                ${distanceInfo || ''}
+            </div>
+        </div>
+    `;
 
-        clickMarker.bindPopup(popupContent, {
-            closeButton: true,
-            maxWidth: 120,
-            className: 'compact-popup'
-        });
-        
-        // 클릭 이벤트
-        marker.on('click', () => {
-            console.log('지진 마커 클릭됨:', eq.id, eq.magnitude);
-            showEarthquakeInfo(eq);
-        });
-        
-        // 호버 효과 - 클릭 영역 표시
-        marker.on('mouseover', () => {
-            clickMarker.setStyle({
-                fillColor: 'red',
-                fillOpacity: 0.1,
-                color: 'red',
-                opacity: 0.3,
-                weight: 1
-            });
+    clickMarker.bindPopup(popupContent, {
+        closeButton: true,
+        maxWidth: 120,
+        className: 'compact-popup'
+    });
+    
+    // 클릭 이벤트
+    marker.on('click', () => {
+        console.log('지진 마커 클릭됨:', eq.id, eq.magnitude);
+        showEarthquakeInfo(eq);
+    });
+    
+    // 호버 효과 - 클릭 영역 표시
+    marker.on('mouseover', () => {
+        clickMarker.setStyle({
+            fillColor: 'red',
+            fillOpacity: 0.1,
+            color: 'red',
+            opacity: 0.3,
+            weight: 1
         });
-        
-        marker.on('mouseout', () => {
-            clickMarker.setStyle({
-                fillColor: 'transparent',
-                fillOpacity: 0,
-                color: 'transparent',
-                opacity: 0,
-                weight: 0
-            });
+    });
+    
+    marker.on('mouseout', () => {
+        clickMarker.setStyle({
+            fillColor: 'transparent',
+            fillOpacity: 0,
+            color: 'transparent',
+            opacity: 0,
+            weight: 0
         });
-        
-        // 마커 그룹을 지도에 추가
-        markerGroup.addTo(map);
-        markers.push(markerGroup);
     });
+    
+    return markerGroup;
 }
 
 // 마커 제거
 function clearMarkers() {
     markers.forEach(marker => map.removeLayer(marker));
     markers = [];
+    markersById.clear();
+    liveListActive = false;
+}
+
+// 실시간 피드로 받은 삽입/갱신 이벤트 반영 (같은 id 마커는 교체, 표시 개수를 넘으면 가장 오래된 것 제거)
+function applyLiveEarthquake(eq) {
+    if (!eq.latitude || !eq.longitude) return;
+
+    const existing = markersById.get(eq.id);
+    if (existing) {
+        map.removeLayer(existing.group);
+        markers = markers.filter(group => group !== existing.group);
+    }
+    const markerGroup = createEarthquakeMarker(eq);
+    markerGroup.addTo(map);
+    markers.push(markerGroup);
+    markersById.set(eq.id, { eq, group: markerGroup });
+
+    const maxCount = parseInt(document.getElementById('max-count').value) || 1000;
+    while (markersById.size > maxCount) {
+        let oldestId = null;
+        let oldestTime = Infinity;
+        markersById.forEach((entry, id) => {
+            const time = entry.eq.time ? Date.parse(entry.eq.time) : -Infinity;
+            if (time < oldestTime) {
+                oldestTime = time;
+                oldestId = id;
+            }
+        });
+        const oldest = markersById.get(oldestId);
+        map.removeLayer(oldest.group);
+        markers = markers.filter(group => group !== oldest.group);
+        markersById.delete(oldestId);
+    }
+}
+
+// 실시간 피드(SSE) 연결 - 끊기면 EventSource 가 Last-Event-ID 로 재연결해 빠진 이벤트부터 이어 받음
+function connectLiveFeed() {
+    if (!window.EventSource || liveSource) return;
+
+    liveSource = new EventSource(`${API_BASE}/earthquakes/live`);
+    liveSource.addEventListener('earthquake', (event) => {
+        const eq = JSON.parse(event.data);
+        if (liveLoading) {
+            livePending.push(eq);
+        } else if (liveListActive) {
+            applyLiveEarthquake(eq);
+        }
+    });
+    // 서버 버퍼보다 오래 끊겼거나 서버가 재시작됨 - 목록을 다시 받은 뒤 이어 받음
+    liveSource.addEventListener('reset', () => {
+        if (liveListActive && !liveLoading) {
+            fetchLatestEarthquakes().catch(error => console.error('Error reloading earthquakes:', error));
+        }
+    });
 }
 
 // 검색 마커 제거 (중심점, 반경 원 등)
@@ -557,19 +622,34 @@ function hideSearchResults() {
 }
 
 // API 호출 함수들
-async function loadEarthquakes() {
+
+// 최신 목록을 받아 표시하고, 받는 동안 도착한 실시간 변경분을 이어서 적용
+async function fetchLatestEarthquakes() {
     const maxCount = document.getElementById('max-count').value || 1000;
-    
+    liveLoading = true;
+    livePending = [];
+    try {
+        const response = await fetch(`${API_BASE}/earthquakes?limit=${maxCount}`);
+        const earthquakes = await response.json();
+
+        addEarthquakeMarkers(earthquakes);
+        liveListActive = true;
+        livePending.forEach(applyLiveEarthquake);
+        return earthquakes;
+    } finally {
+        liveLoading = false;
+        livePending = [];
+    }
+}
+
+async function loadEarthquakes() {
     try {
         showLoading('load-earthquakes-btn');
         
         // 기존 검색 마커 제거
         clearSearchMarkers();
         
-        const response = await fetch(`${API_BASE}/earthquakes?limit=${maxCount}`);
-        const earthquakes = await response.json();
-        
-        addEarthquakeMarkers(earthquakes);
+        const earthquakes = await fetchLatestEarthquakes();
         alert(`DATA_LOADED: ${earthquakes.length} SEISMIC_EVENTS`);
     } catch (error) {
         console.error('Error loading earthquakes:', error);
@@ -1039,6 +1119,7 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
-    // 초기 데이터 로드
+    // 초기 데이터 로드 + 이후 변경분은 실시간 피드로 반영 (목록 재조회 폴링 없음)
+    connectLiveFeed();
     loadEarthquakes();
 }); 
\ No newline at end of file